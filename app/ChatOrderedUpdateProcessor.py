@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from typing import Any, Awaitable
+
+from cachetools import LRUCache
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from app.metrics import DUPLICATE_UPDATES, UPDATES_IN_FLIGHT
+
+SEEN_UPDATE_IDS_SIZE = 10000
+# BaseUpdateProcessor.process_update takes a slot of its semaphore before
+# do_process_update runs, so the base class gets no real limit and `slots` are
+# taken once an update's turn in its chat has come
+UNLIMITED_UPDATES = 2**31
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Runs updates of different chats concurrently and those of one chat in order.
+
+    Up to `max_updates_in_flight` updates are processed at once. Updates of the
+    same chat wait for the ones that arrived before them without holding one of
+    those slots, so a chat sending a burst takes one slot, not all of them.
+    Updates whose ID was seen recently are dropped: a webhook delivery Telegram
+    retries after a slow or lost response must not start a second job.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(UNLIMITED_UPDATES)
+        self.max_updates_in_flight = max_concurrent_updates
+        self.slots = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self.seen_update_ids: LRUCache = LRUCache(maxsize=SEEN_UPDATE_IDS_SIZE)
+        self.chat_locks: dict[int, asyncio.Lock] = {}
+        self.chat_waiters: dict[int, int] = {}
+
+    def _is_duplicate(self, update: object) -> bool:
+        if not isinstance(update, Update):
+            return False
+        if update.update_id in self.seen_update_ids:
+            return True
+        self.seen_update_ids[update.update_id] = True
+        return False
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        if self._is_duplicate(update):
+            logging.info(f"Dropping duplicate update {update.update_id}")
+            DUPLICATE_UPDATES.inc()
+            # never awaited, close it to avoid a warning
+            coroutine.close()
+            return
+
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            async with self.slots:
+                with UPDATES_IN_FLIGHT.track_inprogress():
+                    await coroutine
+            return
+
+        # Lock waiters are woken in FIFO order, and the application creates one
+        # task per update in arrival order, so updates of a chat keep their order.
+        lock = self.chat_locks.setdefault(chat.id, asyncio.Lock())
+        self.chat_waiters[chat.id] = self.chat_waiters.get(chat.id, 0) + 1
+        try:
+            async with lock, self.slots:
+                with UPDATES_IN_FLIGHT.track_inprogress():
+                    await coroutine
+        finally:
+            self.chat_waiters[chat.id] -= 1
+            if not self.chat_waiters[chat.id]:
+                del self.chat_waiters[chat.id]
+                del self.chat_locks[chat.id]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable, List
+
+from app.WhisperApiClient import RETRYABLE_STATUS_CODES, WhisperApiError
+from app.config import (
+    MAX_CONCURRENT_CHUNKS,
+    CHUNK_TRANSCRIPTION_RETRIES,
+    CHUNK_RETRY_DELAY_S,
+)
+
+
+class ChunkTranscriptionError(Exception):
+    def __init__(self, chunk_index: int, error: Exception):
+        super().__init__(str(error))
+        self.chunk_index = chunk_index
+        self.error = error
+
+
+class ChunkTranscriptionPipeline:
+    """Transcribes chunks concurrently and hands results back in chunk order.
+
+    At most `max_in_flight` chunks are transcribed at once. `on_chunk_done` is
+    awaited for chunk N only after chunks 0..N-1 were reported, so callers can
+    post texts as soon as the ordered prefix is complete. Chunks passed in
+    `completed` (e.g. restored after a restart) are neither transcribed nor
+    reported again.
+
+    When chunks are produced while others are transcribed (`run_stream`), the
+    next one is only requested while fewer than `max_in_flight + 1` chunks are
+    waiting to be reported, so a fast producer can't pile up chunk files.
+    """
+
+    def __init__(
+        self,
+        transcribe: Callable[[str], Awaitable[str]],
+        max_in_flight: int = MAX_CONCURRENT_CHUNKS,
+        max_retries: int = CHUNK_TRANSCRIPTION_RETRIES,
+        retry_delay_s: float = CHUNK_RETRY_DELAY_S,
+    ):
+        self.transcribe = transcribe
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max(1, max_retries)
+        self.retry_delay_s = retry_delay_s
+
+    async def _transcribe_with_retries(self, chunk_index: int, chunk_path: str) -> str:
+        for attempt in range(self.max_retries):
+            try:
+                return await self.transcribe(chunk_path)
+            except Exception as e:
+                # the API rejected the chunk itself, asking again won't change that
+                rejected = (
+                    isinstance(e, WhisperApiError)
+                    and e.status_code is not None
+                    and e.status_code not in RETRYABLE_STATUS_CODES
+                )
+                if rejected or attempt == self.max_retries - 1:
+                    raise ChunkTranscriptionError(chunk_index, e) from e
+
+                logging.warning(
+                    f"Chunk {chunk_index} failed (attempt {attempt + 1}), retrying: {e}"
+                )
+                await asyncio.sleep(self.retry_delay_s * 2**attempt)
+
+    async def run(
+        self,
+        chunk_paths: List[str],
+        on_chunk_done: Callable[[int, str], Awaitable[None]] | None = None,
+        completed: dict[int, str] | None = None,
+    ) -> List[str]:
+        async def iterate_chunk_paths():
+            for chunk_path in chunk_paths:
+                yield chunk_path
+
+        return await self.run_stream(iterate_chunk_paths(), on_chunk_done, completed)
+
+    async def run_stream(
+        self,
+        chunk_paths: AsyncIterator[str | None],
+        on_chunk_done: Callable[[int, str], Awaitable[None]] | None = None,
+        completed: dict[int, str] | None = None,
+    ) -> List[str]:
+        """Like run(), but starts transcribing chunks while later ones are still produced.
+
+        The i-th item is the path of chunk i; it may be None for completed chunks.
+        """
+        completed = completed or {}
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        results: dict[int, str] = dict(completed)
+        report_lock = asyncio.Lock()
+        next_to_report = 0
+        chunks_count = 0
+
+        # one more than in flight, so the next chunk is ready when a slot frees up
+        chunk_slots = asyncio.Semaphore(self.max_in_flight + 1)
+
+        async def report_ready_prefix() -> None:
+            nonlocal next_to_report
+            async with report_lock:
+                while next_to_report in results:
+                    if next_to_report not in completed:
+                        if on_chunk_done:
+                            await on_chunk_done(next_to_report, results[next_to_report])
+                        chunk_slots.release()
+                    next_to_report += 1
+
+        async def process(chunk_index: int, chunk_path: str) -> None:
+            try:
+                async with semaphore:
+                    results[chunk_index] = await self._transcribe_with_retries(
+                        chunk_index, chunk_path
+                    )
+            except BaseException:
+                # lets the producer loop notice the failure instead of waiting for a slot
+                chunk_slots.release()
+                raise
+            await report_ready_prefix()
+
+        def raise_first_failure() -> None:
+            for task in tasks:
+                if task.done() and not task.cancelled() and task.exception():
+                    raise task.exception()
+
+        tasks = []
+
+        try:
+            await report_ready_prefix()
+
+            chunk_path_iterator = aiter(chunk_paths)
+            while True:
+                await chunk_slots.acquire()
+                raise_first_failure()
+                try:
+                    chunk_path = await anext(chunk_path_iterator)
+                except StopAsyncIteration:
+                    break
+
+                chunk_index = chunks_count
+                chunks_count += 1
+                if chunk_index in completed:
+                    chunk_slots.release()
+                else:
+                    tasks.append(asyncio.create_task(process(chunk_index, chunk_path)))
+
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        return [results[i] for i in range(chunks_count)]
@@ -0,0 +1,18 @@
+import time
+
+from telegram.request import HTTPXRequest
+
+from app.metrics import TELEGRAM_REQUEST_SECONDS
+
+
+class InstrumentedHTTPXRequest(HTTPXRequest):
+    """HTTPXRequest that records the latency of every Bot API call by method."""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        started_at = time.perf_counter()
+        try:
+            return await super().do_request(url, method, *args, **kwargs)
+        finally:
+            TELEGRAM_REQUEST_SECONDS.labels(url.rsplit("/", 1)[-1]).observe(
+                time.perf_counter() - started_at
+            )
@@ -0,0 +1,63 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+from app.config import JOB_BROKER
+
+
+class JobBroker(ABC):
+    """Hands media jobs from the front-end to transcription workers.
+
+    A claimed job is leased to one worker, which renews the lease while it runs
+    the job. A job whose lease runs out, because its worker died, is handed to
+    the next worker that asks. Every claim gets its own `lease_id`, so a stale
+    worker can't renew or finish a lease that has moved on, even one of a worker
+    with the same ID.
+    """
+
+    @abstractmethod
+    async def enqueue(
+        self, job_id: str, chat_id: int, user_id: int, audio_duration_s: float, payload: dict
+    ) -> None:
+        """Adds the job, unless a job with the same ID is already waiting or running."""
+
+    @abstractmethod
+    async def claim(self, worker_id: str) -> dict | None:
+        """Leases the next job to the worker, or returns None when there is none.
+
+        The job comes with the `lease_id` to renew, complete or release it with.
+        """
+
+    @abstractmethod
+    async def renew(self, job_id: str, lease_id: str) -> bool:
+        """Extends the lease; False if the worker has lost the job."""
+
+    @abstractmethod
+    async def complete(self, job_id: str, lease_id: str) -> None:
+        pass
+
+    @abstractmethod
+    async def release(self, job_id: str, lease_id: str) -> None:
+        """Gives the job back unfinished, so another worker takes it without waiting.
+
+        Unlike an expired lease, this doesn't count as a failed attempt.
+        """
+
+    @abstractmethod
+    async def release_worker_jobs(self, worker_id: str) -> List[str]:
+        """Gives back every job leased to the worker, e.g. to a worker restarted with the same ID."""
+
+    @abstractmethod
+    async def has_job(self, job_id: str) -> bool:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+
+def create_job_broker(broker: str = JOB_BROKER) -> JobBroker:
+    if broker == "sqlite":
+        from app.SqliteJobBroker import SqliteJobBroker
+
+        return SqliteJobBroker()
+
+    raise ValueError(f"Unknown job broker: {broker}")
@@ -0,0 +1,134 @@
+import asyncio
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable
+
+from app.config import MAX_CONCURRENT_JOBS, MAX_CONCURRENT_AUDIO_MINUTES
+
+
+class _QueuedJob:
+    def __init__(self, chat_id: int, user_id: int, audio_duration_s: float):
+        self.chat_id = chat_id
+        self.user_id = user_id
+        self.audio_duration_s = audio_duration_s
+        self.admitted: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class JobScheduler:
+    """Admission control and fair ordering for media jobs.
+
+    At most `max_concurrent_jobs` jobs with at most `max_concurrent_audio_s`
+    seconds of audio in total run at once (a single job longer than the audio
+    budget is admitted when nothing else runs). Waiting jobs are served
+    round-robin across chats and, within a chat, across users, so one heavy
+    sender can't starve everybody else. Jobs of one user keep their order.
+    A job whose turn it is but that doesn't fit yet holds back the jobs behind
+    it, so a long recording isn't overtaken forever by shorter ones.
+    """
+
+    def __init__(
+        self,
+        max_concurrent_jobs: int = MAX_CONCURRENT_JOBS,
+        max_concurrent_audio_s: float = MAX_CONCURRENT_AUDIO_MINUTES * 60,
+    ):
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.max_concurrent_audio_s = max_concurrent_audio_s
+        self.running_jobs = 0
+        self.running_audio_s = 0.0
+        self.queues: OrderedDict[int, OrderedDict[int, deque]] = OrderedDict()
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(
+            len(jobs) for users in self.queues.values() for jobs in users.values()
+        )
+
+    def _fits(self, job: _QueuedJob) -> bool:
+        if self.running_jobs >= self.max_concurrent_jobs:
+            return False
+        if self.running_jobs == 0:
+            return True
+        return self.running_audio_s + job.audio_duration_s <= self.max_concurrent_audio_s
+
+    def _iterate_round_robin(self):
+        """Yields waiting jobs in the order round-robin would admit them."""
+        queues = OrderedDict(
+            (chat_id, OrderedDict((user_id, deque(jobs)) for user_id, jobs in users.items()))
+            for chat_id, users in self.queues.items()
+        )
+
+        while queues:
+            chat_id, users = next(iter(queues.items()))
+            user_id, jobs = next(iter(users.items()))
+            yield jobs.popleft()
+
+            users.move_to_end(user_id)
+            if not jobs:
+                del users[user_id]
+            queues.move_to_end(chat_id)
+            if not users:
+                del queues[chat_id]
+
+    def get_position(self, job: _QueuedJob) -> int:
+        for position, queued_job in enumerate(self._iterate_round_robin(), start=1):
+            if queued_job is job:
+                return position
+        return 0
+
+    def _remove(self, job: _QueuedJob, rotate: bool = True) -> None:
+        users = self.queues[job.chat_id]
+        users[job.user_id].remove(job)
+        if rotate:
+            users.move_to_end(job.user_id)
+            self.queues.move_to_end(job.chat_id)
+        if not users[job.user_id]:
+            del users[job.user_id]
+        if not users:
+            del self.queues[job.chat_id]
+
+    def _dispatch(self) -> None:
+        while True:
+            job = next(self._iterate_round_robin(), None)
+            if job is None or not self._fits(job):
+                return
+
+            self._remove(job)
+            self.running_jobs += 1
+            self.running_audio_s += job.audio_duration_s
+            job.admitted.set_result(True)
+
+    async def run(
+        self,
+        chat_id: int,
+        user_id: int,
+        audio_duration_s: float,
+        job: Callable[[], Awaitable[None]],
+        on_queued: Callable[[int], Awaitable[None]] | None = None,
+    ) -> None:
+        queued_job = _QueuedJob(chat_id, user_id, audio_duration_s)
+        self.queues.setdefault(chat_id, OrderedDict()).setdefault(
+            user_id, deque()
+        ).append(queued_job)
+        self._dispatch()
+
+        if not queued_job.admitted.done():
+            if on_queued:
+                await on_queued(self.get_position(queued_job))
+
+            try:
+                await queued_job.admitted
+            except asyncio.CancelledError:
+                if queued_job.admitted.done():
+                    self._release(queued_job)
+                else:
+                    self._remove(queued_job, rotate=False)
+                raise
+
+        try:
+            await job()
+        finally:
+            self._release(queued_job)
+
+    def _release(self, job: _QueuedJob) -> None:
+        self.running_jobs -= 1
+        self.running_audio_s -= job.audio_duration_s
+        self._dispatch()
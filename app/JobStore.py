@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from typing import List
+
+from app.config import JOB_STORE_FILE
+
+JOB_STAGES = ["created", "downloaded"]
+JOB_FIELDS = ["stage", "original_file_location", "content_hash", "duration_s"]
+
+
+class JobStore:
+    """Durable record of media jobs, so a restart resumes them instead of losing them.
+
+    A job is created when a media message arrives, advances through JOB_STAGES
+    and stores every chunk transcription that has been posted. Finished jobs
+    are deleted.
+    """
+
+    def __init__(self, database_file: str = JOB_STORE_FILE):
+        os.makedirs(os.path.dirname(os.path.abspath(database_file)), exist_ok=True)
+        self.connection = sqlite3.connect(database_file)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                update_json TEXT NOT NULL,
+                folder TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                original_file_location TEXT,
+                content_hash TEXT,
+                duration_s INTEGER,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_chunks (
+                job_id TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                transcription TEXT NOT NULL,
+                PRIMARY KEY (job_id, chunk_index)
+            );
+            """
+        )
+
+    def close(self) -> None:
+        self.connection.close()
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job["update"] = json.loads(job.pop("update_json"))
+        return job
+
+    @staticmethod
+    def has_reached_stage(job: dict, stage: str) -> bool:
+        return JOB_STAGES.index(job["stage"]) >= JOB_STAGES.index(stage)
+
+    def get_job(self, job_id: str) -> dict | None:
+        row = self.connection.execute(
+            "SELECT * FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def get_or_create_job(self, job_id: str, update_data: dict, folder: str) -> dict:
+        now = time.time()
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO jobs "
+                "(id, update_json, folder, stage, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, json.dumps(update_data), folder, JOB_STAGES[0], now, now),
+            )
+        return self.get_job(job_id)
+
+    def update_job(self, job_id: str, **fields) -> None:
+        unknown_fields = set(fields) - set(JOB_FIELDS)
+        if unknown_fields:
+            raise ValueError(f"Unknown job fields: {unknown_fields}")
+
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self.connection:
+            self.connection.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ?",
+                (*fields.values(), time.time(), job_id),
+            )
+
+    def save_chunk_transcription(
+        self, job_id: str, chunk_index: int, transcription: str
+    ) -> None:
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO job_chunks (job_id, chunk_index, transcription) "
+                "VALUES (?, ?, ?)",
+                (job_id, chunk_index, transcription),
+            )
+
+    def get_chunk_transcriptions(self, job_id: str) -> dict[int, str]:
+        rows = self.connection.execute(
+            "SELECT chunk_index, transcription FROM job_chunks WHERE job_id = ?",
+            (job_id,),
+        ).fetchall()
+        return {row["chunk_index"]: row["transcription"] for row in rows}
+
+    def finish_job(self, job_id: str) -> None:
+        with self.connection:
+            self.connection.execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+            self.connection.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def get_unfinished_jobs(self) -> List[dict]:
+        rows = self.connection.execute(
+            "SELECT * FROM jobs ORDER BY created_at"
+        ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def sweep_orphaned_folders(self, data_dir: str, min_age_s: float = 0) -> int:
+        """Removes <data_dir>/<user>/<chat>_<message> folders that no unfinished job owns.
+
+        Works for any folder laid out like DATA_DIR, e.g. the tmpfs staging folder.
+        Folders modified within the last `min_age_s` seconds are kept.
+        """
+        if not os.path.isdir(data_dir):
+            return 0
+
+        active_folders = {
+            tuple(os.path.normpath(job["folder"]).split(os.sep)[-2:])
+            for job in self.get_unfinished_jobs()
+        }
+        modified_before = time.time() - min_age_s
+        removed = 0
+
+        for user_entry in os.scandir(data_dir):
+            if not user_entry.is_dir():
+                continue
+
+            for message_entry in os.scandir(user_entry.path):
+                if not message_entry.is_dir():
+                    continue
+                if (user_entry.name, message_entry.name) in active_folders:
+                    continue
+                if message_entry.stat().st_mtime > modified_before:
+                    continue
+
+                shutil.rmtree(message_entry.path, ignore_errors=True)
+                removed += 1
+                logging.info(f"Removed orphaned job folder {message_entry.path}")
+
+        return removed
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import threading
+import time
+
+from app.Transcriber import Transcriber
+from app.config import (
+    LOCAL_WHISPER_BEAM_SIZE,
+    LOCAL_WHISPER_COMPUTE_TYPE,
+    LOCAL_WHISPER_CPU_THREADS,
+    LOCAL_WHISPER_MODEL,
+    LOCAL_WHISPER_WORKERS,
+)
+from app.worker_pool import run_in_thread
+
+
+class LocalWhisperTranscriber(Transcriber):
+    """Whisper on the CPU with faster-whisper (CTranslate2), int8-quantized by default.
+
+    The model is loaded once, on warm_up() or the first transcription. Up to
+    `workers` chunks are decoded at the same time, each on `cpu_threads`
+    threads; CTranslate2 releases the GIL, so the decoding threads don't hold
+    up the event loop.
+    """
+
+    def __init__(
+        self,
+        model: str = LOCAL_WHISPER_MODEL,
+        compute_type: str = LOCAL_WHISPER_COMPUTE_TYPE,
+        cpu_threads: int = LOCAL_WHISPER_CPU_THREADS,
+        workers: int = LOCAL_WHISPER_WORKERS,
+        beam_size: int = LOCAL_WHISPER_BEAM_SIZE,
+    ):
+        self.model_name = model
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.workers = workers
+        self.beam_size = beam_size
+        self.semaphore = asyncio.Semaphore(workers)
+        self.model = None
+        self.load_lock = threading.Lock()
+
+    def warm_up(self) -> None:
+        if self.model is not None:
+            return
+
+        with self.load_lock:
+            if self.model is not None:
+                return
+
+            # CTranslate2 and the model weights take seconds and hundreds of MB
+            from faster_whisper import WhisperModel
+
+            started_at = time.perf_counter()
+            self.model = WhisperModel(
+                self.model_name,
+                device="cpu",
+                compute_type=self.compute_type,
+                cpu_threads=self.cpu_threads,
+                num_workers=self.workers,
+            )
+            logging.info(
+                f"Loaded local Whisper model {self.model_name} ({self.compute_type}) "
+                f"in {time.perf_counter() - started_at:.1f}s"
+            )
+
+    def validate_file(self, audio_file_path: str) -> bool:
+        # decoded with ffmpeg (PyAV), so any container works and there is no size limit
+        return True
+
+    def _transcribe(self, audio_file_path: str) -> str:
+        self.warm_up()
+        segments, _ = self.model.transcribe(audio_file_path, beam_size=self.beam_size)
+        # segments is a generator, decoding happens while it is consumed
+        return " ".join(segment.text.strip() for segment in segments)
+
+    async def transcribe(self, audio_file_path: str) -> str:
+        async with self.semaphore:
+            return await run_in_thread(self._transcribe, audio_file_path)
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from typing import AsyncIterator, Awaitable, Callable, List
+
+from app.ChunkTranscriptionPipeline import ChunkTranscriptionPipeline
+from app.PcmStore import PcmStore
+from app.chunk_processor import create_chunk_planner
+from app.config import CHUNK_PLANNING_STRATEGY
+from app.media_converter import transcode_audio
+from app.metrics import measure_stage, observe_stage
+from app.models.MediaFileModel import MediaFileModel
+from app.streaming_vad import iter_speech_progress
+from app.transcode_planner import TranscodePlan
+from app.worker_pool import run_in_process, run_in_thread
+
+
+class LongAudioPipeline:
+    """Overlaps VAD, chunk planning, chunk encoding and transcription.
+
+    VAD streams over the original file in a worker thread. Each chunk is cut
+    and handed to transcription as soon as VAD output settles its boundary,
+    so the first texts arrive while the rest of the file is still analysed.
+    With the "optimal" CHUNK_PLANNING_STRATEGY the chunks are only planned once
+    VAD has finished.
+    Every chunk is produced with the same transcode plan, stream copy if possible.
+    When the recording was already decoded into its PcmStore, VAD and chunk
+    encoding read from there instead of decoding the original again.
+    """
+
+    def __init__(
+        self,
+        media_file: MediaFileModel,
+        chunk_pipeline: ChunkTranscriptionPipeline,
+        transcode_plan: TranscodePlan,
+        chunk_planning_strategy: str = CHUNK_PLANNING_STRATEGY,
+    ):
+        self.media_file = media_file
+        self.chunk_pipeline = chunk_pipeline
+        self.transcode_plan = transcode_plan
+        self.chunk_planning_strategy = chunk_planning_strategy
+        self.pcm_store = PcmStore(media_file.pcm_file)
+        self.chunks: List[list] = []
+        self.time_to_first_chunk_s: float | None = None
+
+    def get_chunk_location(self, chunk_index: int) -> str:
+        return self.media_file.get_chunk_location(chunk_index, self.transcode_plan.extension)
+
+    def measure_stage(self, stage: str):
+        return measure_stage(stage, self.media_file.original_file_type, "long")
+
+    async def _iterate_speech_progress(self) -> AsyncIterator[tuple]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stopped = threading.Event()
+
+        def detect_speech() -> None:
+            try:
+                if self.pcm_store.exists():
+                    audio = self.pcm_store
+                else:
+                    audio = self.media_file.original_file_location
+
+                with self.measure_stage("speech_detection"):
+                    for progress in iter_speech_progress(audio):
+                        loop.call_soon_threadsafe(queue.put_nowait, progress)
+                        if stopped.is_set():
+                            return
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+
+        detection = asyncio.ensure_future(run_in_thread(detect_speech))
+
+        try:
+            while True:
+                progress = await queue.get()
+                if isinstance(progress, Exception):
+                    raise progress
+
+                yield progress
+
+                _, settled_until_s = progress
+                if settled_until_s == math.inf:
+                    break
+        finally:
+            stopped.set()
+            await asyncio.shield(detection)
+
+    async def _iterate_chunk_paths(self, completed: dict[int, str]) -> AsyncIterator[str | None]:
+        planner = create_chunk_planner(self.chunk_planning_strategy)
+
+        async for segments, settled_until_s in self._iterate_speech_progress():
+            planner.add_segments(segments)
+            if settled_until_s == math.inf:
+                chunks = planner.finish(self.media_file.original_file_duration_s)
+            else:
+                chunks = planner.plan(settled_until_s)
+
+            for chunk in chunks:
+                chunk_index = len(self.chunks)
+                self.chunks.append(chunk)
+
+                if chunk_index in completed:
+                    yield None
+                    continue
+
+                chunk_path = self.get_chunk_location(chunk_index)
+                with self.measure_stage("cut"):
+                    if self.transcode_plan.is_copy or not self.pcm_store.exists():
+                        await run_in_process(
+                            transcode_audio,
+                            self.media_file.original_file_location,
+                            chunk_path,
+                            self.transcode_plan.output_options,
+                            chunk[0],
+                            chunk[1],
+                        )
+                    else:
+                        await run_in_process(
+                            self.pcm_store.encode_slice,
+                            chunk_path,
+                            chunk[0],
+                            chunk[1],
+                            self.transcode_plan.output_options,
+                        )
+                yield chunk_path
+
+    async def run(
+        self,
+        on_chunk_done: Callable[[int, str], Awaitable[None]] | None = None,
+        completed: dict[int, str] | None = None,
+    ) -> List[str]:
+        started_at = time.perf_counter()
+
+        async def report_chunk(chunk_index: int, transcription: str) -> None:
+            if self.time_to_first_chunk_s is None:
+                self.time_to_first_chunk_s = time.perf_counter() - started_at
+                observe_stage(
+                    "first_chunk",
+                    self.media_file.original_file_type,
+                    "long",
+                    self.time_to_first_chunk_s,
+                )
+                logging.info(
+                    f"First chunk of {self.media_file.folder} transcribed "
+                    f"in {self.time_to_first_chunk_s:.1f}s"
+                )
+            if on_chunk_done:
+                await on_chunk_done(chunk_index, transcription)
+
+        completed = completed or {}
+        return await self.chunk_pipeline.run_stream(
+            self._iterate_chunk_paths(completed), report_chunk, completed
+        )
@@ -0,0 +1,210 @@
+import threading
+
+import numpy as np
+
+from app.config import VAD_BATCH_SIZE, VAD_INTRA_OP_THREADS, WAV_SAMPLING_RATE
+
+
+class VadStream:
+    """Recurrent state of one recording, fed block by block through its engine."""
+
+    def __init__(self, engine: "OnnxVadEngine"):
+        self.engine = engine
+        self.state = engine.get_initial_state()
+        self.context = np.zeros((1, engine.context_size), dtype=np.float32)
+
+    def get_speech_probs(self, windows: np.ndarray) -> np.ndarray:
+        """Speech probability of each row of `windows`, continuing where the last block ended.
+
+        `windows` is a float32 array of shape (n, window_size_samples) in [-1, 1].
+        """
+        return self.engine.get_speech_probs(self, windows)
+
+
+class _VadRequest:
+    def __init__(self, stream: VadStream, windows: np.ndarray):
+        self.stream = stream
+        self.windows = windows
+        self.speech_probs = np.zeros(len(windows), dtype=np.float32)
+        self.position = 0
+        self.done = False
+        self.error: BaseException | None = None
+
+
+class OnnxVadEngine:
+    """Runs the Silero VAD ONNX model with onnxruntime on NumPy arrays, no torch involved.
+
+    The model is recurrent, so windows of one recording have to run one after
+    the other. Recordings are independent though: each session run takes the
+    next window of up to `batch_size` streams, with every stream's state in its
+    own batch row, and streams that submit a block join at the next run. The
+    results equal running each stream alone. There is no batching thread:
+    a caller that finds the engine idle runs the batch until its own block is
+    done, then hands the rest over to a waiting caller.
+
+    Both model generations are supported: v4 (`h`/`c` state) and v5 (a single
+    `state`, plus the tail of the previous window prepended as context).
+    """
+
+    def __init__(
+        self,
+        model_file: str,
+        sampling_rate: int = WAV_SAMPLING_RATE,
+        intra_op_threads: int = VAD_INTRA_OP_THREADS,
+        batch_size: int = VAD_BATCH_SIZE,
+    ):
+        # imported here, so processes that never run VAD don't load onnxruntime
+        import onnxruntime
+
+        if sampling_rate not in (8000, 16000):
+            raise ValueError(f"Sampling rate {sampling_rate} is not supported by Silero VAD")
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            model_file, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+
+        input_names = {model_input.name for model_input in self.session.get_inputs()}
+        if {"input", "sr", "h", "c"} <= input_names:
+            self.version = "v4"
+            self.context_size = 0
+        elif {"input", "sr", "state"} <= input_names:
+            self.version = "v5"
+            self.context_size = 64 if sampling_rate == 16000 else 32
+        else:
+            raise ValueError(f"{model_file} is not a Silero VAD model, inputs: {sorted(input_names)}")
+
+        self.sampling_rate = sampling_rate
+        self.window_size_samples = 512 if sampling_rate == 16000 else 256
+        self.batch_size = batch_size
+
+        self.condition = threading.Condition()
+        self.pending: list[_VadRequest] = []
+        self.running = False
+        self.run_count = 0
+        self.windows_processed = 0
+
+    def get_initial_state(self) -> tuple:
+        if self.version == "v4":
+            return (
+                np.zeros((2, 1, 64), dtype=np.float32),
+                np.zeros((2, 1, 64), dtype=np.float32),
+            )
+        return (np.zeros((2, 1, 128), dtype=np.float32),)
+
+    def open_stream(self) -> VadStream:
+        return VadStream(self)
+
+    def get_speech_probs(self, stream: VadStream, windows: np.ndarray) -> np.ndarray:
+        windows = np.asarray(windows, dtype=np.float32)
+        if windows.ndim != 2 or windows.shape[1] != self.window_size_samples:
+            raise ValueError(
+                f"Windows must have shape (n, {self.window_size_samples}), got {windows.shape}"
+            )
+
+        request = _VadRequest(stream, windows)
+        if not len(windows):
+            return request.speech_probs
+
+        with self.condition:
+            self.pending.append(request)
+        while True:
+            with self.condition:
+                while self.running and not request.done:
+                    self.condition.wait()
+                if request.done:
+                    break
+                self.running = True
+            self._run_pending(request)
+
+        if request.error is not None:
+            raise request.error
+        return request.speech_probs
+
+    def _run_pending(self, own_request: _VadRequest) -> None:
+        """Runs waiting streams, taking in new ones between runs, until `own_request` is done."""
+        active: list[_VadRequest] = []
+        state = tuple(part[:, :0] for part in self.get_initial_state())
+        context = np.zeros((0, self.context_size), dtype=np.float32)
+        sampling_rate = np.array(self.sampling_rate, dtype=np.int64)
+
+        try:
+            while True:
+                with self.condition:
+                    admitted = self.pending[: self.batch_size - len(active)]
+                    del self.pending[: len(admitted)]
+                    if not active and not admitted:
+                        self.running = False
+                        self.condition.notify_all()
+                        return
+                if admitted:
+                    active = active + admitted
+                    state = tuple(
+                        np.concatenate([part, *admitted_parts], axis=1)
+                        for part, *admitted_parts in zip(
+                            state, *(request.stream.state for request in admitted)
+                        )
+                    )
+                    context = np.concatenate(
+                        [context, *(request.stream.context for request in admitted)]
+                    )
+
+                windows = np.stack([request.windows[request.position] for request in active])
+                if self.context_size:
+                    windows = np.concatenate([context, windows], axis=1)
+                    context = windows[:, -self.context_size :]
+
+                inputs = {"input": windows, "sr": sampling_rate}
+                if self.version == "v4":
+                    inputs["h"], inputs["c"] = state
+                else:
+                    (inputs["state"],) = state
+                output, *new_state = self.session.run(None, inputs)
+                state = tuple(new_state)
+                self.run_count += 1
+                self.windows_processed += len(active)
+
+                finished = []
+                active_before = active
+                for row, request in enumerate(active):
+                    request.speech_probs[request.position] = output[row, 0]
+                    request.position += 1
+                    if request.position == len(request.windows):
+                        request.stream.state = tuple(
+                            part[:, row : row + 1].copy() for part in state
+                        )
+                        request.stream.context = context[row : row + 1].copy()
+                        finished.append(row)
+
+                if not finished:
+                    continue
+                kept = [row for row in range(len(active)) if row not in finished]
+                state = tuple(part[:, kept] for part in state)
+                context = context[kept]
+                active = [active[row] for row in kept]
+
+                with self.condition:
+                    for row in finished:
+                        active_before[row].done = True
+                    if own_request.done:
+                        # hand over, so this stream can submit its next block right away
+                        for row, request in enumerate(active):
+                            request.stream.state = tuple(
+                                part[:, row : row + 1].copy() for part in state
+                            )
+                            request.stream.context = context[row : row + 1].copy()
+                        self.pending[:0] = active
+                        self.running = False
+                    self.condition.notify_all()
+                if own_request.done:
+                    return
+        except BaseException as e:
+            with self.condition:
+                # a waiting stream takes over the requests still pending
+                self.running = False
+                for request in active:
+                    request.error = e
+                    request.done = True
+                self.condition.notify_all()
@@ -0,0 +1,111 @@
+import hashlib
+import os
+from typing import Iterator
+
+import ffmpeg
+import numpy as np
+
+from app.config import WAV_SAMPLING_RATE
+
+PCM_SAMPLE_WIDTH_BYTES = 2  # s16le
+DECODE_BLOCK_SIZE_BYTES = 1024 * 1024
+
+
+class PcmStore:
+    """Raw mono s16le samples of one recording, decoded once and memory-mapped read-only.
+
+    VAD reads windows and chunk encoding reads slices straight from the mapping,
+    so neither decodes the original again. The pages are file-backed and shared
+    by every process that maps them, and the kernel can drop them under memory
+    pressure, so concurrent jobs don't each hold their audio on the heap.
+    """
+
+    def __init__(self, location: str, sampling_rate: int = WAV_SAMPLING_RATE):
+        self.location = location
+        self.sampling_rate = sampling_rate
+        self.samples_read = 0
+
+    def exists(self) -> bool:
+        return os.path.exists(self.location)
+
+    def write(self, input_file_location: str) -> str:
+        """Decodes the input into the store and returns the SHA-256 of the samples.
+
+        The hash serves as the content hash of the recording. Copies with the same
+        audio stream match, e.g. a re-upload or a remux into another container,
+        lossy re-encodes of it don't.
+        """
+        process = (
+            ffmpeg.input(input_file_location)
+            .output("pipe:", format="s16le", acodec="pcm_s16le", ac=1, ar=self.sampling_rate)
+            .global_args("-loglevel", "error")
+            .run_async(pipe_stdout=True)
+        )
+
+        content_hash = hashlib.sha256()
+        partial_location = f"{self.location}.part"
+        with open(partial_location, "wb") as file:
+            while data := process.stdout.read(DECODE_BLOCK_SIZE_BYTES):
+                content_hash.update(data)
+                file.write(data)
+
+        if process.wait() != 0:
+            os.remove(partial_location)
+            raise RuntimeError(f"ffmpeg failed to decode {input_file_location}")
+
+        # readers never see a half-written store, also after a crash
+        os.replace(partial_location, self.location)
+        return content_hash.hexdigest()
+
+    def get_samples(self) -> np.ndarray:
+        if os.path.getsize(self.location) < PCM_SAMPLE_WIDTH_BYTES:
+            # an empty file can't be mapped
+            return np.zeros(0, dtype=np.int16)
+        return np.memmap(self.location, dtype=np.int16, mode="r")
+
+    def get_duration_s(self) -> float:
+        return os.path.getsize(self.location) // PCM_SAMPLE_WIDTH_BYTES / self.sampling_rate
+
+    def iter_windows(self, window_size_samples: int) -> Iterator[np.ndarray]:
+        """Yields float32 windows; the last one is zero-padded to full size.
+
+        Same interface as streaming_vad.PcmStreamReader, without running ffmpeg.
+        """
+        samples = self.get_samples()
+        full_windows_samples = len(samples) - len(samples) % window_size_samples
+
+        for start in range(0, full_windows_samples, window_size_samples):
+            self.samples_read = start + window_size_samples
+            yield samples[start : self.samples_read].astype(np.float32) / 32768.0
+
+        if full_windows_samples < len(samples):
+            self.samples_read = len(samples)
+            window = np.zeros(window_size_samples, dtype=np.float32)
+            window[: len(samples) - full_windows_samples] = (
+                samples[full_windows_samples:].astype(np.float32) / 32768.0
+            )
+            yield window
+
+    def encode_slice(
+        self, output_file_location: str, start_s: float, end_s: float, output_options: dict
+    ) -> None:
+        """Encodes [start_s, end_s) by piping the mapped samples into ffmpeg."""
+        samples = self.get_samples()
+        start = int(start_s * self.sampling_rate)
+        end = min(int(end_s * self.sampling_rate), len(samples))
+
+        process = (
+            ffmpeg.input("pipe:", format="s16le", ac=1, ar=self.sampling_rate)
+            .output(output_file_location, **output_options)
+            .global_args("-loglevel", "error")
+            .overwrite_output()
+            .run_async(pipe_stdin=True)
+        )
+        try:
+            # a memoryview of the mapping, nothing is copied on our side
+            process.stdin.write(memoryview(samples[start:end]).cast("B"))
+        finally:
+            process.stdin.close()
+
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed to encode {output_file_location}")
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import time
+from typing import List
+
+from telegram import Message
+from telegram.constants import MessageLimit
+
+from app.config import CHUNK_TEXT_BATCH_INTERVAL_S, ECHO_CHUNK_AUDIO, STATUS_EDIT_INTERVAL_S
+from app.metrics import TELEGRAM_CALLS_SAVED
+
+
+def split_text(text: str, max_length: int = MessageLimit.MAX_TEXT_LENGTH) -> List[str]:
+    """Splits at paragraph or word boundaries where possible."""
+    parts = []
+    while len(text) > max_length:
+        cut = text.rfind("\n", 0, max_length)
+        if cut <= 0:
+            cut = text.rfind(" ", 0, max_length)
+        if cut <= 0:
+            cut = max_length
+        parts.append(text[:cut])
+        text = text[cut:].lstrip()
+    parts.append(text)
+    return parts
+
+
+class ProgressReporter:
+    """Talks to the user about one media message with as few Bot API calls as possible.
+
+    The status message is edited at most once per `status_edit_interval_s`, and
+    the latest status wins; anything in between is dropped. Chunk texts are
+    collected and sent together, in messages up to Telegram's length limit, at
+    most once per `text_batch_interval_s`. Each call that was not made is
+    counted in `api_calls_saved`.
+    """
+
+    def __init__(
+        self,
+        user_message: Message,
+        status_edit_interval_s: float = STATUS_EDIT_INTERVAL_S,
+        text_batch_interval_s: float = CHUNK_TEXT_BATCH_INTERVAL_S,
+        echo_chunk_audio: bool = ECHO_CHUNK_AUDIO,
+    ):
+        self.user_message = user_message
+        self.status_edit_interval_s = status_edit_interval_s
+        self.text_batch_interval_s = text_batch_interval_s
+        self.echo_chunk_audio = echo_chunk_audio
+
+        self.status_message: Message | None = None
+        self.status_text: str | None = None
+        self.pending_status_text: str | None = None
+        self.last_status_edit_at = 0.0
+        self.status_flush: asyncio.TimerHandle | None = None
+
+        self.pending_texts: List[str] = []
+        self.text_flush: asyncio.TimerHandle | None = None
+
+        # keeps sends in the order they were requested
+        self.send_lock = asyncio.Lock()
+        self.flush_tasks: set[asyncio.Task] = set()
+        self.api_calls = 0
+        self.api_calls_saved = 0
+
+    def attach_status(self, status_message: Message) -> None:
+        """Continues with a status message another process sent, e.g. the front-end."""
+        self.status_message = status_message
+        self.status_text = status_message.text
+
+    def _count_saved(self, calls: int = 1) -> None:
+        self.api_calls_saved += calls
+        TELEGRAM_CALLS_SAVED.inc(calls)
+
+    def _schedule(self, delay_s: float, flush) -> asyncio.TimerHandle:
+        def start_flush() -> None:
+            task = asyncio.create_task(flush())
+            self.flush_tasks.add(task)
+            task.add_done_callback(self.flush_tasks.discard)
+
+        return asyncio.get_running_loop().call_later(delay_s, start_flush)
+
+    async def set_status(self, text: str, immediately: bool = False) -> None:
+        if self.user_message is None:
+            raise RuntimeError("⚠️ User message is not set.")
+
+        if self.status_message is None:
+            async with self.send_lock:
+                self.status_message = await self.user_message.reply_text(text, quote=True)
+                self.api_calls += 1
+            self.status_text = text
+            self.last_status_edit_at = time.monotonic()
+            return
+
+        if self.pending_status_text is not None:
+            # replaced before it was ever shown
+            self._count_saved()
+        self.pending_status_text = text
+
+        wait_s = self.last_status_edit_at + self.status_edit_interval_s - time.monotonic()
+        if immediately or wait_s <= 0:
+            await self.flush_status()
+        elif self.status_flush is None:
+            self.status_flush = self._schedule(wait_s, self.flush_status)
+
+    async def flush_status(self) -> None:
+        if self.status_flush is not None:
+            self.status_flush.cancel()
+            self.status_flush = None
+
+        text, self.pending_status_text = self.pending_status_text, None
+        if text is None:
+            return
+        if text == self.status_text:
+            self._count_saved()
+            return
+
+        async with self.send_lock:
+            await self.status_message.edit_text(text)
+            self.api_calls += 1
+        self.status_text = text
+        self.last_status_edit_at = time.monotonic()
+
+    async def delete_status(self) -> None:
+        if self.status_flush is not None:
+            self.status_flush.cancel()
+            self.status_flush = None
+        if self.pending_status_text is not None:
+            self.pending_status_text = None
+            self._count_saved()
+
+        if self.status_message:
+            async with self.send_lock:
+                await self.status_message.delete()
+                self.api_calls += 1
+            self.status_message = None
+
+    async def add_chunk_text(self, text: str, audio_file_location: str | None = None) -> None:
+        if self.echo_chunk_audio and audio_file_location:
+            await self._send_chunk_audio(text, audio_file_location)
+            return
+        if audio_file_location:
+            self._count_saved()
+
+        self.pending_texts.append(text)
+        if self.text_flush is None:
+            self.text_flush = self._schedule(self.text_batch_interval_s, self.flush_texts)
+
+    async def _send_chunk_audio(self, text: str, audio_file_location: str) -> None:
+        # keep texts that were batched before this chunk ahead of it
+        await self.flush_texts()
+
+        fits_caption = len(text) <= MessageLimit.CAPTION_LENGTH
+        async with self.send_lock:
+            with open(audio_file_location, "rb") as audio:
+                await self.user_message.reply_audio(
+                    audio=audio,
+                    caption=text if fits_caption else None,
+                    performer="Transcription",
+                    disable_notification=True,
+                    reply_to_message_id=None,
+                )
+            self.api_calls += 1
+
+        if fits_caption:
+            self._count_saved()
+        else:
+            await self._send_texts([text])
+
+    async def flush_texts(self) -> None:
+        if self.text_flush is not None:
+            self.text_flush.cancel()
+            self.text_flush = None
+
+        texts, self.pending_texts = self.pending_texts, []
+        if texts:
+            await self._send_texts(texts)
+
+    async def _send_texts(self, texts: List[str]) -> None:
+        messages = []
+        for text in texts:
+            if messages and len(messages[-1]) + 2 + len(text) <= MessageLimit.MAX_TEXT_LENGTH:
+                messages[-1] += "\n\n" + text
+            else:
+                messages += split_text(text)
+
+        async with self.send_lock:
+            for message in messages:
+                await self.user_message.reply_text(
+                    text=message,
+                    disable_notification=True,
+                    reply_to_message_id=None,
+                )
+                self.api_calls += 1
+        self._count_saved(max(0, len(texts) - len(messages)))
+
+    async def flush(self) -> None:
+        """Sends everything still held back, e.g. before the final document."""
+        await self.flush_texts()
+        await self.flush_status()
+
+    async def close(self) -> None:
+        await self.flush()
+        await asyncio.gather(*self.flush_tasks, return_exceptions=True)
+        logging.info(
+            f"Progress reporter made {self.api_calls} API calls, saved {self.api_calls_saved}"
+        )
@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
+
+from app.JobStore import JobStore
+from app.config import (
+    DATA_DIR,
+    SCRATCH_MAX_BYTES,
+    SCRATCH_MIN_FREE_MEMORY_BYTES,
+    SCRATCH_STALE_AGE_S,
+    SCRATCH_SWEEP_INTERVAL_S,
+    SCRATCH_TMPFS_DIR,
+    SCRATCH_TMPFS_MAX_BYTES,
+)
+from app.metrics import DATA_DIR_BYTES, get_folder_size
+from app.models.MediaFileModel import MediaFileModel
+from app.worker_pool import run_in_thread
+
+
+def get_available_memory_bytes() -> int:
+    try:
+        with open("/proc/meminfo") as file:
+            for line in file:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+class JobScratch:
+    """Files of one media job: its folder in DATA_DIR and, optionally, one on tmpfs."""
+
+    def __init__(self, space: "ScratchSpace", folder: str, tmpfs_folder: str | None):
+        self.space = space
+        self.folder = folder
+        self.tmpfs_folder = tmpfs_folder
+        self.reserved_bytes = 0
+        self.tmpfs_bytes = 0
+
+    def stage(self, name: str, size_bytes: int) -> str:
+        """Location for an intermediate file or folder: on tmpfs if it fits, else on disk.
+
+        An artefact left by an earlier run of the job is found where it was put.
+        """
+        for folder in [self.tmpfs_folder, self.folder]:
+            if folder and os.path.exists(os.path.join(folder, name)):
+                return os.path.join(folder, name)
+
+        if self.tmpfs_folder and self.space.take_tmpfs(size_bytes):
+            self.tmpfs_bytes += size_bytes
+            os.makedirs(self.tmpfs_folder, exist_ok=True)
+            return os.path.join(self.tmpfs_folder, name)
+
+        os.makedirs(self.folder, exist_ok=True)
+        return os.path.join(self.folder, name)
+
+    def remove_files(self) -> None:
+        for folder in [self.folder, self.tmpfs_folder]:
+            if folder:
+                shutil.rmtree(folder, ignore_errors=True)
+
+        if self.tmpfs_folder:
+            try:
+                # the user folder, unless another job of the user is staged there
+                os.rmdir(os.path.dirname(self.tmpfs_folder))
+            except OSError:
+                pass
+
+
+class ScratchSpace:
+    """Process-wide budget for the files media jobs keep while they run.
+
+    A job reserves the disk space it expects to need before it downloads
+    anything, and waits while others hold the budget (a job bigger than the
+    whole budget runs alone). Intermediate files are staged on tmpfs instead,
+    as long as the tmpfs budget, the tmpfs itself and free RAM allow. A job's
+    files are removed however it ends, except when it is cancelled for a
+    restart, and a sweeper removes folders that no unfinished job owns.
+    """
+
+    def __init__(
+        self,
+        data_dir: str = DATA_DIR,
+        max_bytes: int = SCRATCH_MAX_BYTES,
+        tmpfs_dir: str | None = SCRATCH_TMPFS_DIR,
+        tmpfs_max_bytes: int = SCRATCH_TMPFS_MAX_BYTES,
+        min_free_memory_bytes: int = SCRATCH_MIN_FREE_MEMORY_BYTES,
+    ):
+        self.data_dir = data_dir
+        self.max_bytes = max_bytes
+        # only used when the tmpfs it lives in, e.g. /dev/shm, exists
+        self.tmpfs_dir = None
+        if tmpfs_dir and os.path.isdir(os.path.dirname(tmpfs_dir)):
+            # Every worker on the host shares the tmpfs, each sweeps only the folders
+            # of its own DATA_DIR. Stable across restarts, so resumed jobs find them.
+            namespace = hashlib.sha256(os.path.abspath(data_dir).encode()).hexdigest()[:16]
+            self.tmpfs_dir = os.path.join(tmpfs_dir, namespace)
+        self.tmpfs_max_bytes = tmpfs_max_bytes
+        self.min_free_memory_bytes = min_free_memory_bytes
+        self.reserved_bytes = 0
+        self.reserving_jobs = 0
+        self.tmpfs_reserved_bytes = 0
+        self.released = asyncio.Condition()
+
+    def _fits(self, size_bytes: int) -> bool:
+        return self.reserving_jobs == 0 or self.reserved_bytes + size_bytes <= self.max_bytes
+
+    def take_tmpfs(self, size_bytes: int) -> bool:
+        if self.tmpfs_reserved_bytes + size_bytes > self.tmpfs_max_bytes:
+            return False
+        os.makedirs(self.tmpfs_dir, exist_ok=True)
+        if shutil.disk_usage(self.tmpfs_dir).free < size_bytes:
+            return False
+        # tmpfs pages are RAM, don't push the workers into swap
+        if get_available_memory_bytes() - size_bytes < self.min_free_memory_bytes:
+            return False
+
+        self.tmpfs_reserved_bytes += size_bytes
+        return True
+
+    @asynccontextmanager
+    async def open_job(
+        self,
+        media_file: MediaFileModel,
+        expected_bytes: int,
+        on_wait: Callable[[], Awaitable[None]] | None = None,
+    ) -> AsyncIterator[JobScratch]:
+        if not self._fits(expected_bytes):
+            if on_wait:
+                await on_wait()
+            async with self.released:
+                await self.released.wait_for(lambda: self._fits(expected_bytes))
+
+        tmpfs_folder = None
+        if self.tmpfs_dir:
+            tmpfs_folder = os.path.join(
+                self.tmpfs_dir, os.path.relpath(media_file.folder, self.data_dir)
+            )
+        scratch = JobScratch(self, media_file.folder, tmpfs_folder)
+        scratch.reserved_bytes = expected_bytes
+        self.reserved_bytes += expected_bytes
+        self.reserving_jobs += 1
+
+        cancelled = False
+        try:
+            yield scratch
+        except asyncio.CancelledError:
+            # kept, so the job resumes from them after a restart
+            cancelled = True
+            raise
+        finally:
+            if not cancelled:
+                scratch.remove_files()
+            self.reserved_bytes -= scratch.reserved_bytes
+            self.reserving_jobs -= 1
+            self.tmpfs_reserved_bytes -= scratch.tmpfs_bytes
+            async with self.released:
+                self.released.notify_all()
+
+    def sweep(self, job_store: JobStore, min_age_s: float = SCRATCH_STALE_AGE_S) -> int:
+        removed_folders = job_store.sweep_orphaned_folders(self.data_dir, min_age_s)
+        if self.tmpfs_dir:
+            removed_folders += job_store.sweep_orphaned_folders(self.tmpfs_dir, min_age_s)
+        return removed_folders
+
+    async def run_sweeper(
+        self, job_store: JobStore, interval_s: float = SCRATCH_SWEEP_INTERVAL_S
+    ) -> None:
+        while True:
+            # walked here, so a scrape never walks the whole data tree
+            DATA_DIR_BYTES.set(await run_in_thread(get_folder_size, self.data_dir))
+            await asyncio.sleep(interval_s)
+            try:
+                removed_folders = self.sweep(job_store)
+            except Exception as e:
+                logging.warning(f"Failed to sweep scratch folders: {e}")
+                continue
+            if removed_folders:
+                logging.info(f"Swept {removed_folders} stale job folders")
@@ -0,0 +1,165 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List
+
+from app.JobBroker import JobBroker
+from app.config import JOB_BROKER_FILE, JOB_LEASE_S
+from app.worker_pool import run_in_thread
+
+
+class SqliteJobBroker(JobBroker):
+    """Job broker in a SQLite file, for a front-end and workers on one host.
+
+    Claims run in an immediate transaction, so two processes never lease the
+    same job. The next job is the oldest one of the chat with the fewest
+    running jobs, so a chat that sent many files doesn't hold up the others.
+    Queries run in the thread pool: waiting for another process's write lock
+    must not stall the event loop of the front-end.
+    """
+
+    def __init__(self, database_file: str = JOB_BROKER_FILE, lease_s: float = JOB_LEASE_S):
+        self.lease_s = lease_s
+        os.makedirs(os.path.dirname(os.path.abspath(database_file)), exist_ok=True)
+        # transactions are opened explicitly, see claim()
+        self.connection = sqlite3.connect(
+            database_file, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        # one connection, used by one pool thread at a time
+        self.connection_lock = threading.Lock()
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS broker_jobs (
+                id TEXT PRIMARY KEY,
+                chat_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                audio_duration_s REAL NOT NULL,
+                payload_json TEXT NOT NULL,
+                enqueued_at REAL NOT NULL,
+                worker_id TEXT,
+                lease_id TEXT,
+                lease_expires_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS broker_jobs_enqueued_at ON broker_jobs (enqueued_at);
+            CREATE INDEX IF NOT EXISTS broker_jobs_chat_id_lease_expires_at
+                ON broker_jobs (chat_id, lease_expires_at);
+            """
+        )
+
+    async def _run(self, query, *args):
+        def run_locked():
+            with self.connection_lock:
+                return query(*args)
+
+        return await run_in_thread(run_locked)
+
+    async def aclose(self) -> None:
+        await self._run(self.connection.close)
+
+    async def enqueue(
+        self, job_id: str, chat_id: int, user_id: int, audio_duration_s: float, payload: dict
+    ) -> None:
+        await self._run(
+            self.connection.execute,
+            "INSERT OR IGNORE INTO broker_jobs "
+            "(id, chat_id, user_id, audio_duration_s, payload_json, enqueued_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, chat_id, user_id, audio_duration_s, json.dumps(payload), time.time()),
+        )
+
+    def _claim(self, worker_id: str) -> dict | None:
+        now = time.time()
+        lease_id = uuid.uuid4().hex
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.connection.execute(
+                """
+                SELECT job.* FROM broker_jobs AS job
+                LEFT JOIN (
+                    SELECT chat_id, COUNT(*) AS running_jobs FROM broker_jobs
+                    WHERE lease_expires_at >= :now
+                    GROUP BY chat_id
+                ) AS running USING (chat_id)
+                WHERE job.lease_expires_at IS NULL OR job.lease_expires_at < :now
+                ORDER BY COALESCE(running.running_jobs, 0), job.enqueued_at
+                LIMIT 1
+                """,
+                {"now": now},
+            ).fetchone()
+            if row is not None:
+                self.connection.execute(
+                    "UPDATE broker_jobs "
+                    "SET worker_id = ?, lease_id = ?, lease_expires_at = ?, "
+                    "attempts = attempts + 1 "
+                    "WHERE id = ?",
+                    (worker_id, lease_id, now + self.lease_s, row["id"]),
+                )
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job.pop("payload_json"))
+        job["worker_id"] = worker_id
+        job["lease_id"] = lease_id
+        job["attempts"] += 1
+        return job
+
+    async def claim(self, worker_id: str) -> dict | None:
+        return await self._run(self._claim, worker_id)
+
+    async def renew(self, job_id: str, lease_id: str) -> bool:
+        cursor = await self._run(
+            self.connection.execute,
+            "UPDATE broker_jobs SET lease_expires_at = ? WHERE id = ? AND lease_id = ?",
+            (time.time() + self.lease_s, job_id, lease_id),
+        )
+        return cursor.rowcount > 0
+
+    async def complete(self, job_id: str, lease_id: str) -> None:
+        await self._run(
+            self.connection.execute,
+            "DELETE FROM broker_jobs WHERE id = ? AND lease_id = ?",
+            (job_id, lease_id),
+        )
+
+    async def release(self, job_id: str, lease_id: str) -> None:
+        # handed back on purpose, so this lease doesn't count as a failed attempt
+        await self._run(
+            self.connection.execute,
+            "UPDATE broker_jobs "
+            "SET worker_id = NULL, lease_id = NULL, lease_expires_at = NULL, "
+            "attempts = attempts - 1 "
+            "WHERE id = ? AND lease_id = ?",
+            (job_id, lease_id),
+        )
+
+    async def release_worker_jobs(self, worker_id: str) -> List[str]:
+        def release() -> List[str]:
+            rows = self.connection.execute(
+                "UPDATE broker_jobs "
+                "SET worker_id = NULL, lease_id = NULL, lease_expires_at = NULL "
+                "WHERE worker_id = ? RETURNING id",
+                (worker_id,),
+            ).fetchall()
+            return [row["id"] for row in rows]
+
+        return await self._run(release)
+
+    async def has_job(self, job_id: str) -> bool:
+        def find() -> bool:
+            row = self.connection.execute(
+                "SELECT 1 FROM broker_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            return row is not None
+
+        return await self._run(find)
@@ -1,21 +1,41 @@
+import asyncio
 import logging
 import os
+import time
 from typing import List
 
 from cachetools import TTLCache
 from telegram import Bot, ChatMember
 from telegram.error import TelegramError
 
+from app.metrics import PERMISSION_CHECKS, PERMISSION_LOOKUP_SECONDS
+
 MEMBER_LIST_CACHE_TIME_SECONDS = 300  # 5 minutes
+NON_MEMBER_CACHE_TIME_SECONDS = 60  # short, so a user who just joined isn't kept out for long
 
 
 class TelegramPermissionChecker:
+    """One instance per bot, so membership answers are cached across messages.
+
+    Users listed in TELEGRAM_ALLOWED_IDS are allowed without API calls. Anyone
+    else is looked up in all allowed groups concurrently; both answers are
+    cached, and concurrent lookups for the same user share one set of calls.
+    """
+
     def __init__(self, bot: Bot):
         self.bot: Bot = bot
         self.always_allowed_chat_ids: List[int] = self.get_always_allowed_chat_ids()
         self.temporary_allowed_user_ids: TTLCache = TTLCache(
             maxsize=10000, ttl=MEMBER_LIST_CACHE_TIME_SECONDS
         )
+        self.temporary_denied_user_ids: TTLCache = TTLCache(
+            maxsize=10000, ttl=NON_MEMBER_CACHE_TIME_SECONDS
+        )
+        self.pending_lookups: dict[int, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.api_calls = 0
+        self.total_lookup_time_s = 0.0
 
     @staticmethod
     def get_always_allowed_chat_ids() -> List[int]:
@@ -35,23 +55,88 @@ class TelegramPermissionChecker:
         return group_id in self.always_allowed_chat_ids
 
     async def is_user_allowed(self, user_id: int) -> bool:
+        if user_id in self.always_allowed_chat_ids:
+            self._count_check("hit")
+            return True
         if user_id in self.temporary_allowed_user_ids:
+            self._count_check("hit")
             return True
+        if user_id in self.temporary_denied_user_ids:
+            self._count_check("hit")
+            return False
+
+        lookup = self.pending_lookups.get(user_id)
+        if lookup is None:
+            self._count_check("miss")
+            lookup = asyncio.create_task(self._look_up_user(user_id))
+            self.pending_lookups[user_id] = lookup
+            lookup.add_done_callback(lambda _: self.pending_lookups.pop(user_id, None))
+        else:
+            self._count_check("coalesced")
 
-        for chat_id in self.always_allowed_chat_ids:
-            if await self.is_user_in_group(user_id, chat_id):
-                self.temporary_allowed_user_ids[user_id] = True
-                return True
+        # one waiter giving up must not cancel the lookup for the others
+        return await asyncio.shield(lookup)
 
-        return False
+    def _count_check(self, result: str) -> None:
+        if result == "miss":
+            self.misses += 1
+        else:
+            self.hits += 1
+        PERMISSION_CHECKS.labels(result).inc()
+
+    async def _look_up_user(self, user_id: int) -> bool:
+        group_ids = [chat_id for chat_id in self.always_allowed_chat_ids if chat_id < 0]
+        started_at = time.perf_counter()
+        lookups = [
+            asyncio.create_task(self.is_user_in_group(user_id, group_id))
+            for group_id in group_ids
+        ]
+        decision = False
+        failed = False
+
+        try:
+            for lookup in asyncio.as_completed(lookups):
+                is_member = await lookup
+                if is_member:
+                    decision = True
+                    break
+                if is_member is None:
+                    failed = True
+        finally:
+            for lookup in lookups:
+                lookup.cancel()
+            lookup_time_s = time.perf_counter() - started_at
+            self.total_lookup_time_s += lookup_time_s
+            PERMISSION_LOOKUP_SECONDS.observe(lookup_time_s)
 
-    async def is_user_in_group(self, user_id: int, group_id: int) -> bool:
+        if decision:
+            self.temporary_allowed_user_ids[user_id] = True
+        elif not failed:
+            # an API error is not a "no", so it is asked again next time
+            self.temporary_denied_user_ids[user_id] = True
+
+        return decision
+
+    async def is_user_in_group(self, user_id: int, group_id: int) -> bool | None:
+        self.api_calls += 1
         try:
             chat_member: ChatMember = await self.bot.get_chat_member(group_id, user_id)
         except TelegramError as e:
             logging.exception(
                 f"Failed to get chat member for user {user_id} in group {group_id}:\n{e}"
             )
-            return False
+            return None
 
         return chat_member.status in ["creator", "administrator", "member"]
+
+    def get_stats(self) -> dict:
+        checks = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / checks if checks else 0.0,
+            "api_calls": self.api_calls,
+            "average_lookup_time_s": (
+                self.total_lookup_time_s / self.misses if self.misses else 0.0
+            ),
+        }
@@ -1,3 +1,7 @@
+import asyncio
+import logging
+import time
+
 from telegram import Update, Bot
 from telegram.ext import (
     MessageHandler,
@@ -8,17 +12,71 @@ from telegram.ext import (
     Application,
     CallbackContext,
 )
+from app.ChatOrderedUpdateProcessor import ChatOrderedUpdateProcessor
+from app.InstrumentedHTTPXRequest import InstrumentedHTTPXRequest
+from app.JobBroker import JobBroker, create_job_broker
+from app.JobScheduler import JobScheduler
+from app.JobStore import JobStore
+from app.ScratchSpace import ScratchSpace
+from app.TelegramPermissionChecker import TelegramPermissionChecker
 from app.TelegramTask import TelegramTask
-from app.config import TELEGRAM_BASE_URL, TELEGRAM_BASE_FILE_URL
+from app.Transcriber import Transcriber, create_transcriber
+from app.TranscriptionCache import TranscriptionCache
+from app.TranscriptionWorker import TranscriptionWorker
+from app.VadModelRegistry import VadModelRegistry
+from app.metrics import JOBS_IN_FLIGHT, JOBS_QUEUED, start_metrics_server
+from app.worker_pool import run_in_thread, shutdown_worker_pools
+from app.config import (
+    MAX_CONCURRENT_UPDATES,
+    PREWARM,
+    SERVICE_ROLE,
+    SERVING_MODE,
+    TELEGRAM_BASE_URL,
+    TELEGRAM_BASE_FILE_URL,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET_TOKEN,
+    WEBHOOK_URL,
+)
 
 
 class TelegramService:
-    def __init__(self, telegram_api_token: str, local_mode: bool):
+    def __init__(
+        self, telegram_api_token: str, local_mode: bool, role: str = SERVICE_ROLE
+    ):
+        if role not in ["all", "frontend", "worker"]:
+            raise ValueError(f"Unknown service role: {role}")
+
         self.TELEGRAM_API_TOKEN: str = telegram_api_token
+        self.role: str = role
         self.application: Application = self._build_application(
             telegram_api_token=self.TELEGRAM_API_TOKEN, local_mode=local_mode
         )
         self.bot: Bot = self.application.bot
+        self.permission_checker: TelegramPermissionChecker = TelegramPermissionChecker(
+            self.bot
+        )
+        # The front-end never transcribes, so it doesn't load a model.
+        self.transcriber: Transcriber | None = (
+            create_transcriber() if role != "frontend" else None
+        )
+        self.job_broker: JobBroker | None = (
+            create_job_broker() if role != "all" else None
+        )
+        self.transcription_cache: TranscriptionCache = TranscriptionCache()
+        self.job_store: JobStore = JobStore()
+        self.scratch_space: ScratchSpace = ScratchSpace()
+        self.sweeper_task: asyncio.Task | None = None
+        self.prewarm_task: asyncio.Task | None = None
+        self.resumed_tasks: set[asyncio.Task] = set()
+        self.scheduler: JobScheduler = JobScheduler()
+        JOBS_QUEUED.set_function(lambda: self.scheduler.queue_depth)
+        JOBS_IN_FLIGHT.set_function(lambda: self.scheduler.running_jobs)
+        if role == "all":
+            # workers resume their own jobs, see TranscriptionWorker.recover
+            self.application.post_init = self._post_init
+        self.application.post_shutdown = self._post_shutdown
 
     @staticmethod
     def _build_application(telegram_api_token: str, local_mode: bool) -> Application:
@@ -32,10 +90,15 @@ class TelegramService:
         else:
             application_builder.local_mode(False)
 
-        application_builder.read_timeout(30)
-        application_builder.write_timeout(30)
-        application_builder.connect_timeout(30)
-        application_builder.pool_timeout(30)
+        application_builder.request(
+            InstrumentedHTTPXRequest(
+                connection_pool_size=256,
+                read_timeout=30,
+                write_timeout=30,
+                connect_timeout=30,
+                pool_timeout=30,
+            )
+        )
 
         rate_limiter = AIORateLimiter(
             overall_max_rate=30,
@@ -46,10 +109,74 @@ class TelegramService:
         )
 
         application_builder.rate_limiter(rate_limiter)
+        application_builder.concurrent_updates(
+            ChatOrderedUpdateProcessor(MAX_CONCURRENT_UPDATES)
+        )
         application: Application = application_builder.build()
 
         return application
 
+    def _create_task(self, update: Update) -> TelegramTask:
+        return TelegramTask(
+            self.bot,
+            update,
+            self.permission_checker,
+            self.transcriber,
+            self.transcription_cache,
+            self.job_store,
+            self.scratch_space,
+        )
+
+    async def _post_init(self, application: Application) -> None:
+        removed_folders = self.scratch_space.sweep(self.job_store, min_age_s=0)
+        if removed_folders:
+            logging.info(f"Removed {removed_folders} orphaned job folders")
+        self.sweeper_task = asyncio.create_task(
+            self.scratch_space.run_sweeper(self.job_store)
+        )
+        # polling starts right after this hook returns, the models load meanwhile
+        self._start_prewarm()
+
+        for job in self.job_store.get_unfinished_jobs():
+            update = Update.de_json(job["update"], self.bot)
+            logging.info(f"Resuming job {job['id']} from stage {job['stage']}")
+            # The application isn't running yet, so it wouldn't track this task.
+            resumed_task = asyncio.create_task(
+                self._schedule_media_task(self._create_task(update))
+            )
+            self.resumed_tasks.add(resumed_task)
+            resumed_task.add_done_callback(self.resumed_tasks.discard)
+
+    def _start_prewarm(self) -> None:
+        if PREWARM:
+            self.prewarm_task = asyncio.create_task(self._prewarm())
+
+    async def _prewarm(self) -> None:
+        """Loads VAD and the transcriber in the background, so startup doesn't wait."""
+        for warm_up in [VadModelRegistry.warm_up, self.transcriber.warm_up]:
+            started_at = time.perf_counter()
+            try:
+                await run_in_thread(warm_up)
+            except Exception as e:
+                # loaded again on first use, which reports the error to the user
+                logging.warning(f"Pre-warming failed: {e}")
+                continue
+            logging.info(
+                f"Pre-warmed {warm_up.__qualname__} in {time.perf_counter() - started_at:.1f}s"
+            )
+
+    async def _post_shutdown(self, application: Application) -> None:
+        if self.sweeper_task:
+            self.sweeper_task.cancel()
+        if self.transcriber:
+            await self.transcriber.aclose()
+        if self.job_broker:
+            await self.job_broker.aclose()
+        self.transcription_cache.close()
+        self.job_store.close()
+        logging.info(f"Transcription cache: {self.transcription_cache.get_stats()}")
+        logging.info(f"Permission checks: {self.permission_checker.get_stats()}")
+
     def setup_handlers(self):
         start_handler = CommandHandler("start", self._handle_start_command)
 
@@ -68,34 +195,116 @@ class TelegramService:
             | filters.VIDEO_NOTE
             | filters.Document.ALL,
             self._handle_media,
+            # Media jobs wait in the scheduler, they must not block other updates.
+            block=False,
         )
 
         self.application.add_handlers(
             [start_handler, media_handler] # ,text_handler, forwarded_handler]
         )
 
-        self.application.run_polling()
+        start_metrics_server()
+
+        try:
+            self._run(SERVING_MODE)
+        finally:
+            shutdown_worker_pools()
+
+    def run_worker(self) -> None:
+        """Runs media jobs from the broker until interrupted, instead of serving updates."""
+        start_metrics_server()
+
+        try:
+            asyncio.run(self._run_worker())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            shutdown_worker_pools()
+
+    async def _run_worker(self) -> None:
+        worker = TranscriptionWorker(
+            self.bot,
+            self.job_broker,
+            self.scheduler,
+            self.job_store,
+            self.scratch_space,
+            self._create_task,
+        )
+        # initializes the bot and its rate limiter, no updates are fetched
+        async with self.application:
+            self._start_prewarm()
+            try:
+                await worker.run()
+            finally:
+                await self._post_shutdown(self.application)
+
+    def _run(self, serving_mode: str) -> None:
+        if serving_mode == "polling":
+            self.application.run_polling()
+        elif serving_mode == "webhook":
+            if not WEBHOOK_URL:
+                raise RuntimeError("WEBHOOK_URL is not set")
+            # Telegram delivers updates to WEBHOOK_URL, the reverse proxy forwards them here
+            self.application.run_webhook(
+                listen=WEBHOOK_LISTEN,
+                port=WEBHOOK_PORT,
+                url_path=WEBHOOK_PATH,
+                webhook_url=WEBHOOK_URL,
+                secret_token=WEBHOOK_SECRET_TOKEN,
+                # Telegram accepts 1 to 100
+                max_connections=min(MAX_CONCURRENT_UPDATES, 100),
+            )
+        else:
+            raise ValueError(f"Unknown serving mode: {serving_mode}")
 
     async def _handle_start_command(self, update: Update, context: CallbackContext):
-        task = TelegramTask(self.bot, update)
+        task = self._create_task(update)
         if await task.is_allowed():
             await task.handle_start_command()
 
     async def _handle_text_message(
         self, update: Update, context: CallbackContext
     ) -> None:
-        task = TelegramTask(self.bot, update)
+        task = self._create_task(update)
         if await task.is_allowed():
             await task.handle_text_message()
 
     async def _handle_forwarded_message(
         self, update: Update, context: CallbackContext
     ) -> None:
-        task = TelegramTask(self.bot, update)
+        task = self._create_task(update)
         if await task.is_allowed():
             await task.handle_forwarded_message()
 
     async def _handle_media(self, update: Update, context: CallbackContext) -> None:
-        task = TelegramTask(self.bot, update)
-        if await task.is_allowed():
-            await task.handle_media()
+        task = self._create_task(update)
+        if not await task.is_allowed():
+            return
+
+        if self.role == "frontend":
+            await self._enqueue_media_task(task)
+        else:
+            await self._schedule_media_task(task)
+
+    async def _enqueue_media_task(self, task: TelegramTask) -> None:
+        await task.set_first_reply("⏳ Waiting for a transcription worker...", immediately=True)
+        await self.job_broker.enqueue(
+            job_id=task.get_job_id(),
+            chat_id=task.user_message.chat.id,
+            user_id=task.user.id,
+            audio_duration_s=task.get_expected_audio_duration_s(),
+            payload={
+                "update": task.update.to_dict(),
+                # the worker keeps editing this status message
+                "status_message": task.progress.status_message.to_dict(),
+            },
+        )
+
+    async def _schedule_media_task(self, task: TelegramTask) -> None:
+        await self.scheduler.run(
+            chat_id=task.user_message.chat.id,
+            user_id=task.user.id,
+            audio_duration_s=task.get_expected_audio_duration_s(),
+            job=task.handle_media,
+            on_queued=task.report_queue_position,
+        )
@@ -1,49 +1,89 @@
+import asyncio
+import logging
+import os
+from typing import List
+
 from telegram import Message, Update, Bot, User
 from telegram.constants import MessageLimit
 
+from app.ChunkTranscriptionPipeline import (
+    ChunkTranscriptionPipeline,
+    ChunkTranscriptionError,
+)
+from app.JobStore import JobStore
+from app.LongAudioPipeline import LongAudioPipeline
+from app.PcmStore import PCM_SAMPLE_WIDTH_BYTES, PcmStore
+from app.ProgressReporter import ProgressReporter
+from app.ScratchSpace import JobScratch, ScratchSpace
 from app.TelegramPermissionChecker import TelegramPermissionChecker
-from app.WhisperTranscriber import WhisperTranscriber
-from app.chunk_processor import (
-    detect_timestamps,
-    calculate_chunks,
-    split_audio_into_chunks,
+from app.TranscriptionCache import TranscriptionCache
+from app.Transcriber import Transcriber
+from app.config import (
+    CONTENT_HASH_MIN_FILE_SIZE_BYTES,
+    DATA_DIR,
+    MAX_CHUNK_DURATION_S,
+    MAX_CONCURRENT_CHUNKS,
+    CHUNK_TRANSCRIPTION_RETRIES,
+    TRANSCRIPTION_PREVIEW_CHARS,
+    UNKNOWN_AUDIO_DURATION_ESTIMATE_S,
+    WAV_SAMPLING_RATE,
+)
+from app.metrics import (
+    AUDIO_SECONDS_PROCESSED,
+    get_audio_length_label,
+    measure_stage,
+)
+from app.file_downloader import stream_to_file, link_local_file
+from app.media_converter import (
+    get_duration,
+    transcode_audio,
+    try_probe_media,
 )
-from app.config import DATA_DIR, MAX_CHUNK_DURATION_S, TRANSCRIPTION_PREVIEW_CHARS
-from app.media_converter import convert_to_mp3, convert_to_pcm_wav, get_duration
 from app.models.MediaFileModel import MediaFileModel
 from app.models.UserModel import UserModel
+from app.transcode_planner import SIZE_HEADROOM, TranscodePlan, plan_transcode
+from app.worker_pool import run_in_process, run_in_thread
 
 
 class TelegramTask:
-    def __init__(self, bot: Bot, update: Update):
+    def __init__(
+        self,
+        bot: Bot,
+        update: Update,
+        permission_checker: TelegramPermissionChecker,
+        transcriber: Transcriber,
+        transcription_cache: TranscriptionCache,
+        job_store: JobStore,
+        scratch_space: ScratchSpace,
+    ):
         self.bot: Bot = bot
+        self.update: Update = update
+        self.permission_checker: TelegramPermissionChecker = permission_checker
+        self.job_store: JobStore = job_store
+        self.job_id: str | None = None
+        self.job: dict | None = None
+        self.transcriber: Transcriber = transcriber
+        self.transcription_cache: TranscriptionCache = transcription_cache
+        self.scratch_space: ScratchSpace = scratch_space
+        self.scratch: JobScratch | None = None
         self.user: User = update.effective_user
         self.user_message: Message = update.message
-        self.first_reply: Message | None = None
-
-    async def set_first_reply(self, reply_text: str) -> None:
-        if self.first_reply:
-            await self.first_reply.edit_text(reply_text)
-            return
-
-        if self.user_message is None:
-            raise RuntimeError("⚠️ User message is not set.")
+        self.progress: ProgressReporter = ProgressReporter(self.user_message)
 
-        self.first_reply = await self.user_message.reply_text(reply_text, quote=True)
+    async def set_first_reply(self, reply_text: str, immediately: bool = False) -> None:
+        await self.progress.set_status(reply_text, immediately)
 
     async def delete_first_reply(self) -> None:
-        if self.first_reply:
-            await self.first_reply.delete()
+        await self.progress.delete_status()
 
     async def is_allowed(self) -> bool:
         await self.set_first_reply("🔑 Checking permissions...")
 
         user_id: int = self.user_message.from_user.id
         chat_id: int = self.user_message.chat.id
-        permission_checker = TelegramPermissionChecker(self.bot)
 
         if user_id == chat_id:
-            decision: bool = await permission_checker.is_user_allowed(user_id)
+            decision: bool = await self.permission_checker.is_user_allowed(user_id)
 
             if decision is False:
                 await self.set_first_reply(
@@ -53,7 +93,7 @@ class TelegramTask:
                     f"Your user ID: {user_id}"
                 )
         else:
-            decision: bool = await permission_checker.is_group_allowed(chat_id)
+            decision: bool = await self.permission_checker.is_group_allowed(chat_id)
 
             if decision is False:
                 await self.set_first_reply(
@@ -81,7 +121,66 @@ class TelegramTask:
             "⚠️ I don't know how to work with forwarded messages yet."
         )
 
-    async def download_file(self, media_file: MediaFileModel) -> None:
+    def get_job_id(self) -> str:
+        # message IDs are only unique within a chat, the same user writes in several
+        user_message = self.user_message
+        return f"{user_message.from_user.id}/{user_message.chat.id}_{user_message.message_id}"
+
+    def get_expected_audio_duration_s(self) -> int:
+        user_message = self.user_message
+        for media in [
+            user_message.audio,
+            user_message.voice,
+            user_message.video,
+            user_message.video_note,
+        ]:
+            if media is not None and media.duration is not None:
+                return media.duration
+
+        return UNKNOWN_AUDIO_DURATION_ESTIMATE_S
+
+    def get_expected_scratch_bytes(self) -> int:
+        """The download plus its decoded samples, the largest files of a job."""
+        user_message = self.user_message
+        file_size = 0
+        for media in [
+            user_message.audio,
+            user_message.voice,
+            user_message.video,
+            user_message.video_note,
+            user_message.document,
+        ]:
+            if media is not None and media.file_size is not None:
+                file_size = media.file_size
+
+        pcm_size = (
+            self.get_expected_audio_duration_s() * WAV_SAMPLING_RATE * PCM_SAMPLE_WIDTH_BYTES
+        )
+        return file_size + pcm_size
+
+    @staticmethod
+    def _estimate_file_size(
+        media_file: MediaFileModel, transcode_plan: TranscodePlan, duration_s: float
+    ) -> int:
+        if transcode_plan.bit_rate is None:
+            # a stream copy is at most as big as the original
+            return os.path.getsize(media_file.original_file_location)
+        return int(transcode_plan.bit_rate / 8 * duration_s * SIZE_HEADROOM)
+
+    async def report_waiting_for_disk_space(self) -> None:
+        await self.set_first_reply("💾 Waiting for disk space...")
+
+    def measure_stage(self, stage: str, media_file: MediaFileModel):
+        return measure_stage(
+            stage,
+            media_file.original_file_type,
+            get_audio_length_label(media_file.original_file_duration_s),
+        )
+
+    async def report_queue_position(self, position: int) -> None:
+        await self.set_first_reply(f"⏳ Waiting in the queue, position {position}...")
+
+    async def download_file(self, media_file: MediaFileModel) -> bool:
         await self.set_first_reply(f"📥 Downloading {media_file.original_file_type}...")
 
         try:
@@ -92,100 +191,257 @@ class TelegramTask:
                 f"⚠️ Error getting file info:\n{e}\n\n"
                 f"File ID:\n{media_file.original_file_id}"
             )
-            return
+            return False
+
+        media_file.original_file_extension = file.file_path.split(".")[-1]
+        original_file_location = media_file.prepare_original_file_location()
 
         try:
-            file_contents = await file.download_as_bytearray()
+            if self.bot.local_mode and os.path.isfile(file.file_path):
+                link_local_file(file.file_path, original_file_location)
+            else:
+                await stream_to_file(file.file_path, original_file_location)
         except Exception as e:
             media_file.destroy()
             await self.set_first_reply(
                 f"⚠️ Error downloading file:\n{e}\n\n"
                 f"File ID:\n{media_file.original_file_id}"
             )
-            return
+            return False
 
-        media_file.original_file_extension = file.file_path.split(".")[-1]
-
-        try:
-            media_file.save_user_media(file_contents)
-        except Exception as e:
-            media_file.destroy()
-            await self.set_first_reply(f"⚠️ Error saving file:\n{e}")
-            return
+        return True
 
     async def handle_media(self) -> None:
         user_message = self.user_message
         user_id = user_message.from_user.id
+        self.job_id = self.get_job_id()
         user_model = UserModel(user_id, DATA_DIR)
         user_model.save_user_info(self.user)
 
-        media_file = MediaFileModel(user_id, user_message.message_id, DATA_DIR)
+        media_file = MediaFileModel(
+            user_id, user_message.chat.id, user_message.message_id, DATA_DIR
+        )
         if user_message.audio is not None:
             media_file.original_file_id = user_message.audio.file_id
+            media_file.original_file_unique_id = user_message.audio.file_unique_id
             media_file.original_file_duration_s = user_message.audio.duration
             media_file.original_file_type = "audio"
         elif user_message.voice is not None:
             media_file.original_file_id = user_message.voice.file_id
+            media_file.original_file_unique_id = user_message.voice.file_unique_id
             media_file.original_file_duration_s = user_message.voice.duration
             media_file.original_file_type = "voice"
         elif user_message.video is not None:
             media_file.original_file_id = user_message.video.file_id
+            media_file.original_file_unique_id = user_message.video.file_unique_id
             media_file.original_file_duration_s = user_message.video.duration
             media_file.original_file_type = "video"
         elif user_message.video_note is not None:
             media_file.original_file_id = user_message.video_note.file_id
+            media_file.original_file_unique_id = user_message.video_note.file_unique_id
             media_file.original_file_duration_s = user_message.video_note.duration
             media_file.original_file_type = "video note"
         elif user_message.document is not None:
             media_file.original_file_id = user_message.document.file_id
+            media_file.original_file_unique_id = user_message.document.file_unique_id
             media_file.original_file_duration_s = None
             media_file.original_file_type = "document"
 
-        await self.download_file(media_file)
+        self.job = self.job_store.get_or_create_job(
+            self.job_id, self.update.to_dict(), media_file.folder
+        )
+
+        cancelled = False
+        try:
+            # removes the job's files however it ends, unless it is cancelled
+            async with self.scratch_space.open_job(
+                media_file,
+                self.get_expected_scratch_bytes(),
+                on_wait=self.report_waiting_for_disk_space,
+            ) as self.scratch:
+                await self._process_media(media_file)
+        except asyncio.CancelledError:
+            # Keep the job, so it is resumed after a restart.
+            cancelled = True
+            raise
+        finally:
+            if not cancelled:
+                self.job_store.finish_job(self.job_id)
+                await self.progress.close()
+
+    async def _process_media(self, media_file: MediaFileModel) -> None:
+        cached_transcriptions = self.transcription_cache.get_by_file_unique_id(
+            media_file.original_file_unique_id
+        )
+        if cached_transcriptions is not None:
+            await self._reply_with_transcription(media_file, cached_transcriptions)
+            return
+
+        if JobStore.has_reached_stage(self.job, "downloaded") and os.path.exists(
+            self.job["original_file_location"]
+        ):
+            media_file.original_file_location = self.job["original_file_location"]
+            await self.set_first_reply(f"♻️ Resuming {media_file.original_file_type}...")
+        else:
+            with self.measure_stage("download", media_file):
+                downloaded = await self.download_file(media_file)
+            if not downloaded:
+                return
+            self.job_store.update_job(
+                self.job_id,
+                stage="downloaded",
+                original_file_location=media_file.original_file_location,
+            )
+
+        if media_file.original_file_duration_s is None:
+            media_file.original_file_duration_s = self.job["duration_s"]
 
         if media_file.original_file_duration_s is None:
             try:
-                media_file.original_file_duration_s = get_duration(
-                    media_file.original_file_location
-                )
+                with self.measure_stage("probe", media_file):
+                    media_file.original_file_duration_s = await run_in_thread(
+                        get_duration, media_file.original_file_location
+                    )
             except Exception as e:
                 await self.set_first_reply(
                     f"⚠️ Error getting duration of audio in the document:\n{e}"
                 )
                 return
+            self.job_store.update_job(
+                self.job_id, duration_s=media_file.original_file_duration_s
+            )
+
+        is_long = media_file.original_file_duration_s > MAX_CHUNK_DURATION_S
+        content_hash = None
+        # A short recording goes straight to the transcriber, decoding it only for the
+        # hash would cost more than a cache hit saves, unless the upload is big
+        if is_long or (
+            os.path.getsize(media_file.original_file_location)
+            >= CONTENT_HASH_MIN_FILE_SIZE_BYTES
+        ):
+            content_hash = await self._decode_audio(media_file)
+            cached_transcriptions = self.transcription_cache.get_by_content_hash(
+                content_hash
+            )
+            if cached_transcriptions is not None:
+                await self._reply_with_transcription(media_file, cached_transcriptions)
+                return
 
-        if media_file.original_file_duration_s <= MAX_CHUNK_DURATION_S:
-            await self._transcribe_short_audio(media_file)
+        if is_long:
+            transcriptions = await self._transcribe_long_audio(media_file)
         else:
-            await self._transcribe_long_audio(media_file)
+            transcriptions = await self._transcribe_short_audio(media_file)
+
+        if transcriptions:
+            AUDIO_SECONDS_PROCESSED.labels(
+                media_file.original_file_type,
+                get_audio_length_label(media_file.original_file_duration_s),
+            ).inc(media_file.original_file_duration_s)
+            self.transcription_cache.put(
+                media_file.original_file_unique_id, content_hash, transcriptions
+            )
+
+    async def _decode_audio(self, media_file: MediaFileModel) -> str | None:
+        """Decodes the recording into its PcmStore and returns the content hash."""
+        # tmpfs when RAM allows; found again where it is when the job resumes
+        media_file.pcm_file = self.scratch.stage(
+            "audio.s16le",
+            self.get_expected_audio_duration_s() * WAV_SAMPLING_RATE * PCM_SAMPLE_WIDTH_BYTES,
+        )
+
+        content_hash = self.job["content_hash"]
+        if content_hash is None:
+            try:
+                # decoded once here, VAD and chunk encoding read the samples later
+                with self.measure_stage("decode", media_file):
+                    content_hash = await run_in_process(
+                        PcmStore(media_file.pcm_file).write,
+                        media_file.original_file_location,
+                    )
+            except Exception as e:
+                logging.warning(
+                    f"Failed to decode {media_file.original_file_location}: {e}"
+                )
+            else:
+                self.job_store.update_job(self.job_id, content_hash=content_hash)
+
+        return content_hash
+
+    async def _reply_with_transcription(
+        self, media_file: MediaFileModel, transcriptions: List[str]
+    ) -> None:
+        transcription = "\n\n".join(transcriptions)
 
-        media_file.destroy()
+        if len(transcription) <= MessageLimit.MAX_TEXT_LENGTH:
+            await self.set_first_reply(transcription, immediately=True)
+            return
+
+        media_file.create_folder()
+        media_file.save_transcription(transcriptions)
+
+        await self.delete_first_reply()
+        await self.user_message.reply_document(
+            document=open(media_file.transcription_file, "rb"),
+            caption=transcription[:TRANSCRIPTION_PREVIEW_CHARS] + "...",
+            quote=True,
+        )
+
+    async def _plan_transcode(
+        self, media_file: MediaFileModel, duration_s: float
+    ) -> TranscodePlan:
+        probe = await run_in_thread(try_probe_media, media_file.original_file_location)
+        return plan_transcode(
+            probe,
+            duration_s,
+            self.transcriber.supported_extensions,
+            self.transcriber.max_file_size_bytes,
+        )
 
-    async def _transcribe_short_audio(self, media_file: MediaFileModel):
+    async def _transcribe_short_audio(
+        self, media_file: MediaFileModel
+    ) -> List[str] | None:
         original_file_location = media_file.original_file_location
-        if WhisperTranscriber.validate_file(original_file_location):
+        if self.transcriber.validate_file(original_file_location):
             audio_source = original_file_location
         else:
-            await self.set_first_reply("🎛️ Converting audio to MP3...")
-            mp3_file_location = media_file.mp3_file
+            transcode_plan = await self._plan_transcode(
+                media_file, media_file.original_file_duration_s
+            )
+            converted_file_location = self.scratch.stage(
+                os.path.basename(media_file.get_converted_location(transcode_plan.extension)),
+                self._estimate_file_size(
+                    media_file, transcode_plan, media_file.original_file_duration_s
+                ),
+            )
+            await self.set_first_reply(
+                f"🎛️ {'Extracting' if transcode_plan.is_copy else 'Converting'} "
+                f"audio to {transcode_plan.extension.upper()}..."
+            )
 
             try:
-                convert_to_mp3(original_file_location, mp3_file_location)
+                with self.measure_stage("convert", media_file):
+                    await run_in_process(
+                        transcode_audio,
+                        original_file_location,
+                        converted_file_location,
+                        transcode_plan.output_options,
+                    )
             except Exception as e:
-                await self.set_first_reply(f"⚠️ Error converting file to MP3: {e}")
+                await self.set_first_reply(f"⚠️ Error converting audio: {e}")
                 return
 
-            if WhisperTranscriber.validate_file(mp3_file_location):
-                audio_source = mp3_file_location
+            if self.transcriber.validate_file(converted_file_location):
+                audio_source = converted_file_location
             else:
                 await self.set_first_reply(
-                    "⚠️ Converted MP3 file is still not valid for Whisper."
+                    "⚠️ Converted audio is still not valid for Whisper."
                 )
                 return
 
         await self.set_first_reply("✍️ Transcribing audio with Whisper...")
         try:
-            transcription = WhisperTranscriber.transcribe_audio(audio_source)
+            with self.measure_stage("transcribe", media_file):
+                transcription = await self.transcriber.transcribe(audio_source)
         except Exception as e:
             await self.set_first_reply(f"⚠️ Error transcribing audio:\n{e}")
             return
@@ -194,84 +450,80 @@ class TelegramTask:
             await self.set_first_reply("⚠️ Transcription is empty.")
             return
 
-        media_file.save_transcription([transcription])
+        with self.measure_stage("reply", media_file):
+            await self._reply_with_transcription(media_file, [transcription])
 
-        if len(transcription) > MessageLimit.MAX_TEXT_LENGTH:
-            await self.delete_first_reply()
-            await self.user_message.reply_document(
-                document=open(media_file.transcription_file, "rb"),
-                caption=transcription[:TRANSCRIPTION_PREVIEW_CHARS] + "...",
-                quote=True,
-            )
-        else:
-            await self.set_first_reply(transcription)
-
-    async def _transcribe_long_audio(self, media_file: MediaFileModel):
-        transcriptions = []
+        return [transcription]
 
-        await self.set_first_reply("🎛️ Converting audio to WAV (PCM)...")
-        original_file_location = media_file.original_file_location
-        pcm_wav_file_location = media_file.pcm_wav_file
-
-        try:
-            convert_to_pcm_wav(original_file_location, pcm_wav_file_location)
-        except Exception as e:
-            await self.set_first_reply(f"⚠️ Error converting file to WAV (PCM): {e}")
-            return
-
-        await self.set_first_reply("🔍 Detecting speech...")
-        try:
-            silero_timestamps = detect_timestamps(pcm_wav_file_location)
-        except Exception as e:
-            await self.set_first_reply(f"⚠️ Error detecting speech: {e}")
-            return
-
-        chunks = calculate_chunks(
-            silero_timestamps, media_file.original_file_duration_s
+    async def _transcribe_long_audio(
+        self, media_file: MediaFileModel
+    ) -> List[str] | None:
+        await self.set_first_reply(
+            "🎛️ Detecting speech and transcribing chunks as they are cut:"
         )
-        chunks_found = len(chunks)
 
-        await self.set_first_reply(f"✂️ Splitting audio in {chunks_found} chunks...")
-        try:
-            split_audio_into_chunks(chunks, media_file)
-        except Exception as e:
-            await self.set_first_reply(f"⚠️ Error splitting audio: {e}")
-            return
-
-        await self.set_first_reply(f"Transcribing {chunks_found} chunks:")
-
-        for i in range(chunks_found):
-            chunk_path = media_file.get_chunk_location(i)
-            with open(chunk_path, "rb") as audio:
-                await self.user_message.reply_audio(
-                    audio=audio,
-                    title=f"Chunk {i + 1} of {chunks_found}",
-                    performer="Transcription",
-                    disable_notification=True,
-                    reply_to_message_id=None,
-                )
-
-            chunk_message = await self.user_message.reply_text(
-                text=f"✍️ Transcribing chunk {i + 1} of {chunks_found}...",
-                disable_notification=True,
-                reply_to_message_id=None,
-            )
+        transcode_plan = await self._plan_transcode(media_file, MAX_CHUNK_DURATION_S)
+        # chunks are removed once reported, and the pipeline doesn't cut more
+        # than MAX_CONCURRENT_CHUNKS + 1 ahead of the reported ones
+        media_file.chunks_folder = self.scratch.stage(
+            "chunks",
+            (MAX_CONCURRENT_CHUNKS + 1)
+            * self._estimate_file_size(media_file, transcode_plan, MAX_CHUNK_DURATION_S),
+        )
+        os.makedirs(media_file.chunks_folder, exist_ok=True)
+
+        pipeline = LongAudioPipeline(
+            media_file,
+            ChunkTranscriptionPipeline(
+                transcribe=self.transcriber.transcribe,
+                # retry layers multiply, a backend that retries itself is called once
+                max_retries=(
+                    1 if self.transcriber.retries_itself else CHUNK_TRANSCRIPTION_RETRIES
+                ),
+            ),
+            transcode_plan,
+        )
 
+        completed = self.job_store.get_chunk_transcriptions(self.job_id)
+        # the document grows in chunk order, so it is ready with the last chunk
+        document = media_file.open_transcription_writer()
+
+        def write_paragraphs(texts: dict[int, str], until: int) -> None:
+            while document.paragraphs_count < until:
+                document.add_paragraph(texts[document.paragraphs_count])
+
+        async def on_chunk_done(i: int, transcription: str) -> None:
+            # chunks done before a restart are not reported again
+            write_paragraphs(completed, until=i)
+            document.add_paragraph(transcription)
+            chunk_location = pipeline.get_chunk_location(i)
+            await self.progress.add_chunk_text(transcription, chunk_location)
+            os.remove(chunk_location)
+            self.job_store.save_chunk_transcription(self.job_id, i, transcription)
+            await self.set_first_reply(f"✍️ Transcribed {i + 1} chunks...")
+
+        with document:
             try:
-                transcription = WhisperTranscriber.transcribe_audio(chunk_path)
-            except Exception as e:
-                await chunk_message.edit_text(
-                    f"⚠️ Error transcribing chunk {i + 1} of {chunks_found}: {e}"
+                with self.measure_stage("transcribe", media_file):
+                    transcriptions = await pipeline.run(on_chunk_done, completed=completed)
+            except ChunkTranscriptionError as e:
+                await self.set_first_reply(
+                    f"⚠️ Error transcribing chunk {e.chunk_index + 1}: {e}"
                 )
                 return
+            except Exception as e:
+                await self.set_first_reply(f"⚠️ Error detecting speech or cutting audio: {e}")
+                return
 
-            transcriptions.append(transcription)
-            await chunk_message.edit_text(transcription)
+            write_paragraphs(dict(enumerate(transcriptions)), until=len(transcriptions))
+            document.finish()
 
-        media_file.save_transcription(transcriptions)
+        with self.measure_stage("reply", media_file):
+            await self.progress.flush()
+            await self.user_message.reply_document(
+                document=open(media_file.transcription_file, "rb"),
+                caption=transcriptions[0][:TRANSCRIPTION_PREVIEW_CHARS] + "...",
+                quote=True,
+            )
 
-        await self.user_message.reply_document(
-            document=open(media_file.transcription_file, "rb"),
-            caption=transcriptions[0][:TRANSCRIPTION_PREVIEW_CHARS] + "...",
-            quote=True,
-        )
+        return transcriptions
@@ -0,0 +1,42 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+from app.config import TRANSCRIBER_BACKEND
+
+
+class Transcriber(ABC):
+    """Speech-to-text backend shared by all tasks for the lifetime of the process."""
+
+    # None means any format and any size
+    supported_extensions: List[str] | None = None
+    max_file_size_bytes: int | None = None
+    # whether transcribe() retries transient failures on its own
+    retries_itself: bool = False
+
+    @abstractmethod
+    def validate_file(self, audio_file_path: str) -> bool:
+        """Whether the file can be passed to transcribe() as is, without converting it."""
+
+    @abstractmethod
+    async def transcribe(self, audio_file_path: str) -> str:
+        pass
+
+    def warm_up(self) -> None:
+        """Loads what the backend needs up front, so the first job doesn't wait for it."""
+
+    async def aclose(self) -> None:
+        pass
+
+
+def create_transcriber(backend: str = TRANSCRIBER_BACKEND) -> Transcriber:
+    if backend == "openai":
+        from app.WhisperApiClient import WhisperApiClient
+
+        return WhisperApiClient()
+    if backend == "local":
+        # faster-whisper pulls in CTranslate2, only import it when it is used
+        from app.LocalWhisperTranscriber import LocalWhisperTranscriber
+
+        return LocalWhisperTranscriber()
+
+    raise ValueError(f"Unknown transcriber backend: {backend}")
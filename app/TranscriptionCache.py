@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import List
+
+from app.config import (
+    TRANSCRIPTION_CACHE_FILE,
+    TRANSCRIPTION_CACHE_TTL_S,
+    TRANSCRIPTION_CACHE_MAX_BYTES,
+)
+
+
+class TranscriptionCache:
+    """Persistent transcription cache.
+
+    Entries are looked up by Telegram's file_unique_id first (forwarded and
+    re-sent files), then by a hash of the decoded audio (re-uploaded or remuxed
+    copies with the same audio stream).
+    Expired entries are dropped after `ttl_s`, and the least recently used ones
+    once the stored paragraphs exceed `max_bytes`. Their total size is kept in
+    `total_bytes`, so eviction only reads the entries it removes.
+    """
+
+    def __init__(
+        self,
+        database_file: str = TRANSCRIPTION_CACHE_FILE,
+        ttl_s: int = TRANSCRIPTION_CACHE_TTL_S,
+        max_bytes: int = TRANSCRIPTION_CACHE_MAX_BYTES,
+    ):
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(database_file)), exist_ok=True)
+        self.connection = sqlite3.connect(database_file)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS transcriptions (
+                id INTEGER PRIMARY KEY,
+                file_unique_id TEXT UNIQUE,
+                content_hash TEXT,
+                paragraphs TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS transcriptions_content_hash
+                ON transcriptions (content_hash);
+            CREATE INDEX IF NOT EXISTS transcriptions_last_used_at
+                ON transcriptions (last_used_at);
+            CREATE INDEX IF NOT EXISTS transcriptions_created_at
+                ON transcriptions (created_at);
+            """
+        )
+        self.total_bytes = self.connection.execute(
+            "SELECT COALESCE(SUM(size_bytes), 0) FROM transcriptions"
+        ).fetchone()[0]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def _get(self, column: str, value: str | None) -> List[str] | None:
+        if value is None:
+            return None
+
+        row = self.connection.execute(
+            f"SELECT id, paragraphs FROM transcriptions "
+            f"WHERE {column} = ? AND created_at >= ? "
+            f"ORDER BY last_used_at DESC LIMIT 1",
+            (value, time.time() - self.ttl_s),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        with self.connection:
+            self.connection.execute(
+                "UPDATE transcriptions SET last_used_at = ? WHERE id = ?",
+                (time.time(), row[0]),
+            )
+
+        return json.loads(row[1])
+
+    def _count(self, paragraphs: List[str] | None) -> List[str] | None:
+        if paragraphs is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return paragraphs
+
+    def get_by_file_unique_id(self, file_unique_id: str | None) -> List[str] | None:
+        return self._count(self._get("file_unique_id", file_unique_id))
+
+    def get_by_content_hash(self, content_hash: str | None) -> List[str] | None:
+        return self._count(self._get("content_hash", content_hash))
+
+    def put(
+        self, file_unique_id: str | None, content_hash: str | None, paragraphs: List[str]
+    ) -> None:
+        serialized_paragraphs = json.dumps(paragraphs, ensure_ascii=False)
+        size_bytes = len(serialized_paragraphs.encode())
+        now = time.time()
+
+        with self.connection:
+            if file_unique_id is not None:
+                self._remove(
+                    "DELETE FROM transcriptions WHERE file_unique_id = ? "
+                    "RETURNING size_bytes",
+                    (file_unique_id,),
+                )
+            self.connection.execute(
+                "INSERT INTO transcriptions "
+                "(file_unique_id, content_hash, paragraphs, size_bytes, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    file_unique_id,
+                    content_hash,
+                    serialized_paragraphs,
+                    size_bytes,
+                    now,
+                    now,
+                ),
+            )
+            self.total_bytes += size_bytes
+
+        self.evict()
+
+    def _remove(self, delete_query: str, parameters: tuple) -> None:
+        """Runs a DELETE ... RETURNING size_bytes and keeps `total_bytes` in step."""
+        removed = self.connection.execute(delete_query, parameters).fetchall()
+        self.total_bytes -= sum(size_bytes for size_bytes, in removed)
+
+    def evict(self) -> None:
+        with self.connection:
+            self._remove(
+                "DELETE FROM transcriptions WHERE created_at < ? RETURNING size_bytes",
+                (time.time() - self.ttl_s,),
+            )
+
+            if self.total_bytes <= self.max_bytes:
+                return
+
+            # walks the last_used_at index from the oldest entry, only as far as needed
+            evicted_ids = []
+            excess_bytes = self.total_bytes - self.max_bytes
+            for entry_id, size_bytes in self.connection.execute(
+                "SELECT id, size_bytes FROM transcriptions ORDER BY last_used_at"
+            ):
+                if excess_bytes <= 0:
+                    break
+                evicted_ids.append(entry_id)
+                excess_bytes -= size_bytes
+
+            self._remove(
+                f"DELETE FROM transcriptions "
+                f"WHERE id IN ({', '.join('?' * len(evicted_ids))}) RETURNING size_bytes",
+                tuple(evicted_ids),
+            )
+            logging.info(f"Evicted {len(evicted_ids)} transcriptions from the cache")
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+from typing import Callable
+
+from telegram import Bot, Message, Update
+
+from app.JobBroker import JobBroker
+from app.JobScheduler import JobScheduler
+from app.JobStore import JobStore
+from app.ScratchSpace import ScratchSpace
+from app.TelegramTask import TelegramTask
+from app.config import JOB_LEASE_S, JOB_MAX_ATTEMPTS, WORKER_ID, WORKER_POLL_INTERVAL_S
+
+
+class TranscriptionWorker:
+    """Runs media jobs that a front-end put into the broker.
+
+    It holds no more claimed jobs than its scheduler runs at once, so jobs it
+    can't start yet stay in the broker for other workers. Media is downloaded
+    through the Bot API and results are sent back through it, and everything
+    in between stays in this worker's DATA_DIR, so workers share nothing but
+    the broker. A job leased more than `max_attempts` times, because it keeps
+    taking its workers down, is dropped and the user is told.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        broker: JobBroker,
+        scheduler: JobScheduler,
+        job_store: JobStore,
+        scratch_space: ScratchSpace,
+        create_task: Callable[[Update], TelegramTask],
+        worker_id: str = WORKER_ID,
+        lease_s: float = JOB_LEASE_S,
+        poll_interval_s: float = WORKER_POLL_INTERVAL_S,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+    ):
+        self.bot = bot
+        self.broker = broker
+        self.scheduler = scheduler
+        self.job_store = job_store
+        self.scratch_space = scratch_space
+        self.create_task = create_task
+        self.worker_id = worker_id
+        self.lease_s = lease_s
+        self.poll_interval_s = poll_interval_s
+        self.max_attempts = max_attempts
+        self.job_slots = asyncio.Semaphore(scheduler.max_concurrent_jobs)
+        self.running_jobs: set[asyncio.Task] = set()
+
+    async def recover(self) -> None:
+        """Cleans up after a previous run of this worker."""
+        released = await self.broker.release_worker_jobs(self.worker_id)
+        if released:
+            logging.info(f"Gave back {len(released)} jobs of the previous run")
+
+        for job in self.job_store.get_unfinished_jobs():
+            # finished by another worker in the meantime
+            if not await self.broker.has_job(job["id"]):
+                self.job_store.finish_job(job["id"])
+
+        removed_folders = self.scratch_space.sweep(self.job_store, min_age_s=0)
+        if removed_folders:
+            logging.info(f"Removed {removed_folders} orphaned job folders")
+
+    async def run(self) -> None:
+        await self.recover()
+        sweeper = asyncio.create_task(self.scratch_space.run_sweeper(self.job_store))
+        try:
+            while True:
+                await self.job_slots.acquire()
+                job = await self.broker.claim(self.worker_id)
+                if job is None:
+                    self.job_slots.release()
+                    await asyncio.sleep(self.poll_interval_s)
+                    continue
+                if job["attempts"] > self.max_attempts:
+                    await self._give_up(job)
+                    self.job_slots.release()
+                    continue
+
+                job_task = asyncio.create_task(self._run_job(job))
+                self.running_jobs.add(job_task)
+                job_task.add_done_callback(self.running_jobs.discard)
+        finally:
+            sweeper.cancel()
+            for job_task in self.running_jobs:
+                job_task.cancel()
+            await asyncio.gather(*self.running_jobs, return_exceptions=True)
+
+    async def _renew_lease(self, job: dict, job_task: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(self.lease_s / 3)
+            if not await self.broker.renew(job["id"], job["lease_id"]):
+                logging.warning(f"Lost the lease of job {job['id']}, stopping it")
+                job_task.cancel()
+                return
+
+    def _build_task(self, job: dict) -> TelegramTask:
+        task = self.create_task(Update.de_json(job["payload"]["update"], self.bot))
+        status_message = job["payload"].get("status_message")
+        if status_message is not None:
+            task.progress.attach_status(Message.de_json(status_message, self.bot))
+        return task
+
+    async def _give_up(self, job: dict) -> None:
+        logging.error(f"Dropping job {job['id']} after {job['attempts'] - 1} interrupted attempts")
+        try:
+            task = self._build_task(job)
+            await task.set_first_reply(
+                "⚠️ Transcription was interrupted too many times, giving up on this file.",
+                immediately=True,
+            )
+        except Exception:
+            logging.exception(f"Failed to tell the user about dropped job {job['id']}")
+
+        self.job_store.finish_job(job["id"])
+        await self.broker.complete(job["id"], job["lease_id"])
+
+    async def _run_job(self, job: dict) -> None:
+        logging.info(f"Worker {self.worker_id} took job {job['id']}, attempt {job['attempts']}")
+        lease_renewal = asyncio.create_task(
+            self._renew_lease(job, asyncio.current_task())
+        )
+        try:
+            task = self._build_task(job)
+
+            await self.scheduler.run(
+                chat_id=job["chat_id"],
+                user_id=job["user_id"],
+                audio_duration_s=job["audio_duration_s"],
+                job=task.handle_media,
+                on_queued=task.report_queue_position,
+            )
+        except asyncio.CancelledError:
+            # the local job store keeps its progress, should it come back here
+            await self.broker.release(job["id"], job["lease_id"])
+            raise
+        except Exception:
+            # as in the single-process bot, a failed job is not retried
+            logging.exception(f"Job {job['id']} failed")
+        finally:
+            lease_renewal.cancel()
+            self.job_slots.release()
+
+        await self.broker.complete(job["id"], job["lease_id"])
@@ -0,0 +1,85 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from app.OnnxVadEngine import OnnxVadEngine
+from app.config import SILERO_VAD_MODEL_FILE, SILERO_VAD_VERSION
+
+
+class VadModelRegistry:
+    """Process-wide holder of the Silero VAD model.
+
+    The ONNX model is loaded once from a local checkout of the silero-vad
+    repository (no network lookups) into an OnnxVadEngine shared by every job
+    in the process. Each `session()` gets its own stream of recurrent state, so
+    jobs don't wait for each other; the engine batches their windows together.
+    """
+
+    _load_lock = threading.Lock()
+    _stats_lock = threading.Lock()
+    _engine: OnnxVadEngine | None = None
+
+    load_time_s: float | None = None
+    inference_count: int = 0
+    total_inference_time_s: float = 0.0
+    last_inference_time_s: float | None = None
+
+    @classmethod
+    def is_loaded(cls) -> bool:
+        return cls._engine is not None
+
+    @classmethod
+    def warm_up(cls) -> None:
+        if cls._engine is not None:
+            return
+
+        with cls._load_lock:
+            if cls._engine is not None:
+                return
+
+            if not os.path.isfile(SILERO_VAD_MODEL_FILE):
+                raise RuntimeError(
+                    f"Silero VAD {SILERO_VAD_VERSION} model is not found at {SILERO_VAD_MODEL_FILE}. "
+                    f"Clone it with: git clone --depth 1 --branch {SILERO_VAD_VERSION} "
+                    f"https://github.com/snakers4/silero-vad.git"
+                )
+
+            started_at = time.perf_counter()
+            cls._engine = OnnxVadEngine(SILERO_VAD_MODEL_FILE)
+            cls.load_time_s = time.perf_counter() - started_at
+
+            logging.info(
+                f"Silero VAD {cls._engine.version} model loaded in {cls.load_time_s:.3f}s"
+            )
+
+    @classmethod
+    def get_engine(cls) -> OnnxVadEngine:
+        cls.warm_up()
+        return cls._engine
+
+    @classmethod
+    @contextmanager
+    def session(cls):
+        stream = cls.get_engine().open_stream()
+        started_at = time.perf_counter()
+        try:
+            yield stream
+        finally:
+            elapsed = time.perf_counter() - started_at
+            with cls._stats_lock:
+                cls.inference_count += 1
+                cls.total_inference_time_s += elapsed
+                cls.last_inference_time_s = elapsed
+            logging.info(f"Silero VAD inference took {elapsed:.3f}s")
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        return {
+            "loaded": cls.is_loaded(),
+            "load_time_s": cls.load_time_s,
+            "inference_count": cls.inference_count,
+            "total_inference_time_s": cls.total_inference_time_s,
+            "last_inference_time_s": cls.last_inference_time_s,
+        }
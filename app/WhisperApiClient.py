@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+import random
+import time
+
+import httpx
+from aiolimiter import AsyncLimiter
+from dotenv import load_dotenv
+
+from app.Transcriber import Transcriber
+from app.WhisperTranscriber import WhisperTranscriber
+from app.config import (
+    OPENAI_API_BASE,
+    WHISPER_MODEL,
+    WHISPER_MAX_RETRIES,
+    WHISPER_BACKOFF_BASE_S,
+    WHISPER_BACKOFF_MAX_S,
+    WHISPER_TIMEOUT_S,
+    WHISPER_MAX_CONNECTIONS,
+    WHISPER_REQUESTS_PER_MINUTE,
+)
+from app.metrics import WHISPER_ERRORS, WHISPER_REQUEST_SECONDS, WHISPER_RETRIES
+from app.worker_pool import run_in_thread
+
+RETRYABLE_STATUS_CODES = [429, 500, 502, 503, 504]
+
+
+class WhisperApiError(Exception):
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class WhisperApiClient(Transcriber):
+    """Async client for the OpenAI transcription endpoint.
+
+    One instance keeps a pooled HTTP session for the whole process. Requests are
+    throttled by a token bucket, and 429/5xx/timeouts are retried with jittered
+    exponential backoff that respects the Retry-After header.
+    """
+
+    supported_extensions = WhisperTranscriber.SUPPORTED_EXTENSIONS
+    max_file_size_bytes = WhisperTranscriber.MAX_FILE_SIZE_MB * 1024 * 1024
+    retries_itself = True
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        base_url: str = OPENAI_API_BASE,
+        model: str = WHISPER_MODEL,
+        max_retries: int = WHISPER_MAX_RETRIES,
+        backoff_base_s: float = WHISPER_BACKOFF_BASE_S,
+        backoff_max_s: float = WHISPER_BACKOFF_MAX_S,
+        requests_per_minute: int = WHISPER_REQUESTS_PER_MINUTE,
+    ):
+        if api_key is None:
+            load_dotenv()
+            api_key = os.getenv("OPENAI_API_KEY")
+
+        self.model = model
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.rate_limiter = AsyncLimiter(requests_per_minute, 60)
+        self.retries_count = 0
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=WHISPER_TIMEOUT_S,
+            limits=httpx.Limits(
+                max_connections=WHISPER_MAX_CONNECTIONS,
+                max_keepalive_connections=WHISPER_MAX_CONNECTIONS,
+            ),
+        )
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    def validate_file(self, audio_file_path: str) -> bool:
+        return WhisperTranscriber.validate_file(audio_file_path)
+
+    def get_backoff_delay(self, attempt: int, retry_after: str | None = None) -> float:
+        delay = random.uniform(
+            0, min(self.backoff_max_s, self.backoff_base_s * 2**attempt)
+        )
+
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+
+        return delay
+
+    async def transcribe(self, audio_file_path: str) -> str:
+        if not self.validate_file(audio_file_path):
+            raise WhisperApiError("The provided file is not valid.")
+
+        with open(audio_file_path, "rb") as audio_file:
+            audio_contents = await run_in_thread(audio_file.read)
+
+        files = {"file": (os.path.basename(audio_file_path), audio_contents)}
+        data = {"model": self.model}
+
+        for attempt in range(self.max_retries):
+            retry_after = None
+
+            try:
+                async with self.rate_limiter:
+                    started_at = time.perf_counter()
+                    response = await self.client.post(
+                        "audio/transcriptions", files=files, data=data
+                    )
+            except httpx.TransportError as e:
+                error = WhisperApiError(f"Transport error: {e!r}")
+                WHISPER_ERRORS.labels("transport").inc()
+            else:
+                WHISPER_REQUEST_SECONDS.labels(
+                    "success" if response.status_code == 200 else "error"
+                ).observe(time.perf_counter() - started_at)
+                if response.status_code == 200:
+                    return response.json()["text"]
+
+                WHISPER_ERRORS.labels(str(response.status_code)).inc()
+
+                error = WhisperApiError(
+                    f"Whisper API responded with {response.status_code}: {response.text}",
+                    status_code=response.status_code,
+                )
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    raise error
+                retry_after = response.headers.get("Retry-After")
+
+            if attempt == self.max_retries - 1:
+                raise error
+
+            delay = self.get_backoff_delay(attempt, retry_after)
+            self.retries_count += 1
+            WHISPER_RETRIES.inc()
+            logging.warning(f"{error} Retrying in {delay:.1f}s.")
+            await asyncio.sleep(delay)
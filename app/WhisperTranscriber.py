@@ -1,6 +1,5 @@
 import time
 
-import openai
 import os
 from dotenv import load_dotenv
 
@@ -31,6 +30,9 @@ class WhisperTranscriber:
 
     @staticmethod
     def transcribe_audio(audio_file_path) -> str:
+        # only this legacy path uses the SDK, WhisperApiClient talks HTTP itself
+        import openai
+
         load_dotenv()
         openai.api_key = os.getenv("OPENAI_API_KEY")
 
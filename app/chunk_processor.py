@@ -1,11 +1,22 @@
-import ffmpeg
-import torch
+import math
+from collections import deque
 
-from app.models.MediaFileModel import MediaFileModel
-from app.config import WAV_SAMPLING_RATE, MAX_CHUNK_DURATION_S, MIN_CHUNK_DURATION_S
+import numpy as np
 
+from app.config import (
+    WAV_SAMPLING_RATE,
+    MAX_CHUNK_DURATION_S,
+    MIN_CHUNK_DURATION_S,
+    CHUNK_PLANNING_STRATEGY,
+)
+from app.streaming_vad import iter_speech_timestamps
 
-def detect_timestamps(pcm_wav_file) -> list:
+HARD_CUT_STEP_S = 1
+HARD_CUT_BADNESS = 1000
+
+
+def detect_timestamps(input_file) -> list:
+    """Runs VAD over any ffmpeg-readable file, decoding it on the fly."""
     supported_sampling_rates = [8000, 16000]
     if WAV_SAMPLING_RATE not in supported_sampling_rates:
         raise RuntimeError(
@@ -13,56 +24,237 @@ def detect_timestamps(pcm_wav_file) -> list:
             f"Supported sampling rates are {supported_sampling_rates}"
         )
 
-    silero_model, utils = torch.hub.load(
-        repo_or_dir="snakers4/silero-vad", model="silero_vad", onnx=True
-    )
-    get_speech_timestamps, _, read_audio, _, _ = utils
+    return list(iter_speech_timestamps(input_file))
 
-    audio = read_audio(pcm_wav_file, sampling_rate=WAV_SAMPLING_RATE)
 
-    silero_timestamps = get_speech_timestamps(
-        audio=audio,
-        model=silero_model,
-        threshold=0.5,
-        sampling_rate=WAV_SAMPLING_RATE,
-        min_speech_duration_ms=500,
-        min_silence_duration_ms=500,
-    )
+class SilenceGaps:
+    """Silences between VAD segments, indexed for fast window queries.
 
-    for timestamps in silero_timestamps:
-        timestamps["start"] = float(timestamps["start"] / WAV_SAMPLING_RATE)
-        timestamps["end"] = float(timestamps["end"] / WAV_SAMPLING_RATE)
+    Segments are sorted and don't overlap, so both gap starts and gap ends are
+    sorted and the gaps inside a window form one contiguous slice.
+    """
 
-    return silero_timestamps
+    def __init__(self, silero_timestamps: list):
+        self.starts = np.array([t["end"] for t in silero_timestamps[:-1]], dtype=float)
+        self.ends = np.array([t["start"] for t in silero_timestamps[1:]], dtype=float)
+        self.durations = self.ends - self.starts
 
+    def find_best_cut_position(self, start: float, end: float) -> float | None:
+        """Same result as find_best_cut_position(), in O(log n + gaps in window)."""
+        first = np.searchsorted(self.starts, start, side="left")
+        last = np.searchsorted(self.ends, end, side="right")
+        if first >= last:
+            return None
+
+        # argmax picks the first of equally long silences, like the linear scan
+        longest = first + int(np.argmax(self.durations[first:last]))
+        if self.durations[longest] <= 0:
+            return None
+
+        return float(self.starts[longest] + self.durations[longest] / 2)
 
-def calculate_chunks(silero_timestamps: list, audio_duration_s: int) -> list:
-    chunks = []
-    start = 0.0
 
+def calculate_chunks(
+    silero_timestamps: list,
+    audio_duration_s: int,
+    strategy: str = CHUNK_PLANNING_STRATEGY,
+) -> list:
     if audio_duration_s <= MAX_CHUNK_DURATION_S:
-        return [[start, audio_duration_s]]
+        return [[0.0, audio_duration_s]]
+
+    silence_gaps = SilenceGaps(silero_timestamps)
+
+    if strategy == "greedy":
+        return _calculate_chunks_greedy(silence_gaps, audio_duration_s)
+    if strategy == "optimal":
+        return _calculate_chunks_optimal(silence_gaps, audio_duration_s)
+
+    raise ValueError(f"Unknown chunk planning strategy: {strategy}")
+
+
+def _get_next_greedy_chunk(
+    silence_gaps: SilenceGaps, start: float, audio_duration_s: float
+) -> list:
+    """Cuts the chunk starting at `start` at the longest silence between MIN and MAX chunk duration."""
+    end = min(start + MAX_CHUNK_DURATION_S, audio_duration_s)
+    best_cut_position = silence_gaps.find_best_cut_position(
+        start + MIN_CHUNK_DURATION_S, end
+    )
+    if best_cut_position and abs(best_cut_position - start) >= MIN_CHUNK_DURATION_S:
+        return [start, best_cut_position]
+
+    if end - start < MIN_CHUNK_DURATION_S:
+        end = min(start + MIN_CHUNK_DURATION_S, audio_duration_s)
+    return [start, end]
+
+
+def _calculate_chunks_greedy(silence_gaps: SilenceGaps, audio_duration_s: int) -> list:
+    chunks = []
+    start = 0.0
 
     while start < audio_duration_s:
-        end = min(start + MAX_CHUNK_DURATION_S, audio_duration_s)
-        best_cut_position = find_best_cut_position(
-            silero_timestamps, start + MIN_CHUNK_DURATION_S, end
-        )
-        if best_cut_position and abs(best_cut_position - start) >= MIN_CHUNK_DURATION_S:
-            chunks.append([start, best_cut_position])
-            start = best_cut_position
-        else:
-            if end - start < MIN_CHUNK_DURATION_S:
-                end = min(start + MIN_CHUNK_DURATION_S, audio_duration_s)
-            chunks.append([start, end])
-            start = end
+        chunk = _get_next_greedy_chunk(silence_gaps, start, audio_duration_s)
+        chunks.append(chunk)
+        start = chunk[1]
 
     return chunks
 
 
+class IncrementalChunkPlanner:
+    """Greedy chunk planner that runs while VAD is still producing segments.
+
+    A chunk is final once VAD has settled everything up to its latest possible
+    end, so chunks come out long before the file is analysed, and the plan is
+    the same as calculate_chunks(strategy="greedy") gives for the full output.
+    """
+
+    def __init__(self):
+        self.silero_timestamps = []
+        self.first_relevant_segment = 0
+        self.start = 0.0
+        self.chunks_planned = 0
+
+    def add_segments(self, segments: list) -> None:
+        self.silero_timestamps.extend(segments)
+
+    def _get_silence_gaps(self) -> SilenceGaps:
+        # gaps after segments that end before the chunk start can't be cut points
+        while (
+            self.first_relevant_segment < len(self.silero_timestamps)
+            and self.silero_timestamps[self.first_relevant_segment]["end"] < self.start
+        ):
+            self.first_relevant_segment += 1
+
+        return SilenceGaps(self.silero_timestamps[self.first_relevant_segment :])
+
+    def _add_chunk(self, chunk: list) -> list:
+        self.start = chunk[1]
+        self.chunks_planned += 1
+        return chunk
+
+    def plan(self, settled_until_s: float) -> list:
+        """Returns chunks that can't change anymore given VAD output up to `settled_until_s`."""
+        chunks = []
+        while self.start + MAX_CHUNK_DURATION_S <= settled_until_s:
+            chunk = _get_next_greedy_chunk(self._get_silence_gaps(), self.start, math.inf)
+            chunks.append(self._add_chunk(chunk))
+        return chunks
+
+    def finish(self, audio_duration_s: int) -> list:
+        if self.chunks_planned == 0 and audio_duration_s <= MAX_CHUNK_DURATION_S:
+            return [self._add_chunk([0.0, audio_duration_s])]
+
+        chunks = []
+        while self.start < audio_duration_s:
+            chunk = _get_next_greedy_chunk(
+                self._get_silence_gaps(), self.start, audio_duration_s
+            )
+            chunks.append(self._add_chunk(chunk))
+        return chunks
+
+
+class OptimalChunkPlanner:
+    """Planner with the IncrementalChunkPlanner interface for the "optimal" strategy.
+
+    The optimal plan depends on every silence in the file, so no chunk is
+    released before VAD has finished; transcription starts later than with the
+    greedy planner in exchange for fewer cuts in short silences.
+    """
+
+    def __init__(self):
+        self.silero_timestamps = []
+
+    def add_segments(self, segments: list) -> None:
+        self.silero_timestamps.extend(segments)
+
+    def plan(self, settled_until_s: float) -> list:
+        return []
+
+    def finish(self, audio_duration_s: int) -> list:
+        return calculate_chunks(self.silero_timestamps, audio_duration_s, strategy="optimal")
+
+
+def create_chunk_planner(
+    strategy: str = CHUNK_PLANNING_STRATEGY,
+) -> IncrementalChunkPlanner | OptimalChunkPlanner:
+    if strategy == "greedy":
+        return IncrementalChunkPlanner()
+    if strategy == "optimal":
+        return OptimalChunkPlanner()
+
+    raise ValueError(f"Unknown chunk planning strategy: {strategy}")
+
+
+def get_cut_badness(silence_duration_s: float) -> float:
+    """Cutting inside a short silence risks splitting a word, a long one is safe."""
+    return 1 / silence_duration_s
+
+
+def _calculate_chunks_optimal(silence_gaps: SilenceGaps, audio_duration_s: int) -> list:
+    """Picks cuts that minimize the total badness over the whole file.
+
+    Candidates are silence midpoints plus a grid of hard cuts, so a valid plan
+    always exists. Every chunk but the last lasts between MIN and MAX chunk
+    duration. The DP keeps a sliding-window minimum, so it runs in O(n).
+    """
+    has_silence = silence_gaps.durations > 0
+    silence_positions = (silence_gaps.starts + silence_gaps.durations / 2)[has_silence]
+    silence_badness = get_cut_badness(silence_gaps.durations[has_silence])
+
+    hard_cut_positions = np.arange(HARD_CUT_STEP_S, audio_duration_s, HARD_CUT_STEP_S)
+    hard_cut_badness = np.full(len(hard_cut_positions), HARD_CUT_BADNESS)
+
+    positions = np.concatenate(([0.0], silence_positions, hard_cut_positions))
+    badness = np.concatenate(([0.0], silence_badness, hard_cut_badness))
+    in_file = positions < audio_duration_s
+    order = np.argsort(positions[in_file], kind="stable")
+    positions = positions[in_file][order].tolist()
+    badness = badness[in_file][order].tolist()
+
+    total_badness = [math.inf] * len(positions)
+    previous_cut = [-1] * len(positions)
+    total_badness[0] = 0.0
+    window = deque()  # candidate indices with increasing total badness
+    next_to_add = 0
+
+    for i in range(1, len(positions)):
+        while positions[next_to_add] <= positions[i] - MIN_CHUNK_DURATION_S:
+            while window and total_badness[window[-1]] >= total_badness[next_to_add]:
+                window.pop()
+            window.append(next_to_add)
+            next_to_add += 1
+        while window and positions[window[0]] < positions[i] - MAX_CHUNK_DURATION_S:
+            window.popleft()
+
+        if window and total_badness[window[0]] < math.inf:
+            total_badness[i] = total_badness[window[0]] + badness[i]
+            previous_cut[i] = window[0]
+
+    # the last chunk may be shorter than MIN_CHUNK_DURATION_S
+    last_cut = min(
+        (
+            i
+            for i in range(len(positions))
+            if positions[i] >= audio_duration_s - MAX_CHUNK_DURATION_S
+        ),
+        key=lambda i: total_badness[i],
+    )
+
+    cuts = [audio_duration_s]
+    i = last_cut
+    while i > 0:
+        cuts.append(positions[i])
+        i = previous_cut[i]
+    cuts.append(0.0)
+    cuts.reverse()
+
+    return [[start, end] for start, end in zip(cuts, cuts[1:])]
+
+
 def find_best_cut_position(
     silero_timestamps: list, start: float, end: float
 ) -> float or None:
+    """Linear-scan reference for SilenceGaps.find_best_cut_position()."""
     longest_silence_position = None
     longest_silence_duration = 0
 
@@ -80,17 +272,3 @@ def find_best_cut_position(
 
     return longest_silence_position
 
-
-def split_audio_into_chunks(chunks: list, media_file: MediaFileModel):
-    input_file = media_file.pcm_wav_file
-
-    for i, chunk in enumerate(chunks):
-        output_file_name = media_file.get_chunk_location(i)
-        ss = chunk[0]  # start time of the chunk, in seconds
-        to = chunk[1]  # end time of the chunk, in seconds
-        duration = to - ss
-
-        # split audio at this chunk
-        ffmpeg.input(input_file).output(output_file_name, ss=ss, t=duration).run(
-            overwrite_output=True
-        )
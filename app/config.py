@@ -1,12 +1,127 @@
 import os
+import socket
 
-DATA_DIR = os.path.join(os.path.dirname(__file__), "../data")
+DATA_DIR = os.environ.get("DATA_DIR", os.path.join(os.path.dirname(__file__), "../data"))
 WAV_SAMPLING_RATE = 16000  # Silero can only work with 16000 or 8000
-MIN_CHUNK_DURATION_S = 1 * 60
-MAX_CHUNK_DURATION_S = 3 * 60
 TRANSCRIPTION_PREVIEW_CHARS = 200
 
+# "openai" sends chunks to the Whisper API, "local" runs faster-whisper on the CPU
+TRANSCRIBER_BACKEND = os.environ.get("TRANSCRIBER_BACKEND", "openai")
+# The API takes files up to 25 MB, so chunks stay short. The local model has no upload
+# limit and decodes 30 s windows internally, so longer chunks only cost latency.
+CHUNK_DURATION_LIMITS_S = {
+    "openai": (1 * 60, 3 * 60),
+    "local": (2 * 60, 10 * 60),
+}
+MIN_CHUNK_DURATION_S, MAX_CHUNK_DURATION_S = CHUNK_DURATION_LIMITS_S[TRANSCRIBER_BACKEND]
+
 TELEGRAM_BASE_URL = os.environ.get("TELEGRAM_BASE_URL", "http://localhost:8081/bot")
 TELEGRAM_BASE_FILE_URL = os.environ.get(
     "TELEGRAM_BASE_FILE_URL", "http://localhost:8081/file/bot"
 )
+
+SILERO_VAD_VERSION = "v5.1.2"
+SILERO_VAD_REPO_DIR = os.environ.get(
+    "SILERO_VAD_REPO_DIR", os.path.join(os.path.dirname(__file__), "../silero-vad")
+)
+SILERO_VAD_MODEL_FILE = os.environ.get(
+    "SILERO_VAD_MODEL_FILE",
+    os.path.join(SILERO_VAD_REPO_DIR, "src", "silero_vad", "data", "silero_vad.onnx"),
+)
+# Recordings whose VAD windows share one model run
+VAD_BATCH_SIZE = int(os.environ.get("VAD_BATCH_SIZE", 16))
+VAD_INTRA_OP_THREADS = int(os.environ.get("VAD_INTRA_OP_THREADS", 1))
+
+CPU_WORKERS = int(os.environ.get("CPU_WORKERS", os.cpu_count() or 1))
+IO_WORKERS = int(os.environ.get("IO_WORKERS", 8))
+
+MAX_CONCURRENT_CHUNKS = int(os.environ.get("MAX_CONCURRENT_CHUNKS", 4))
+CHUNK_TRANSCRIPTION_RETRIES = 3
+CHUNK_RETRY_DELAY_S = 1
+
+OPENAI_API_BASE = os.environ.get("OPENAI_API_BASE", "https://api.openai.com/v1")
+WHISPER_MODEL = "whisper-1"
+WHISPER_MAX_RETRIES = 5
+WHISPER_BACKOFF_BASE_S = 1
+WHISPER_BACKOFF_MAX_S = 30
+WHISPER_TIMEOUT_S = 120
+WHISPER_MAX_CONNECTIONS = 10
+WHISPER_REQUESTS_PER_MINUTE = int(os.environ.get("WHISPER_REQUESTS_PER_MINUTE", 50))
+
+DOWNLOAD_CHUNK_SIZE_BYTES = 1024 * 1024
+DOWNLOAD_TIMEOUT_S = 300
+
+TRANSCRIPTION_CACHE_FILE = os.path.join(DATA_DIR, "transcription_cache.sqlite3")
+TRANSCRIPTION_CACHE_TTL_S = 30 * 24 * 60 * 60
+TRANSCRIPTION_CACHE_MAX_BYTES = 100 * 1024 * 1024
+# Recordings short enough for one request are only decoded to look up the cache by
+# content when the file is at least this big
+CONTENT_HASH_MIN_FILE_SIZE_BYTES = int(
+    os.environ.get("CONTENT_HASH_MIN_FILE_SIZE_BYTES", 5 * 1024 * 1024)
+)
+
+JOB_STORE_FILE = os.path.join(DATA_DIR, "jobs.sqlite3")
+
+MAX_CONCURRENT_JOBS = int(os.environ.get("MAX_CONCURRENT_JOBS", 4))
+MAX_CONCURRENT_AUDIO_MINUTES = int(os.environ.get("MAX_CONCURRENT_AUDIO_MINUTES", 240))
+UNKNOWN_AUDIO_DURATION_ESTIMATE_S = 30 * 60
+
+# "greedy" cuts chunks while VAD runs, "optimal" waits for VAD to finish and places
+# the cuts in the longest silences over the whole file
+CHUNK_PLANNING_STRATEGY = os.environ.get("CHUNK_PLANNING_STRATEGY", "greedy")
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "ERROR")
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 9464))
+
+LOCAL_WHISPER_MODEL = os.environ.get("LOCAL_WHISPER_MODEL", "small")
+LOCAL_WHISPER_COMPUTE_TYPE = os.environ.get("LOCAL_WHISPER_COMPUTE_TYPE", "int8")
+LOCAL_WHISPER_CPU_THREADS = int(os.environ.get("LOCAL_WHISPER_CPU_THREADS", 4))
+LOCAL_WHISPER_WORKERS = int(os.environ.get("LOCAL_WHISPER_WORKERS", 2))
+LOCAL_WHISPER_BEAM_SIZE = 5
+
+STATUS_EDIT_INTERVAL_S = 3
+CHUNK_TEXT_BATCH_INTERVAL_S = 20
+ECHO_CHUNK_AUDIO = os.environ.get("ECHO_CHUNK_AUDIO", "false").lower() == "true"
+
+# "polling" asks Telegram for updates, "webhook" receives them on an embedded HTTP server
+SERVING_MODE = os.environ.get("SERVING_MODE", "polling")
+# Updates handled at once; updates of one chat are still handled in order
+MAX_CONCURRENT_UPDATES = int(os.environ.get("MAX_CONCURRENT_UPDATES", 64))
+WEBHOOK_LISTEN = os.environ.get("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", 8443))
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "telegram")
+# Public URL Telegram posts to, e.g. https://bot.example.com/telegram behind a reverse proxy
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL")
+WEBHOOK_SECRET_TOKEN = os.environ.get("WEBHOOK_SECRET_TOKEN")
+
+# "all" runs everything in one process. "frontend" only accepts updates and enqueues
+# media jobs, "worker" processes pull them from the broker and reply to the users.
+SERVICE_ROLE = os.environ.get("SERVICE_ROLE", "all")
+JOB_BROKER = os.environ.get("JOB_BROKER", "sqlite")
+JOB_BROKER_FILE = os.environ.get("JOB_BROKER_FILE", os.path.join(DATA_DIR, "broker.sqlite3"))
+# a job of a worker that stopped renewing for this long goes to another worker
+JOB_LEASE_S = int(os.environ.get("JOB_LEASE_S", 60))
+# Unique per process by default, as all workers of the sqlite broker share one host.
+# Set a stable one per worker, so a restarted worker gives its old jobs back right away.
+WORKER_ID = os.environ.get("WORKER_ID", f"{socket.gethostname()}-{os.getpid()}")
+WORKER_POLL_INTERVAL_S = 1
+# a job whose workers died this many times is dropped and the user is told
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+
+# Disk space the files of running jobs may take. A job reserves its download and
+# decoded audio up front and waits while the budget is used up.
+SCRATCH_MAX_BYTES = int(os.environ.get("SCRATCH_MAX_BYTES", 10 * 1024**3))
+# Intermediate files go here while the tmpfs budget and free RAM allow; unset to disable
+SCRATCH_TMPFS_DIR = os.environ.get("SCRATCH_TMPFS_DIR", "/dev/shm/telegram-transcriber")
+SCRATCH_TMPFS_MAX_BYTES = int(os.environ.get("SCRATCH_TMPFS_MAX_BYTES", 512 * 1024**2))
+SCRATCH_MIN_FREE_MEMORY_BYTES = 1024**3
+SCRATCH_SWEEP_INTERVAL_S = 10 * 60
+# folders without an unfinished job are removed once they are this old
+SCRATCH_STALE_AGE_S = 60 * 60
+
+# Load the VAD model and the transcriber in the background once the bot is up,
+# instead of on the first job that needs them
+PREWARM = os.environ.get("PREWARM", "true").lower() == "true"
+# Limit for importing the bot in a fresh interpreter, checked by tests/test_startup.py
+STARTUP_IMPORT_BUDGET_S = float(os.environ.get("STARTUP_IMPORT_BUDGET_S", 1.5))
@@ -0,0 +1,36 @@
+import logging
+import os
+
+import httpx
+
+from app.config import DOWNLOAD_CHUNK_SIZE_BYTES, DOWNLOAD_TIMEOUT_S
+
+
+async def stream_to_file(
+    url: str, output_file_location: str, chunk_size: int = DOWNLOAD_CHUNK_SIZE_BYTES
+) -> int:
+    """Downloads a file in fixed-size chunks, so memory use doesn't depend on its size."""
+    bytes_written = 0
+
+    async with httpx.AsyncClient(timeout=DOWNLOAD_TIMEOUT_S) as client:
+        async with client.stream("GET", url) as response:
+            response.raise_for_status()
+            with open(output_file_location, "wb") as file:
+                async for chunk in response.aiter_bytes(chunk_size):
+                    file.write(chunk)
+                    bytes_written += len(chunk)
+
+    return bytes_written
+
+
+def link_local_file(input_file_location: str, output_file_location: str) -> None:
+    """Exposes a file of the local Bot API server without copying it.
+
+    A hardlink is used when both paths are on the same filesystem, otherwise the
+    file is read in place through a symlink.
+    """
+    try:
+        os.link(input_file_location, output_file_location)
+    except OSError as e:
+        logging.info(f"Hardlink is not possible ({e}), using a symlink instead")
+        os.symlink(os.path.abspath(input_file_location), output_file_location)
@@ -2,16 +2,20 @@ import logging
 import os
 from dotenv import load_dotenv
 from app.TelegramService import TelegramService
+from app.config import LOG_LEVEL, SERVICE_ROLE
 
 if __name__ == "__main__":
     logging.basicConfig(
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        level=logging.ERROR,
+        level=LOG_LEVEL,
     )
 
     load_dotenv()
     telegram_api_token: str = os.getenv("TELEGRAM_API_TOKEN")
     telegram_service = TelegramService(
-        telegram_api_token=telegram_api_token, local_mode=True
+        telegram_api_token=telegram_api_token, local_mode=True, role=SERVICE_ROLE
     )
-    telegram_service.setup_handlers()
+    if SERVICE_ROLE == "worker":
+        telegram_service.run_worker()
+    else:
+        telegram_service.setup_handlers()
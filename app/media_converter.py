@@ -1,7 +1,17 @@
+import logging
+import os
+import threading
+
 import ffmpeg
+from cachetools import LRUCache
 
 from app.config import WAV_SAMPLING_RATE
 
+PROBE_CACHE_SIZE = 256
+
+probe_cache: LRUCache = LRUCache(maxsize=PROBE_CACHE_SIZE)
+probe_cache_lock = threading.Lock()
+
 
 def convert_to_mp3(input_file_location: str, output_file_location: str) -> None:
     input_file = ffmpeg.input(input_file_location)
@@ -25,9 +35,62 @@ def convert_to_pcm_wav(input_file_location: str, output_file_location: str) -> N
     output_file.run(overwrite_output=True)
 
 
-def get_duration(input_file_location: str) -> int:
-    probe = ffmpeg.probe(input_file_location)
-    stream = next(
+def probe_media(input_file_location: str) -> dict:
+    """ffprobe output, cached per file path, size and modification time.
+
+    The cache lives in the calling process, so call this from a thread, not the process pool.
+    """
+    stat = os.stat(input_file_location)
+    key = (os.path.abspath(input_file_location), stat.st_size, stat.st_mtime_ns)
+    with probe_cache_lock:
+        probe = probe_cache.get(key)
+    if probe is None:
+        probe = ffmpeg.probe(input_file_location)
+        with probe_cache_lock:
+            probe_cache[key] = probe
+    return probe
+
+
+def try_probe_media(input_file_location: str) -> dict | None:
+    try:
+        return probe_media(input_file_location)
+    except Exception as e:
+        logging.warning(f"Failed to probe {input_file_location}: {e}")
+        return None
+
+
+def get_audio_stream(probe: dict) -> dict | None:
+    return next(
         (stream for stream in probe["streams"] if stream["codec_type"] == "audio"), None
     )
-    return int(float(stream["duration"]))
+
+
+def get_duration(input_file_location: str) -> int:
+    probe = probe_media(input_file_location)
+    stream = get_audio_stream(probe)
+    duration = stream.get("duration") or probe["format"]["duration"]
+    return int(float(duration))
+
+
+def transcode_audio(
+    input_file_location: str,
+    output_file_location: str,
+    output_options: dict,
+    start_s: float | None = None,
+    end_s: float | None = None,
+) -> None:
+    """Writes the first audio stream with the given options, optionally cut to [start_s, end_s).
+
+    Seeking happens on the input side, so a cut never decodes what comes before it.
+    """
+    input_options = {}
+    if start_s is not None:
+        input_options["ss"] = start_s
+    if end_s is not None:
+        input_options["t"] = end_s - (start_s or 0)
+
+    audio_stream = ffmpeg.input(input_file_location, **input_options)["a:0"]
+    output_file = audio_stream.output(
+        output_file_location, map_metadata="-1", **output_options
+    )
+    output_file.run(overwrite_output=True, quiet=True)
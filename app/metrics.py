@@ -0,0 +1,102 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, List
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+from app.config import MAX_CHUNK_DURATION_S, METRICS_HOST, METRICS_PORT
+
+STAGE_BUCKETS_S = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+STAGE_DURATION_SECONDS = Histogram(
+    "transcriber_stage_duration_seconds",
+    "Time spent in each stage of processing a media message.",
+    ["stage", "media_type", "audio_length"],
+    buckets=STAGE_BUCKETS_S,
+)
+AUDIO_SECONDS_PROCESSED = Counter(
+    "transcriber_audio_seconds_processed",
+    "Seconds of audio transcribed.",
+    ["media_type", "audio_length"],
+)
+JOBS_QUEUED = Gauge("transcriber_jobs_queued", "Media jobs waiting for admission.")
+JOBS_IN_FLIGHT = Gauge("transcriber_jobs_in_flight", "Media jobs being processed.")
+WHISPER_REQUEST_SECONDS = Histogram(
+    "transcriber_whisper_request_duration_seconds",
+    "Latency of single Whisper API requests.",
+    ["outcome"],
+    buckets=STAGE_BUCKETS_S,
+)
+WHISPER_RETRIES = Counter("transcriber_whisper_retries", "Retried Whisper API requests.")
+WHISPER_ERRORS = Counter(
+    "transcriber_whisper_errors",
+    "Failed Whisper API attempts by HTTP status, or 'transport'.",
+    ["status_code"],
+)
+TELEGRAM_REQUEST_SECONDS = Histogram(
+    "transcriber_telegram_request_duration_seconds",
+    "Latency of Telegram Bot API calls.",
+    ["method"],
+)
+PERMISSION_CHECKS = Counter(
+    "transcriber_permission_checks",
+    "Permission checks by outcome: cache hit, miss (API lookup) or coalesced into a running lookup.",
+    ["result"],
+)
+PERMISSION_LOOKUP_SECONDS = Histogram(
+    "transcriber_permission_lookup_duration_seconds",
+    "Latency of membership lookups in the allowed groups.",
+)
+TELEGRAM_CALLS_SAVED = Counter(
+    "transcriber_telegram_calls_saved",
+    "Bot API calls avoided by coalescing status edits and batching chunk texts.",
+)
+UPDATES_IN_FLIGHT = Gauge("transcriber_updates_in_flight", "Telegram updates being handled.")
+DUPLICATE_UPDATES = Counter(
+    "transcriber_duplicate_updates", "Redelivered Telegram updates that were dropped."
+)
+DATA_DIR_BYTES = Gauge(
+    "transcriber_data_dir_bytes", "Bytes on disk in DATA_DIR, measured on every scratch sweep."
+)
+
+# Called with (stage, media_type, audio_length, duration_s), for tools that need raw timings.
+STAGE_OBSERVERS: List[Callable[[str, str, str, float], None]] = []
+
+
+def get_folder_size(folder: str) -> int:
+    size_bytes = 0
+    for root, _, files in os.walk(folder):
+        for file in files:
+            try:
+                size_bytes += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                # removed by a finishing job while walking
+                pass
+    return size_bytes
+
+
+def get_audio_length_label(audio_duration_s: float | None) -> str:
+    if audio_duration_s is None:
+        return "unknown"
+    return "short" if audio_duration_s <= MAX_CHUNK_DURATION_S else "long"
+
+
+def observe_stage(stage: str, media_type: str, audio_length: str, duration_s: float) -> None:
+    STAGE_DURATION_SECONDS.labels(stage, media_type, audio_length).observe(duration_s)
+    for observer in STAGE_OBSERVERS:
+        observer(stage, media_type, audio_length, duration_s)
+
+
+@contextmanager
+def measure_stage(stage: str, media_type: str, audio_length: str):
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, media_type, audio_length, time.perf_counter() - started_at)
+
+
+def start_metrics_server(host: str = METRICS_HOST, port: int = METRICS_PORT) -> None:
+    """Serves /metrics in a daemon thread, so a slow scrape never blocks the bot."""
+    start_http_server(port, addr=host)
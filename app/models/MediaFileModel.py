@@ -2,25 +2,32 @@ import os
 import json
 import shutil
 
-from jinja2 import Environment, FileSystemLoader
+from app.transcription_renderer import TranscriptionWriter, write_transcription
 
 
 class MediaFileModel:
-    def __init__(self, user_id, message_id, data_dir: str):
-        self.folder = f"{data_dir}/{user_id}/{message_id}"
+    def __init__(self, user_id, chat_id, message_id, data_dir: str):
+        # message IDs are only unique within a chat
+        self.folder = f"{data_dir}/{user_id}/{chat_id}_{message_id}"
         self.original_file_id = None
+        self.original_file_unique_id = None
         self.original_file_type = None
         self.original_file_duration_s = None
         self.original_file_location = None
         self.original_file_extension = None
-        self.pcm_wav_file = f"{self.folder}/converted.wav"
+        self.pcm_file = f"{self.folder}/audio.s16le"
+        self.chunks_folder = self.folder
         self.mp3_file = f"{self.folder}/converted.mp3"
         self.audacity_speech_labels = f"{self.folder}/audacity_speech.txt"
         self.audacity_chunk_labels = f"{self.folder}/audacity_chunks.txt"
         self.silero_timestamps_json = f"{self.folder}/silero_timestamps.json"
         self.transcription_file = f"{self.folder}/transcription.html"
 
-    def save_user_media(self, file_contents: bytearray):
+    def create_folder(self):
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+
+    def prepare_original_file_location(self) -> str:
         self.original_file_location = f"{self.folder}/original"
 
         if self.original_file_extension:
@@ -28,14 +35,19 @@ class MediaFileModel:
                 f"{self.original_file_location}.{self.original_file_extension}"
             )
 
-        if not os.path.exists(self.folder):
-            os.makedirs(self.folder)
+        self.create_folder()
+
+        return self.original_file_location
 
-        with open(self.original_file_location, "wb") as file:
+    def save_user_media(self, file_contents: bytearray):
+        with open(self.prepare_original_file_location(), "wb") as file:
             file.write(file_contents)
 
-    def get_chunk_location(self, chunk_id):
-        return f"{self.folder}/chunk_{chunk_id}.mp3"
+    def get_chunk_location(self, chunk_id, extension="mp3"):
+        return f"{self.chunks_folder}/chunk_{chunk_id}.{extension}"
+
+    def get_converted_location(self, extension):
+        return f"{self.folder}/converted.{extension}"
 
     def save_silero_timestamps(self, timestamps: list):
         with open(self.silero_timestamps_json, "w") as file:
@@ -72,15 +84,10 @@ class MediaFileModel:
             file.write("\n".join(formatted_lines))
 
     def save_transcription(self, paragraphs: list):
-        dir_path = os.path.dirname(os.path.realpath(__file__))
-        view_path = os.path.join(dir_path, "..", "views")
-        env = Environment(loader=FileSystemLoader(view_path))
-        template = env.get_template("transcription_template.html")
-
-        rendered_template = template.render(paragraphs=paragraphs)
+        write_transcription(self.transcription_file, paragraphs)
 
-        with open(self.transcription_file, "w") as file:
-            file.write(rendered_template)
+    def open_transcription_writer(self) -> TranscriptionWriter:
+        return TranscriptionWriter(self.transcription_file)
 
     def destroy(self):
         if os.path.exists(self.folder):
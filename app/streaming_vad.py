@@ -0,0 +1,327 @@
+import itertools
+import math
+from typing import Iterator, List, Tuple
+
+import ffmpeg
+import numpy as np
+
+from app.PcmStore import PCM_SAMPLE_WIDTH_BYTES, PcmStore
+from app.VadModelRegistry import VadModelRegistry
+from app.config import WAV_SAMPLING_RATE
+
+PROGRESS_REPORT_INTERVAL_S = 10
+
+
+class PcmStreamReader:
+    """Decodes any ffmpeg-readable input to mono PCM and hands it out window by window.
+
+    Only one block of samples is held in memory at a time, so memory use does
+    not depend on the recording length, and windows are available while ffmpeg
+    is still decoding.
+    """
+
+    def __init__(
+        self,
+        input_file_location: str,
+        sampling_rate: int = WAV_SAMPLING_RATE,
+        block_size_samples: int = WAV_SAMPLING_RATE,
+    ):
+        self.input_file_location = input_file_location
+        self.sampling_rate = sampling_rate
+        self.block_size_samples = block_size_samples
+        self.samples_read = 0
+
+    def iter_windows(self, window_size_samples: int) -> Iterator[np.ndarray]:
+        """Yields float32 windows; the last one is zero-padded to full size."""
+        process = (
+            ffmpeg.input(self.input_file_location)
+            .output(
+                "pipe:", format="s16le", acodec="pcm_s16le", ac=1, ar=self.sampling_rate
+            )
+            .global_args("-loglevel", "error")
+            .run_async(pipe_stdout=True)
+        )
+
+        window_size_bytes = window_size_samples * PCM_SAMPLE_WIDTH_BYTES
+        block_size_bytes = max(self.block_size_samples * PCM_SAMPLE_WIDTH_BYTES, window_size_bytes)
+        buffer = bytearray()
+
+        try:
+            while data := process.stdout.read(block_size_bytes):
+                buffer += data
+                full_windows_bytes = len(buffer) - len(buffer) % window_size_bytes
+                if not full_windows_bytes:
+                    continue
+
+                samples = np.frombuffer(bytes(buffer[:full_windows_bytes]), dtype=np.int16)
+                del buffer[:full_windows_bytes]
+                self.samples_read += len(samples)
+
+                for window in samples.reshape(-1, window_size_samples):
+                    yield window.astype(np.float32) / 32768.0
+        finally:
+            process.stdout.close()
+            return_code = process.wait()
+
+        if return_code != 0:
+            raise RuntimeError(f"ffmpeg failed to decode {self.input_file_location}")
+
+        samples = np.frombuffer(
+            bytes(buffer[: len(buffer) - len(buffer) % PCM_SAMPLE_WIDTH_BYTES]),
+            dtype=np.int16,
+        )
+        if len(samples):
+            self.samples_read += len(samples)
+            window = np.zeros(window_size_samples, dtype=np.float32)
+            window[: len(samples)] = samples.astype(np.float32) / 32768.0
+            yield window
+
+
+class SpeechSegmentTracker:
+    """Incremental version of Silero's get_speech_timestamps post-processing.
+
+    Speech probabilities are fed one window or one block at a time and segments
+    are emitted in samples, padded the same way Silero pads them. Padding
+    depends on the gap to the next segment, so a segment is held back until that
+    one is known, unless min_silence already guarantees a gap wide enough for
+    full padding.
+    `max_speech_duration_s` is not supported, the bot doesn't use it.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.5,
+        sampling_rate: int = WAV_SAMPLING_RATE,
+        min_speech_duration_ms: int = 250,
+        min_silence_duration_ms: int = 100,
+        speech_pad_ms: int = 30,
+        window_size_samples: int = 512,
+    ):
+        self.threshold = threshold
+        self.neg_threshold = threshold - 0.15
+        self.window_size_samples = window_size_samples
+        self.min_speech_samples = sampling_rate * min_speech_duration_ms / 1000
+        self.min_silence_samples = sampling_rate * min_silence_duration_ms / 1000
+        self.speech_pad_samples = sampling_rate * speech_pad_ms / 1000
+
+        self.windows_processed = 0
+        self.triggered = False
+        self.speech_start = 0
+        self.temp_end = 0
+        self.pending_segment: dict | None = None
+
+    def _add_segment(self, start: int, end: int, ended_by_silence: bool) -> List[dict]:
+        segment = {"start": start, "end": end}
+        segments = []
+
+        if self.pending_segment is None:
+            segment["start"] = int(max(0, start - self.speech_pad_samples))
+        else:
+            previous_segment = self.pending_segment
+            silence_duration = segment["start"] - previous_segment["end"]
+            if silence_duration < 2 * self.speech_pad_samples:
+                previous_segment["end"] += int(silence_duration // 2)
+                segment["start"] = int(max(0, segment["start"] - silence_duration // 2))
+            else:
+                previous_segment["end"] = int(
+                    previous_segment["end"] + self.speech_pad_samples
+                )
+                segment["start"] = int(
+                    max(0, segment["start"] - self.speech_pad_samples)
+                )
+            segments.append(previous_segment)
+
+        self.pending_segment = segment
+
+        # The next segment starts at least min_silence later, which can't change this padding.
+        if ended_by_silence and self.min_silence_samples >= 2 * self.speech_pad_samples:
+            segment["end"] = int(segment["end"] + self.speech_pad_samples)
+            segments.append(segment)
+            self.pending_segment = None
+
+        return segments
+
+    def process(self, speech_prob: float) -> List[dict]:
+        current_sample = self.window_size_samples * self.windows_processed
+        self.windows_processed += 1
+
+        if speech_prob >= self.threshold and self.temp_end:
+            self.temp_end = 0
+
+        if speech_prob >= self.threshold and not self.triggered:
+            self.triggered = True
+            self.speech_start = current_sample
+            return []
+
+        if speech_prob < self.neg_threshold and self.triggered:
+            if not self.temp_end:
+                self.temp_end = current_sample
+            if current_sample - self.temp_end < self.min_silence_samples:
+                return []
+
+            speech_end = self.temp_end
+            self.temp_end = 0
+            self.triggered = False
+            if speech_end - self.speech_start > self.min_speech_samples:
+                return self._add_segment(
+                    self.speech_start, speech_end, ended_by_silence=True
+                )
+
+        return []
+
+    def process_block(self, speech_probs: np.ndarray) -> List[dict]:
+        """Same as calling `process` for every probability, vectorized over the block.
+
+        Thresholds are applied to the whole block at once; Python only loops
+        over the speech starts and ends found in it.
+        """
+        speech_probs = np.asarray(speech_probs)
+        window_count = len(speech_probs)
+        if not window_count:
+            return []
+
+        indexes = np.arange(window_count)
+        positions = self.window_size_samples * (self.windows_processed + indexes)
+        is_speech = speech_probs >= self.threshold
+        is_silence = speech_probs < self.neg_threshold
+
+        # temp_end as seen by `process`: the first silence after the latest speech window
+        last_speech = np.maximum.accumulate(np.where(is_speech, indexes, -1))
+        next_silence = np.minimum.accumulate(
+            np.where(is_silence, indexes, window_count)[::-1]
+        )[::-1]
+        next_silence = np.append(next_silence, window_count)
+        first_silence = next_silence[last_speech + 1]
+        if self.temp_end:
+            carried_temp_end = self.temp_end
+        elif next_silence[0] < window_count:
+            carried_temp_end = int(positions[next_silence[0]])
+        else:
+            carried_temp_end = 0
+        temp_ends = np.where(
+            last_speech >= 0,
+            self.window_size_samples * (self.windows_processed + first_silence),
+            carried_temp_end,
+        )
+
+        speech_windows = np.flatnonzero(is_speech)
+        end_windows = np.flatnonzero(is_silence & (positions - temp_ends >= self.min_silence_samples))
+
+        segments = []
+        cursor = 0
+        while True:
+            if not self.triggered:
+                i = np.searchsorted(speech_windows, cursor)
+                if i == len(speech_windows):
+                    break
+                start_window = speech_windows[i]
+                self.triggered = True
+                self.speech_start = int(positions[start_window])
+                self.temp_end = 0
+                cursor = start_window + 1
+                continue
+
+            i = np.searchsorted(end_windows, cursor)
+            if i == len(end_windows):
+                if last_speech[-1] < 0:
+                    self.temp_end = carried_temp_end
+                elif first_silence[-1] < window_count:
+                    self.temp_end = int(temp_ends[-1])
+                else:
+                    self.temp_end = 0
+                break
+            end_window = end_windows[i]
+            speech_end = int(temp_ends[end_window])
+            self.triggered = False
+            self.temp_end = 0
+            cursor = end_window + 1
+            if speech_end - self.speech_start > self.min_speech_samples:
+                segments += self._add_segment(self.speech_start, speech_end, ended_by_silence=True)
+
+        self.windows_processed += window_count
+        return segments
+
+    def get_settled_until_samples(self) -> int:
+        """Position before which no unseen segment boundary can appear."""
+        if self.pending_segment is not None:
+            settled_until = self.pending_segment["start"] - 1
+        elif self.triggered:
+            settled_until = self.speech_start - self.speech_pad_samples - 1
+        else:
+            current_sample = self.window_size_samples * self.windows_processed
+            settled_until = current_sample - self.speech_pad_samples - 1
+
+        return int(max(0, settled_until))
+
+    def finish(self, audio_length_samples: int) -> List[dict]:
+        segments = []
+
+        if (
+            self.triggered
+            and audio_length_samples - self.speech_start > self.min_speech_samples
+        ):
+            segments += self._add_segment(
+                self.speech_start, audio_length_samples, ended_by_silence=False
+            )
+            self.triggered = False
+
+        if self.pending_segment is not None:
+            self.pending_segment["end"] = int(
+                min(audio_length_samples, self.pending_segment["end"] + self.speech_pad_samples)
+            )
+            segments.append(self.pending_segment)
+            self.pending_segment = None
+
+        return segments
+
+
+def iter_speech_progress(
+    audio: str | PcmStore,
+    threshold: float = 0.5,
+    min_speech_duration_ms: int = 500,
+    min_silence_duration_ms: int = 500,
+) -> Iterator[Tuple[List[dict], float]]:
+    """Yields (new speech segments, settled time) pairs, both in seconds.
+
+    Every segment boundary before the settled time is already known. A pair is
+    yielded for every PROGRESS_REPORT_INTERVAL_S of audio; the last one settles
+    the whole file.
+    `audio` is a file to decode on the fly or an already decoded PcmStore.
+    """
+    window_size_samples = 512 if WAV_SAMPLING_RATE == 16000 else 256
+    report_interval_windows = int(
+        PROGRESS_REPORT_INTERVAL_S * WAV_SAMPLING_RATE / window_size_samples
+    )
+    reader = audio if isinstance(audio, PcmStore) else PcmStreamReader(audio)
+    tracker = SpeechSegmentTracker(
+        threshold=threshold,
+        sampling_rate=WAV_SAMPLING_RATE,
+        min_speech_duration_ms=min_speech_duration_ms,
+        min_silence_duration_ms=min_silence_duration_ms,
+        window_size_samples=window_size_samples,
+    )
+
+    def to_seconds(segment: dict) -> dict:
+        return {
+            "start": float(segment["start"] / WAV_SAMPLING_RATE),
+            "end": float(segment["end"] / WAV_SAMPLING_RATE),
+        }
+
+    with VadModelRegistry.session() as vad_stream:
+        windows = reader.iter_windows(window_size_samples)
+        # one block per report, so the model runs and thresholds work on arrays
+        while block := list(itertools.islice(windows, report_interval_windows)):
+            segments = tracker.process_block(vad_stream.get_speech_probs(np.stack(block)))
+            yield (
+                [to_seconds(segment) for segment in segments],
+                tracker.get_settled_until_samples() / WAV_SAMPLING_RATE,
+            )
+
+        segments = tracker.finish(reader.samples_read)
+        yield [to_seconds(segment) for segment in segments], math.inf
+
+
+def iter_speech_timestamps(audio: str | PcmStore, **vad_options) -> Iterator[dict]:
+    """Yields speech segments in seconds while the input is still being decoded."""
+    for segments, _ in iter_speech_progress(audio, **vad_options):
+        yield from segments
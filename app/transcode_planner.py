@@ -0,0 +1,111 @@
+from typing import List
+
+from app.media_converter import get_audio_stream
+
+# Codecs that can be cut at packet boundaries and passed on without re-encoding,
+# with the extension and ffmpeg muxer to put them in.
+STREAM_COPY_FORMATS = {
+    "opus": ("ogg", "ogg"),
+    "vorbis": ("ogg", "ogg"),
+    "aac": ("m4a", "ipod"),
+    "mp3": ("mp3", "mp3"),
+    "flac": ("flac", "flac"),
+}
+# A backend that decodes anything itself takes any codec in Matroska.
+ANY_CODEC_COPY_FORMAT = ("mka", "matroska")
+# Container overhead and bitrate peaks on top of the nominal bitrate.
+SIZE_HEADROOM = 1.1
+
+
+class TranscodePlan:
+    def __init__(
+        self, extension: str, output_options: dict, bit_rate: int | None, is_copy: bool
+    ):
+        self.extension = extension
+        self.output_options = output_options
+        self.bit_rate = bit_rate
+        self.is_copy = is_copy
+
+    def fits(self, duration_s: float, max_file_size_bytes: int | None) -> bool:
+        if max_file_size_bytes is None:
+            return True
+        if self.bit_rate is None:
+            return False
+        return self.bit_rate / 8 * duration_s * SIZE_HEADROOM <= max_file_size_bytes
+
+
+# Speech-only mono targets, from the cheapest to encode to the smallest.
+ENCODE_TARGETS = [
+    TranscodePlan(
+        "mp3",
+        {"format": "mp3", "acodec": "libmp3lame", "ac": 1, "ar": 24000, "ab": "64k"},
+        bit_rate=64_000,
+        is_copy=False,
+    ),
+    TranscodePlan(
+        "mp3",
+        {"format": "mp3", "acodec": "libmp3lame", "ac": 1, "ar": 16000, "ab": "32k"},
+        bit_rate=32_000,
+        is_copy=False,
+    ),
+    TranscodePlan(
+        "ogg",
+        {"format": "ogg", "acodec": "libopus", "ac": 1, "ar": 16000, "ab": "16k"},
+        bit_rate=16_000,
+        is_copy=False,
+    ),
+]
+
+
+def get_bit_rate(probe: dict, stream: dict) -> int | None:
+    # the container bitrate includes video, so it only ever overestimates the audio
+    bit_rate = stream.get("bit_rate") or probe["format"].get("bit_rate")
+    return int(bit_rate) if bit_rate else None
+
+
+def get_stream_copy_plan(
+    probe: dict | None, supported_extensions: List[str] | None
+) -> TranscodePlan | None:
+    stream = get_audio_stream(probe) if probe else None
+    if stream is None:
+        return None
+
+    copy_format = STREAM_COPY_FORMATS.get(stream["codec_name"])
+    if copy_format is None and supported_extensions is None:
+        copy_format = ANY_CODEC_COPY_FORMAT
+    if copy_format is None:
+        return None
+
+    extension, muxer = copy_format
+    if supported_extensions is not None and extension not in supported_extensions:
+        return None
+
+    return TranscodePlan(
+        extension,
+        {"format": muxer, "acodec": "copy"},
+        bit_rate=get_bit_rate(probe, stream),
+        is_copy=True,
+    )
+
+
+def plan_transcode(
+    probe: dict | None,
+    duration_s: float,
+    supported_extensions: List[str] | None,
+    max_file_size_bytes: int | None,
+) -> TranscodePlan:
+    """Picks how to produce `duration_s` of the probed audio for a transcription backend.
+
+    Stream copy when the codec fits a container the backend takes and the result stays
+    under its size limit, otherwise the cheapest encode that stays under it. Without a
+    probe nothing is known about the input, so it is encoded.
+    """
+    copy_plan = get_stream_copy_plan(probe, supported_extensions)
+    if copy_plan and copy_plan.fits(duration_s, max_file_size_bytes):
+        return copy_plan
+
+    for target in ENCODE_TARGETS:
+        if target.fits(duration_s, max_file_size_bytes):
+            return target
+
+    return ENCODE_TARGETS[-1]
@@ -0,0 +1,53 @@
+import os
+from typing import Iterable
+
+from jinja2 import Environment, FileSystemLoader, Template
+
+VIEWS_DIR = os.path.join(os.path.dirname(__file__), "views")
+
+# Loaded and compiled once per process, not per document.
+environment = Environment(loader=FileSystemLoader(VIEWS_DIR))
+transcription_template: Template = environment.get_template("transcription_template.html")
+
+
+def write_transcription(location: str, paragraphs: Iterable[str]) -> None:
+    """Streams the rendered document to the file instead of building it in memory."""
+    with open(location, "w") as file:
+        file.writelines(transcription_template.generate(paragraphs=paragraphs))
+
+
+class TranscriptionWriter:
+    """Writes the transcription document paragraph by paragraph, as chunks arrive.
+
+    Renders the header, paragraphs and footer blocks of the same template, so
+    the result is identical to write_transcription().
+    """
+
+    def __init__(self, location: str):
+        self.location = location
+        self.paragraphs_count = 0
+        self.file = open(location, "w")
+        self._write_block("header")
+
+    def _write_block(self, name: str, **context) -> None:
+        render_block = transcription_template.blocks[name]
+        self.file.writelines(render_block(transcription_template.new_context(context)))
+
+    def add_paragraph(self, paragraph: str) -> None:
+        self._write_block("paragraphs", paragraphs=[paragraph])
+        self.paragraphs_count += 1
+        # readable by others as it grows
+        self.file.flush()
+
+    def finish(self) -> None:
+        self._write_block("footer")
+        self.file.close()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> "TranscriptionWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
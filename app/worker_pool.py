@@ -0,0 +1,67 @@
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.config import CPU_WORKERS, IO_WORKERS
+
+_process_pool: ProcessPoolExecutor | None = None
+_thread_pool: ThreadPoolExecutor | None = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+
+    if _process_pool is None:
+        # "spawn" keeps workers free of the event loop and threads of the bot process.
+        _process_pool = ProcessPoolExecutor(
+            max_workers=CPU_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    return _process_pool
+
+
+def get_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(
+            max_workers=IO_WORKERS, thread_name_prefix="io_worker"
+        )
+
+    return _thread_pool
+
+
+async def _run_in_executor(executor: Executor, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_in_process(func, *args, **kwargs):
+    """Run CPU-bound or subprocess-heavy work (ffmpeg) in the process pool.
+
+    Workers are spawned fresh and share no state with the bot process, so work
+    that needs a loaded model doesn't belong here.
+    """
+    return await _run_in_executor(get_process_pool(), func, *args, **kwargs)
+
+
+async def run_in_thread(func, *args, **kwargs):
+    """Run blocking calls in the thread pool: network and disk IO, and model inference.
+
+    VAD runs here, so every job uses the one Silero model the bot process has
+    warmed up; onnxruntime releases the GIL while the model runs.
+    """
+    return await _run_in_executor(get_thread_pool(), func, *args, **kwargs)
+
+
+def shutdown_worker_pools() -> None:
+    global _process_pool, _thread_pool
+
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+        _process_pool = None
+
+    if _thread_pool is not None:
+        _thread_pool.shutdown(cancel_futures=True)
+        _thread_pool = None
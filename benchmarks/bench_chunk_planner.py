@@ -0,0 +1,72 @@
+import argparse
+import random
+import time
+
+from app.chunk_processor import calculate_chunks, find_best_cut_position
+from app.config import MAX_CHUNK_DURATION_S, MIN_CHUNK_DURATION_S
+
+
+def generate_timestamps(segments: int) -> tuple[list, int]:
+    generator = random.Random(segments)
+    timestamps = []
+    position = 0.0
+    for _ in range(segments):
+        start = position + generator.uniform(0.05, 2)
+        position = start + generator.uniform(0.3, 10)
+        timestamps.append({"start": start, "end": position})
+
+    return timestamps, int(position) + 1
+
+
+def calculate_chunks_linear_scan(silero_timestamps: list, audio_duration_s: int) -> list:
+    """The previous planner: a full scan of all segments for every chunk."""
+    chunks = []
+    start = 0.0
+
+    while start < audio_duration_s:
+        end = min(start + MAX_CHUNK_DURATION_S, audio_duration_s)
+        best_cut_position = find_best_cut_position(
+            silero_timestamps, start + MIN_CHUNK_DURATION_S, end
+        )
+        if best_cut_position and abs(best_cut_position - start) >= MIN_CHUNK_DURATION_S:
+            chunks.append([start, best_cut_position])
+            start = best_cut_position
+        else:
+            if end - start < MIN_CHUNK_DURATION_S:
+                end = min(start + MIN_CHUNK_DURATION_S, audio_duration_s)
+            chunks.append([start, end])
+            start = end
+
+    return chunks
+
+
+def measure(planner, *args) -> float:
+    started_at = time.perf_counter()
+    planner(*args)
+    return time.perf_counter() - started_at
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chunk planner scaling benchmark.")
+    parser.add_argument(
+        "--segments", type=int, nargs="+", default=[10**3, 10**4, 10**5, 10**6]
+    )
+    parser.add_argument(
+        "--linear-scan-limit",
+        type=int,
+        default=10**5,
+        help="skip the quadratic planner above this many segments",
+    )
+    args = parser.parse_args()
+
+    for segments in args.segments:
+        timestamps, duration = generate_timestamps(segments)
+        results = [
+            f"greedy {measure(calculate_chunks, timestamps, duration, 'greedy'):.3f}s",
+            f"optimal {measure(calculate_chunks, timestamps, duration, 'optimal'):.3f}s",
+        ]
+        if segments <= args.linear_scan_limit:
+            linear_scan = measure(calculate_chunks_linear_scan, timestamps, duration)
+            results.append(f"linear scan {linear_scan:.3f}s")
+
+        print(f"{segments} segments ({duration / 3600:.1f} h): " + ", ".join(results))
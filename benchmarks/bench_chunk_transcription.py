@@ -0,0 +1,35 @@
+import argparse
+import asyncio
+import time
+
+from app.ChunkTranscriptionPipeline import ChunkTranscriptionPipeline
+
+
+async def benchmark(chunks: int, delay_s: float, max_in_flight: int) -> float:
+    async def fake_transcribe(chunk_path: str) -> str:
+        await asyncio.sleep(delay_s)
+        return chunk_path
+
+    pipeline = ChunkTranscriptionPipeline(fake_transcribe, max_in_flight=max_in_flight)
+    chunk_paths = [f"chunk_{i}.mp3" for i in range(chunks)]
+
+    started_at = time.perf_counter()
+    await pipeline.run(chunk_paths)
+    return time.perf_counter() - started_at
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Wall-clock time of the chunk pipeline with a fixed-delay fake transcriber."
+    )
+    parser.add_argument("--chunks", type=int, default=40)
+    parser.add_argument("--delay", type=float, default=0.25)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    for max_in_flight in args.concurrency:
+        elapsed = asyncio.run(benchmark(args.chunks, args.delay, max_in_flight))
+        print(
+            f"in_flight={max_in_flight}: {elapsed:.2f}s "
+            f"({args.chunks * args.delay / elapsed:.1f}x vs serial)"
+        )
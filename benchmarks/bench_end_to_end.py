@@ -0,0 +1,310 @@
+"""End-to-end benchmark of TelegramTask.handle_media without network access.
+
+Each scenario runs in its own Python process against a fake Bot API, a stub
+Whisper server and synthetic audio, and prints one JSON object. The parent
+collects them into a single JSON document, so runs can be diffed.
+
+    python -m benchmarks.bench_end_to_end --scenarios voice 30min --concurrency 1 4
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import ffmpeg
+import numpy as np
+from telegram import Bot, Update
+from telegram.request import BaseRequest
+
+from app.JobScheduler import JobScheduler
+from app.JobStore import JobStore
+from app.ScratchSpace import ScratchSpace
+from app.TelegramPermissionChecker import TelegramPermissionChecker
+from app.TelegramTask import TelegramTask
+from app.TranscriptionCache import TranscriptionCache
+from app.WhisperApiClient import WhisperApiClient
+from app.metrics import STAGE_OBSERVERS
+from app.worker_pool import shutdown_worker_pools
+
+# (media type, audio duration, file extension, number of messages)
+SCENARIOS = {
+    "voice": ("voice", 30, "oga", 20),
+    "30min": ("audio", 30 * 60, "mp3", 2),
+    "3h": ("audio", 3 * 60 * 60, "mp3", 1),
+}
+
+
+class FakeBotApiRequest(BaseRequest):
+    """Answers Bot API calls from memory after a fixed latency."""
+
+    def __init__(self, files: dict[str, str], latency_s: float):
+        self.files = files
+        self.latency_s = latency_s
+        self.message_ids = itertools.count(1_000_000)
+        self.calls: dict[str, int] = defaultdict(int)
+        # TelegramTask reports failures to the user instead of raising
+        self.errors: list[str] = []
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def get_result(self, method: str, parameters: dict):
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        if method == "getFile":
+            file_id = parameters["file_id"]
+            return {"file_id": file_id, "file_unique_id": file_id, "file_path": self.files[file_id]}
+        if method == "deleteMessage":
+            return True
+        if parameters.get("text", "").startswith("⚠️"):
+            self.errors.append(parameters["text"])
+        return {
+            "message_id": parameters.get("message_id") or next(self.message_ids),
+            "date": int(time.time()),
+            "chat": {"id": int(parameters.get("chat_id", 0)), "type": "private"},
+            "text": parameters.get("text", ""),
+        }
+
+    async def do_request(self, url: str, method: str, request_data=None, **kwargs):
+        api_method = url.rsplit("/", 1)[-1]
+        self.calls[api_method] += 1
+        await asyncio.sleep(self.latency_s)
+        parameters = request_data.parameters if request_data else {}
+        result = self.get_result(api_method, parameters)
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+def start_stub_whisper_server(latency_s: float) -> ThreadingHTTPServer:
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            time.sleep(latency_s)
+            payload = json.dumps({"text": "Lorem ipsum dolor sit amet. " * 20}).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def generate_audio(output: str, duration_s: int, frequency: int) -> None:
+    """Tone bursts with pauses, so VAD and the chunk planner have gaps to work with.
+
+    Every file gets its own frequency, so the content-hash cache never short-circuits a job.
+    """
+    tone = ffmpeg.input(f"sine=frequency={frequency}:sample_rate=16000", f="lavfi", t=duration_s)
+    gated = tone.filter("volume", volume="if(lt(mod(t,9),7),1,0)", eval="frame")
+    gated.output(output, ac=1).run(overwrite_output=True, quiet=True)
+
+
+def build_user_id(message_id: int) -> int:
+    return 10 + message_id
+
+
+def build_update(bot: Bot, message_id: int, media_type: str, file_id: str, duration_s: int):
+    user = {"id": build_user_id(message_id), "is_bot": False, "first_name": "Bench"}
+    media = {"file_id": file_id, "file_unique_id": file_id, "duration": duration_s}
+    if media_type == "audio":
+        media["title"] = file_id
+    return Update.de_json(
+        {
+            "update_id": message_id,
+            "message": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": user["id"], "type": "private"},
+                "from": user,
+                media_type: media,
+            },
+        },
+        bot,
+    )
+
+
+def get_percentiles(samples: list[float]) -> dict:
+    return {
+        "count": len(samples),
+        "p50_s": round(float(np.percentile(samples, 50)), 3),
+        "p95_s": round(float(np.percentile(samples, 95)), 3),
+    }
+
+
+async def run_scenario(args: argparse.Namespace, work_dir: str) -> dict:
+    media_type, duration_s, extension, messages = SCENARIOS[args.scenario]
+    messages = args.messages or messages
+
+    files = {}
+    for i in range(messages):
+        file_id = f"{args.scenario}_{i}"
+        files[file_id] = os.path.join(work_dir, f"{file_id}.{extension}")
+        generate_audio(files[file_id], duration_s, frequency=200 + 10 * i)
+
+    stage_samples: dict[str, list[float]] = defaultdict(list)
+    STAGE_OBSERVERS.append(
+        lambda stage, _media_type, _audio_length, elapsed_s: stage_samples[stage].append(elapsed_s)
+    )
+
+    whisper_server = start_stub_whisper_server(args.whisper_latency)
+    request = FakeBotApiRequest(files, args.telegram_latency)
+    bot = Bot("1:bench", request=request, get_updates_request=request, local_mode=True)
+    await bot.initialize()
+    transcriber = WhisperApiClient(
+        api_key="bench",
+        base_url=f"http://127.0.0.1:{whisper_server.server_port}/v1",
+        requests_per_minute=1_000_000,
+    )
+    transcription_cache = TranscriptionCache(os.path.join(work_dir, "cache.sqlite3"))
+    job_store = JobStore(os.path.join(work_dir, "jobs.sqlite3"))
+    scratch_space = ScratchSpace()
+    # the bench users are allowed directly, as on the common path
+    os.environ["TELEGRAM_ALLOWED_IDS"] = ",".join(
+        str(build_user_id(message_id)) for message_id in range(1, messages + 1)
+    )
+    permission_checker = TelegramPermissionChecker(bot)
+    scheduler = JobScheduler(
+        max_concurrent_jobs=args.concurrency, max_concurrent_audio_s=math.inf
+    )
+
+    async def process(message_id: int, file_id: str) -> None:
+        update = build_update(bot, message_id, media_type, file_id, duration_s)
+        task = TelegramTask(
+            bot,
+            update,
+            permission_checker,
+            transcriber,
+            transcription_cache,
+            job_store,
+            scratch_space,
+        )
+        started_at = time.perf_counter()
+        if not await task.is_allowed():
+            raise RuntimeError(f"Bench user of message {message_id} is not allowed")
+        await scheduler.run(
+            chat_id=task.user_message.chat.id,
+            user_id=task.user.id,
+            audio_duration_s=duration_s,
+            job=task.handle_media,
+            on_queued=task.report_queue_position,
+        )
+        stage_samples["total"].append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    try:
+        await asyncio.gather(
+            *(process(message_id, file_id) for message_id, file_id in enumerate(files, 1))
+        )
+        elapsed_s = time.perf_counter() - started_at
+    finally:
+        await transcriber.aclose()
+        whisper_server.shutdown()
+        transcription_cache.close()
+        job_store.close()
+        shutdown_worker_pools()
+
+    audio_hours = messages * duration_s / 3600
+    return {
+        "scenario": args.scenario,
+        "concurrency": args.concurrency,
+        "messages": messages,
+        "audio_duration_s": duration_s,
+        "wall_time_s": round(elapsed_s, 3),
+        "throughput_audio_hours_per_hour": round(audio_hours / (elapsed_s / 3600), 1),
+        "stages": {stage: get_percentiles(samples) for stage, samples in stage_samples.items()},
+        "telegram_calls": dict(request.calls),
+        "errors": request.errors,
+        # ru_maxrss is in KiB on Linux; children include the process pool and ffmpeg
+        "peak_rss_mib": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_children_rss_mib": round(
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1
+        ),
+    }
+
+
+def run_in_subprocess(args: argparse.Namespace, scenario: str, concurrency: int) -> dict:
+    """Fresh interpreter per run, so peak RSS and warm caches don't leak between runs."""
+    work_dir = tempfile.mkdtemp(prefix=f"bench_{scenario}_")
+    command = [
+        sys.executable, "-m", "benchmarks.bench_end_to_end",
+        "--scenario", scenario,
+        "--concurrency", str(concurrency),
+        "--work-dir", work_dir,
+        "--whisper-latency", str(args.whisper_latency),
+        "--telegram-latency", str(args.telegram_latency),
+    ]
+    if args.messages:
+        command += ["--messages", str(args.messages)]
+
+    try:
+        completed = subprocess.run(
+            command,
+            capture_output=True,
+            text=True,
+            # app.config reads DATA_DIR at import time
+            env={**os.environ, "DATA_DIR": os.path.join(work_dir, "data")},
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if completed.returncode != 0:
+        return {
+            "scenario": scenario,
+            "concurrency": concurrency,
+            "error": completed.stderr.strip().splitlines()[-1:],
+        }
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="End-to-end throughput, stage latency and peak RSS with stub backends."
+    )
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--messages", type=int, help="override messages per scenario")
+    parser.add_argument("--whisper-latency", type=float, default=1.0)
+    parser.add_argument("--telegram-latency", type=float, default=0.05)
+    parser.add_argument("--scenario", choices=list(SCENARIOS), help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    if args.scenario:
+        # child process: one scenario at one concurrency level
+        args.concurrency = args.concurrency[0]
+        print(json.dumps(asyncio.run(run_scenario(args, args.work_dir))))
+        sys.exit()
+
+    report = {
+        "whisper_latency_s": args.whisper_latency,
+        "telegram_latency_s": args.telegram_latency,
+        "runs": [
+            run_in_subprocess(args, scenario, concurrency)
+            for scenario in args.scenarios
+            for concurrency in args.concurrency
+        ],
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
@@ -0,0 +1,82 @@
+"""Time to cut a long recording into chunks, the old way and the ways the pipeline does now.
+
+The old splitter converted the recording to WAV and ran one ffmpeg process per
+chunk with the seek as an output option, so every chunk decoded everything
+before it. The pipeline now cuts from the decoded samples in the PcmStore, or
+from the original with the seek on the input side when there are none. All
+three encode the same chunks with the same options.
+
+    python -m benchmarks.bench_split_audio --duration 7200
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import ffmpeg
+
+from app.PcmStore import PcmStore
+from app.config import MAX_CHUNK_DURATION_S, WAV_SAMPLING_RATE
+from app.media_converter import transcode_audio
+from app.transcode_planner import ENCODE_TARGETS
+
+OUTPUT_OPTIONS = ENCODE_TARGETS[0].output_options
+
+
+def split_with_output_seek(wav_file: str, chunks: list, chunk_location: str) -> None:
+    """The previous splitter: one ffmpeg process per chunk, seeking as an output option."""
+    for i, chunk in enumerate(chunks):
+        ffmpeg.input(wav_file).output(
+            chunk_location.format(i), ss=chunk[0], t=chunk[1] - chunk[0], **OUTPUT_OPTIONS
+        ).run(overwrite_output=True, quiet=True)
+
+
+def split_with_input_seek(original_file: str, chunks: list, chunk_location: str) -> None:
+    for i, chunk in enumerate(chunks):
+        transcode_audio(
+            original_file, chunk_location.format(i), OUTPUT_OPTIONS, chunk[0], chunk[1]
+        )
+
+
+def split_from_pcm_store(pcm_store: PcmStore, chunks: list, chunk_location: str) -> None:
+    for i, chunk in enumerate(chunks):
+        pcm_store.encode_slice(chunk_location.format(i), chunk[0], chunk[1], OUTPUT_OPTIONS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare chunk splitting strategies.")
+    parser.add_argument("--duration", type=int, default=2 * 60 * 60)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        original_file = os.path.join(work_dir, "original.mp3")
+        wav_file = os.path.join(work_dir, "converted.wav")
+        chunk_location = os.path.join(work_dir, "chunk_{}.mp3")
+        ffmpeg.input(f"sine=frequency=440:duration={args.duration}", f="lavfi").output(
+            original_file, ac=1, ab="64k"
+        ).run(overwrite_output=True, quiet=True)
+
+        chunks = [
+            [float(start), float(min(start + MAX_CHUNK_DURATION_S, args.duration))]
+            for start in range(0, args.duration, MAX_CHUNK_DURATION_S)
+        ]
+
+        started_at = time.perf_counter()
+        ffmpeg.input(original_file).output(
+            wav_file, ar=WAV_SAMPLING_RATE, ac=1, acodec="pcm_s16le"
+        ).run(overwrite_output=True, quiet=True)
+        print(f"convert to WAV (old, once): {time.perf_counter() - started_at:.2f}s")
+
+        started_at = time.perf_counter()
+        pcm_store = PcmStore(os.path.join(work_dir, "audio.s16le"))
+        pcm_store.write(original_file)
+        print(f"decode into PcmStore (now, once): {time.perf_counter() - started_at:.2f}s")
+
+        for name, split, source in [
+            ("output seek on WAV (old)", split_with_output_seek, wav_file),
+            ("input seek on original", split_with_input_seek, original_file),
+            ("PcmStore slices", split_from_pcm_store, pcm_store),
+        ]:
+            started_at = time.perf_counter()
+            split(source, chunks, chunk_location)
+            print(f"{name}: {len(chunks)} chunks in {time.perf_counter() - started_at:.2f}s")
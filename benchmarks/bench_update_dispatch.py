@@ -0,0 +1,122 @@
+"""Load test of update dispatch: /start commands from many chats against a fake Bot API.
+
+Updates go through the Application's update queue and ChatOrderedUpdateProcessor,
+as they do in production, and every handler makes its Bot API calls with a
+fixed latency. Throughput should grow with --concurrency, while updates of one
+chat stay in order and redelivered updates are handled once.
+
+    python -m benchmarks.bench_update_dispatch --chats 50 --updates-per-chat 4 --concurrency 1 8 64
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import defaultdict
+
+from telegram import Update
+from telegram.ext import ApplicationBuilder, CallbackContext, CommandHandler
+
+from app.ChatOrderedUpdateProcessor import ChatOrderedUpdateProcessor
+from app.TelegramPermissionChecker import TelegramPermissionChecker
+from app.TelegramTask import TelegramTask
+from benchmarks.bench_end_to_end import FakeBotApiRequest
+
+
+def build_update(bot, update_id: int, chat_id: int) -> Update:
+    user = {"id": chat_id, "is_bot": False, "first_name": "Bench"}
+    return Update.de_json(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": user,
+                "text": "/start",
+                "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+            },
+        },
+        bot,
+    )
+
+
+async def benchmark(args: argparse.Namespace, concurrency: int) -> dict:
+    request = FakeBotApiRequest({}, args.telegram_latency)
+    application = (
+        ApplicationBuilder()
+        .token("1:bench")
+        .request(request)
+        .get_updates_request(request)
+        .concurrent_updates(ChatOrderedUpdateProcessor(concurrency))
+        .updater(None)
+        .build()
+    )
+    chat_ids = range(100, 100 + args.chats)
+    os.environ["TELEGRAM_ALLOWED_IDS"] = ",".join(str(chat_id) for chat_id in chat_ids)
+    permission_checker = TelegramPermissionChecker(application.bot)
+    handled: dict[int, list[int]] = defaultdict(list)
+
+    async def handle_start(update: Update, context: CallbackContext) -> None:
+        # the same calls TelegramService makes for /start
+        task = TelegramTask(
+            application.bot, update, permission_checker, None, None, None, None
+        )
+        if await task.is_allowed():
+            await task.handle_start_command()
+            await task.progress.flush()
+        handled[update.effective_chat.id].append(update.update_id)
+
+    application.add_handler(CommandHandler("start", handle_start))
+    await application.initialize()
+    await application.start()
+
+    updates = [
+        build_update(application.bot, update_id, chat_ids[update_id % args.chats])
+        for update_id in range(args.chats * args.updates_per_chat)
+    ]
+    # as if Telegram retried every tenth delivery
+    redelivered = updates[::10]
+
+    started_at = time.perf_counter()
+    for update in updates + redelivered:
+        await application.update_queue.put(update)
+    await application.update_queue.join()
+    elapsed_s = time.perf_counter() - started_at
+
+    await application.stop()
+    await application.shutdown()
+
+    handled_updates = sum(len(update_ids) for update_ids in handled.values())
+    return {
+        "concurrency": concurrency,
+        "updates": len(updates),
+        "redelivered": len(redelivered),
+        "handled": handled_updates,
+        "out_of_order_chats": sum(
+            update_ids != sorted(update_ids) for update_ids in handled.values()
+        ),
+        "wall_time_s": round(elapsed_s, 3),
+        "updates_per_s": round(handled_updates / elapsed_s, 1),
+        "telegram_calls": sum(request.calls.values()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Handler throughput of the update processor against a fake Bot API."
+    )
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--updates-per-chat", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--telegram-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    for concurrency in args.concurrency:
+        result = asyncio.run(benchmark(args, concurrency))
+        print(
+            f"concurrency={concurrency}: {result['updates_per_s']} updates/s, "
+            f"{result['handled']}/{result['updates']} handled "
+            f"({result['redelivered']} redelivered), "
+            f"{result['out_of_order_chats']} chats out of order, "
+            f"{result['telegram_calls']} API calls in {result['wall_time_s']}s"
+        )
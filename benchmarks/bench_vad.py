@@ -0,0 +1,129 @@
+"""Real-time factor of voice activity detection, ONNX Runtime engine vs the torch path.
+
+The recording is decoded into memory first, so only VAD is timed: model runs
+plus turning probabilities into segments. The torch path is how the bot ran
+VAD before, Silero's torch.hub wrapper called once per window with the
+per-window tracker; it needs torch and a silero-vad checkout in --silero-repo.
+The engine runs `--streams` copies of the recording concurrently, each in its
+own thread, as concurrent jobs do. RTF is processing time per second of audio,
+lower is better.
+
+    python -m benchmarks.bench_vad --input tests/test_files/informburo.mp3 --threads 1 2 --streams 1 4
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from app.OnnxVadEngine import OnnxVadEngine
+from app.config import SILERO_VAD_MODEL_FILE, SILERO_VAD_REPO_DIR, WAV_SAMPLING_RATE
+from app.streaming_vad import PROGRESS_REPORT_INTERVAL_S, PcmStreamReader, SpeechSegmentTracker
+
+WINDOW_SIZE_SAMPLES = 512 if WAV_SAMPLING_RATE == 16000 else 256
+BLOCK_WINDOWS = int(PROGRESS_REPORT_INTERVAL_S * WAV_SAMPLING_RATE / WINDOW_SIZE_SAMPLES)
+
+
+def read_windows(input_file: str) -> np.ndarray:
+    return np.stack(list(PcmStreamReader(input_file).iter_windows(WINDOW_SIZE_SAMPLES)))
+
+
+def create_tracker() -> SpeechSegmentTracker:
+    return SpeechSegmentTracker(
+        min_speech_duration_ms=500,
+        min_silence_duration_ms=500,
+        window_size_samples=WINDOW_SIZE_SAMPLES,
+    )
+
+
+def run_torch(windows: np.ndarray, silero_repo: str) -> tuple[float, list]:
+    import torch
+
+    model, _ = torch.hub.load(repo_or_dir=silero_repo, model="silero_vad", source="local", onnx=True)
+    tracker = create_tracker()
+    segments = []
+
+    started_at = time.perf_counter()
+    for window in windows:
+        speech_prob = model(torch.from_numpy(window), WAV_SAMPLING_RATE).item()
+        segments += tracker.process(speech_prob)
+    segments += tracker.finish(len(windows) * WINDOW_SIZE_SAMPLES)
+    return time.perf_counter() - started_at, segments
+
+
+def run_engine(
+    windows: np.ndarray, model_file: str, threads: int, streams: int
+) -> tuple[float, list, int]:
+    engine = OnnxVadEngine(model_file, intra_op_threads=threads, batch_size=streams)
+    results = [[] for _ in range(streams)]
+    barrier = threading.Barrier(streams + 1)
+
+    def detect(index: int) -> None:
+        stream = engine.open_stream()
+        tracker = create_tracker()
+        barrier.wait()
+        for start in range(0, len(windows), BLOCK_WINDOWS):
+            speech_probs = stream.get_speech_probs(windows[start : start + BLOCK_WINDOWS])
+            results[index] += tracker.process_block(speech_probs)
+        results[index] += tracker.finish(len(windows) * WINDOW_SIZE_SAMPLES)
+
+    workers = [threading.Thread(target=detect, args=(i,)) for i in range(streams)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started_at = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started_at, results[0], engine.run_count
+
+
+def get_largest_difference_s(segments: list, reference: list) -> float | None:
+    if len(segments) != len(reference):
+        return None
+    differences = [
+        abs(segment[key] - expected[key])
+        for segment, expected in zip(segments, reference)
+        for key in ("start", "end")
+    ]
+    return max(differences, default=0) / WAV_SAMPLING_RATE
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="VAD real-time factor of the ONNX Runtime engine and the torch path."
+    )
+    parser.add_argument("--input", default="tests/test_files/informburo.mp3")
+    parser.add_argument("--model-file", default=SILERO_VAD_MODEL_FILE)
+    parser.add_argument("--silero-repo", default=SILERO_VAD_REPO_DIR)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    windows = read_windows(args.input)
+    audio_duration_s = len(windows) * WINDOW_SIZE_SAMPLES / WAV_SAMPLING_RATE
+    print(f"{args.input}: {audio_duration_s:.1f}s of audio, {len(windows)} windows")
+
+    reference = None
+    try:
+        elapsed_s, reference = run_torch(windows, args.silero_repo)
+        print(
+            f"torch, per window: RTF {elapsed_s / audio_duration_s:.4f}, "
+            f"{len(reference)} segments"
+        )
+    except Exception as e:
+        print(f"torch, per window: skipped ({e})")
+
+    for threads in args.threads:
+        for streams in args.streams:
+            elapsed_s, segments, run_count = run_engine(
+                windows, args.model_file, threads, streams
+            )
+            if reference is None:
+                reference = segments
+            print(
+                f"onnx, threads={threads} streams={streams}: "
+                f"RTF {elapsed_s / (streams * audio_duration_s):.4f}, "
+                f"{streams * len(windows) / run_count:.1f} windows per run, "
+                f"{len(segments)} segments, largest boundary difference "
+                f"{get_largest_difference_s(segments, reference)}s"
+            )
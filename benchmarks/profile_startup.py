@@ -0,0 +1,115 @@
+"""Import time and resident memory per module when the bot starts.
+
+Two fresh interpreters import the entry point: one with `-X importtime`, and
+one that imports the same modules one by one, in the order Python finished
+them, and reads its RSS after each. A module's RSS is what importing it added
+on top of the modules before it.
+
+    python -m benchmarks.profile_startup --module app.main --top 25
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+RSS_SCRIPT = """
+import importlib, json, os, sys, time
+
+def get_rss_bytes():
+    with open("/proc/self/statm") as file:
+        return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+result = {}
+started_at = time.perf_counter()
+for module in sys.argv[1:]:
+    rss_before = get_rss_bytes()
+    try:
+        importlib.import_module(module)
+    except ImportError:
+        # optional imports that failed in the profiled run too, e.g. Windows modules
+        pass
+    result[module] = get_rss_bytes() - rss_before
+print(json.dumps({"rss": result, "total_rss": get_rss_bytes(), "wall_time_s": time.perf_counter() - started_at}))
+"""
+
+
+def parse_import_times(stderr: str) -> list[dict]:
+    """Lines look like `import time:  self [us] | cumulative | <indent>module`."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append(
+            {
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            }
+        )
+    return modules
+
+
+def is_reported(module: str, app_package: str) -> bool:
+    # the app's own modules and third-party packages, not their submodules
+    return module.startswith(f"{app_package}.") or "." not in module
+
+
+def profile(entry_module: str) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {entry_module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    app_package = entry_module.split(".")[0]
+    # in the order imports finished, so every module's dependencies come first
+    modules = {}
+    for module in parse_import_times(completed.stderr):
+        if is_reported(module["module"], app_package):
+            modules.setdefault(module["module"], module)
+    modules = list(modules.values())
+
+    completed = subprocess.run(
+        [sys.executable, "-c", RSS_SCRIPT, *(module["module"] for module in modules)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    memory = json.loads(completed.stdout)
+    for module in modules:
+        module["rss_mib"] = round(memory["rss"][module["module"]] / 1024**2, 1)
+
+    return {
+        "module": entry_module,
+        "import_time_s": round(max(m["cumulative_ms"] for m in modules) / 1000, 3),
+        "total_rss_mib": round(memory["total_rss"] / 1024**2, 1),
+        "modules": sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Import time and RSS per module of a cold start."
+    )
+    parser.add_argument("--module", default="app.main", help="entry point to import")
+    parser.add_argument("--top", type=int, default=25, help="modules to list, by cumulative time")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args()
+
+    report = profile(args.module)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        sys.exit()
+
+    print(
+        f"import {report['module']}: {report['import_time_s']:.3f}s, "
+        f"{report['total_rss_mib']} MiB RSS"
+    )
+    print(f"{'module':<40} {'self ms':>9} {'total ms':>9} {'RSS MiB':>8}")
+    for module in report["modules"][: args.top]:
+        print(
+            f"{module['module']:<40} {module['self_ms']:>9.1f} "
+            f"{module['cumulative_ms']:>9.1f} {module['rss_mib']:>8}"
+        )
@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+from telegram import Update
+
+from app.ChatOrderedUpdateProcessor import ChatOrderedUpdateProcessor
+
+
+def build_update(update_id: int, chat_id: int) -> Update:
+    return Update.de_json(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 0,
+                "chat": {"id": chat_id, "type": "private"},
+                "text": "/start",
+            },
+        },
+        None,
+    )
+
+
+def test_chats_run_concurrently_and_keep_their_order():
+    processor = ChatOrderedUpdateProcessor(max_concurrent_updates=8)
+    handled = []
+
+    async def handle(update: Update, delay_s: float) -> None:
+        await asyncio.sleep(delay_s)
+        handled.append((update.effective_chat.id, update.update_id))
+
+    async def run() -> None:
+        updates = [build_update(update_id, chat_id=update_id % 4) for update_id in range(16)]
+        await asyncio.gather(
+            *(
+                # earlier updates are slower, so order is only kept if they are awaited
+                processor.process_update(update, handle(update, 0.05 - 0.002 * update.update_id))
+                for update in updates
+            )
+        )
+
+    started_at = time.perf_counter()
+    asyncio.run(run())
+    elapsed_s = time.perf_counter() - started_at
+
+    for chat_id in range(4):
+        update_ids = [update_id for chat, update_id in handled if chat == chat_id]
+        assert update_ids == sorted(update_ids)
+    # 4 chats in parallel, 4 updates each, not 16 in a row
+    assert elapsed_s < 0.5
+    assert not processor.chat_locks
+
+
+def test_duplicate_updates_are_dropped():
+    processor = ChatOrderedUpdateProcessor(max_concurrent_updates=4)
+    handled = []
+
+    async def handle(update: Update) -> None:
+        handled.append(update.update_id)
+
+    async def run() -> None:
+        for update_id in [1, 2, 1, 3, 2]:
+            update = build_update(update_id, chat_id=7)
+            await processor.process_update(update, handle(update))
+
+    asyncio.run(run())
+
+    assert handled == [1, 2, 3]
+
+
+def test_burst_of_one_chat_does_not_take_every_slot():
+    processor = ChatOrderedUpdateProcessor(max_concurrent_updates=2)
+    handled = []
+
+    async def handle(update: Update) -> None:
+        await asyncio.sleep(0.01)
+        handled.append(update.effective_chat.id)
+
+    async def run() -> None:
+        updates = [build_update(update_id, chat_id=1) for update_id in range(10)]
+        updates.append(build_update(10, chat_id=2))
+        await asyncio.gather(
+            *(processor.process_update(update, handle(update)) for update in updates)
+        )
+
+    asyncio.run(run())
+
+    # the other chat runs alongside the first update of the burst
+    assert handled.index(2) <= 1
+    assert processor.max_updates_in_flight == 2
@@ -1,19 +1,139 @@
-from app.chunk_processor import detect_timestamps
+import random
+
+import pytest
+
+from app.chunk_processor import (
+    IncrementalChunkPlanner,
+    SilenceGaps,
+    calculate_chunks,
+    create_chunk_planner,
+    detect_timestamps,
+    find_best_cut_position,
+    get_cut_badness,
+)
+from app.config import MAX_CHUNK_DURATION_S, MIN_CHUNK_DURATION_S
 
 
 def test_silero_timestamps():
-    audio_file_path = f"test_files/chekhov.wav"
+    audio_file_path = "tests/test_files/informburo.mp3"
 
     silero_timestamps = detect_timestamps(audio_file_path)
 
-    assert len(silero_timestamps) > 0
+    assert len(silero_timestamps) == 30
+
+    # Silero v5.1.2's own get_speech_timestamps on the same samples
+    assert abs(silero_timestamps[0]['start'] - 11.138) / 11.138 < 0.005
+    assert abs(silero_timestamps[0]['end'] - 13.278) / 13.278 < 0.005
+
+    assert abs(silero_timestamps[1]['start'] - 15.138) / 15.138 < 0.005
+    assert abs(silero_timestamps[1]['end'] - 18.686) / 18.686 < 0.005
+
+    assert abs(silero_timestamps[2]['start'] - 19.682) / 19.682 < 0.005
+    assert abs(silero_timestamps[2]['end'] - 24.894) / 24.894 < 0.005
+
+
+def generate_timestamps(seed: int, segments: int) -> tuple[list, int]:
+    generator = random.Random(seed)
+    timestamps = []
+    position = generator.uniform(0, 2)
+    for _ in range(segments):
+        start = position
+        end = start + generator.uniform(0.3, 15)
+        timestamps.append({"start": round(start, 3), "end": round(end, 3)})
+        position = end + generator.choice([0, 0.1, 0.5, generator.uniform(0, 4)])
+
+    return timestamps, int(position) + generator.randint(0, 60)
+
+
+def calculate_chunks_linear_scan(silero_timestamps: list, audio_duration_s: int) -> list:
+    chunks = []
+    start = 0.0
+
+    if audio_duration_s <= MAX_CHUNK_DURATION_S:
+        return [[start, audio_duration_s]]
+
+    while start < audio_duration_s:
+        end = min(start + MAX_CHUNK_DURATION_S, audio_duration_s)
+        best_cut_position = find_best_cut_position(
+            silero_timestamps, start + MIN_CHUNK_DURATION_S, end
+        )
+        if best_cut_position and abs(best_cut_position - start) >= MIN_CHUNK_DURATION_S:
+            chunks.append([start, best_cut_position])
+            start = best_cut_position
+        else:
+            if end - start < MIN_CHUNK_DURATION_S:
+                end = min(start + MIN_CHUNK_DURATION_S, audio_duration_s)
+            chunks.append([start, end])
+            start = end
+
+    return chunks
+
+
+def test_indexed_greedy_planner_matches_linear_scan():
+    for seed in range(200):
+        timestamps, duration = generate_timestamps(seed, segments=seed * 3)
+
+        assert calculate_chunks(timestamps, duration, "greedy") == (
+            calculate_chunks_linear_scan(timestamps, duration)
+        ), seed
+
+
+def test_optimal_planner_respects_limits_and_beats_greedy():
+    def total_badness(chunks: list, silence_gaps: SilenceGaps) -> float:
+        badness = 0
+        for _, cut in chunks[:-1]:
+            inside = (silence_gaps.starts < cut) & (silence_gaps.ends > cut)
+            durations = silence_gaps.durations[inside]
+            badness += get_cut_badness(durations.max()) if len(durations) else 1000
+        return badness
+
+    for seed in range(50):
+        timestamps, duration = generate_timestamps(seed, segments=50 + seed * 5)
+        silence_gaps = SilenceGaps(timestamps)
+
+        chunks = calculate_chunks(timestamps, duration, "optimal")
+        greedy_chunks = calculate_chunks(timestamps, duration, "greedy")
+
+        assert chunks[0][0] == 0 and chunks[-1][1] == duration
+        assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+        assert all(
+            MIN_CHUNK_DURATION_S <= end - start <= MAX_CHUNK_DURATION_S
+            for start, end in chunks[:-1]
+        )
+        assert 0 < chunks[-1][1] - chunks[-1][0] <= MAX_CHUNK_DURATION_S
+        assert total_badness(chunks, silence_gaps) <= total_badness(
+            greedy_chunks, silence_gaps
+        ) + 1e-9, seed
+
+
+def test_incremental_planner_matches_batch_greedy_plan():
+    for seed in range(100):
+        timestamps, duration = generate_timestamps(seed, segments=seed * 5)
+        generator = random.Random(seed)
+        planner = IncrementalChunkPlanner()
+        chunks = []
+
+        # feed segments in random batches, settled up to the start of the next unseen one
+        i = 0
+        while i < len(timestamps):
+            batch_size = generator.randint(1, 20)
+            planner.add_segments(timestamps[i : i + batch_size])
+            i += batch_size
+            settled_until = timestamps[i]["start"] - 0.001 if i < len(timestamps) else 0
+            chunks += planner.plan(settled_until)
+        chunks += planner.finish(duration)
+
+        assert chunks == calculate_chunks(timestamps, duration, "greedy"), seed
+
 
-    # Check the first few results
-    assert abs(silero_timestamps[0]['start'] - 1.89) / 1.89 < 0.005
-    assert abs(silero_timestamps[0]['end'] - 4.062) / 4.062 < 0.005
+def test_optimal_planner_waits_for_the_whole_file():
+    timestamps, duration = generate_timestamps(7, segments=300)
+    planner = create_chunk_planner("optimal")
 
-    assert abs(silero_timestamps[1]['start'] - 4.962) / 4.962 < 0.005
-    assert abs(silero_timestamps[1]['end'] - 6.942) / 6.942 < 0.005
+    planner.add_segments(timestamps[:200])
+    assert planner.plan(timestamps[199]["end"]) == []
+    planner.add_segments(timestamps[200:])
+    assert planner.finish(duration) == calculate_chunks(timestamps, duration, "optimal")
 
-    assert abs(silero_timestamps[2]['start'] - 7.746) / 7.746 < 0.005
-    assert abs(silero_timestamps[2]['end'] - 8.574) / 8.574 < 0.005
+    with pytest.raises(ValueError):
+        create_chunk_planner("fastest")
@@ -0,0 +1,85 @@
+import asyncio
+import random
+import time
+
+import pytest
+
+from app.ChunkTranscriptionPipeline import (
+    ChunkTranscriptionPipeline,
+    ChunkTranscriptionError,
+)
+from app.WhisperApiClient import WhisperApiError
+
+
+def test_chunks_are_transcribed_concurrently_and_reported_in_order():
+    delays = {f"chunk_{i}": random.uniform(0.05, 0.15) for i in range(12)}
+    reported = []
+
+    async def fake_transcribe(chunk_path: str) -> str:
+        await asyncio.sleep(delays[chunk_path])
+        return f"text of {chunk_path}"
+
+    async def on_chunk_done(i: int, transcription: str) -> None:
+        reported.append((i, transcription))
+
+    pipeline = ChunkTranscriptionPipeline(fake_transcribe, max_in_flight=4)
+    started_at = time.perf_counter()
+    transcriptions = asyncio.run(pipeline.run(list(delays), on_chunk_done))
+    elapsed = time.perf_counter() - started_at
+
+    expected = [f"text of chunk_{i}" for i in range(12)]
+    assert transcriptions == expected
+    assert reported == list(enumerate(expected))
+    assert elapsed < sum(delays.values()) / 2
+
+
+def test_failed_chunk_is_retried_then_reported():
+    attempts = {}
+
+    async def flaky_transcribe(chunk_path: str) -> str:
+        attempts[chunk_path] = attempts.get(chunk_path, 0) + 1
+        if chunk_path == "flaky" and attempts[chunk_path] < 2:
+            raise RuntimeError("502 Bad Gateway")
+        if chunk_path == "broken":
+            raise RuntimeError("connection reset")
+        if chunk_path == "rejected":
+            raise WhisperApiError("Whisper API responded with 400", status_code=400)
+        return chunk_path
+
+    pipeline = ChunkTranscriptionPipeline(
+        flaky_transcribe, max_in_flight=2, max_retries=3, retry_delay_s=0
+    )
+
+    assert asyncio.run(pipeline.run(["ok", "flaky"])) == ["ok", "flaky"]
+    assert attempts["flaky"] == 2
+
+    with pytest.raises(ChunkTranscriptionError) as error:
+        asyncio.run(pipeline.run(["ok", "broken"]))
+    assert error.value.chunk_index == 1
+    assert attempts["broken"] == 3
+
+    with pytest.raises(ChunkTranscriptionError) as error:
+        asyncio.run(pipeline.run(["rejected"]))
+    assert error.value.chunk_index == 0
+    assert attempts["rejected"] == 1
+
+
+def test_completed_chunks_are_not_transcribed_or_reported_again():
+    transcribed = []
+    reported = []
+
+    async def fake_transcribe(chunk_path: str) -> str:
+        transcribed.append(chunk_path)
+        return chunk_path
+
+    async def on_chunk_done(i: int, transcription: str) -> None:
+        reported.append(i)
+
+    pipeline = ChunkTranscriptionPipeline(fake_transcribe, max_in_flight=2)
+    transcriptions = asyncio.run(
+        pipeline.run(["a", "b", "c", "d"], on_chunk_done, completed={0: "a", 1: "b"})
+    )
+
+    assert transcriptions == ["a", "b", "c", "d"]
+    assert sorted(transcribed) == ["c", "d"]
+    assert reported == [2, 3]
@@ -0,0 +1,66 @@
+import asyncio
+import os
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.file_downloader import stream_to_file, link_local_file
+
+BLOCK = os.urandom(1024 * 1024)
+
+
+class LargeFileHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        size_mb = int(self.path.strip("/"))
+        self.send_response(200)
+        self.send_header("Content-Length", str(size_mb * len(BLOCK)))
+        self.end_headers()
+        for _ in range(size_mb):
+            self.wfile.write(BLOCK)
+
+    def log_message(self, *args):
+        pass
+
+
+def measure_download(server: ThreadingHTTPServer, size_mb: int, tmp_path) -> int:
+    output_file_location = tmp_path / f"original_{size_mb}.oga"
+
+    tracemalloc.start()
+    bytes_written = asyncio.run(
+        stream_to_file(
+            f"http://127.0.0.1:{server.server_port}/{size_mb}",
+            str(output_file_location),
+        )
+    )
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert bytes_written == size_mb * len(BLOCK)
+    assert os.path.getsize(output_file_location) == bytes_written
+    return peak
+
+
+def test_download_memory_does_not_grow_with_file_size(tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), LargeFileHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        small_peak = measure_download(server, 4, tmp_path)
+        large_peak = measure_download(server, 64, tmp_path)
+    finally:
+        server.shutdown()
+
+    assert large_peak < 8 * len(BLOCK)
+    assert large_peak < small_peak * 2
+
+
+def test_local_file_is_linked_without_copying(tmp_path):
+    input_file_location = tmp_path / "server" / "voice.oga"
+    input_file_location.parent.mkdir()
+    input_file_location.write_bytes(b"opus")
+    output_file_location = tmp_path / "original.oga"
+
+    link_local_file(str(input_file_location), str(output_file_location))
+
+    assert output_file_location.read_bytes() == b"opus"
+    assert os.path.samefile(input_file_location, output_file_location)
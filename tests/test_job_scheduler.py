@@ -0,0 +1,72 @@
+import asyncio
+
+from app.JobScheduler import JobScheduler
+
+
+def run_jobs(scheduler: JobScheduler, jobs: list) -> tuple[list, list, int]:
+    started = []
+    positions = []
+    peak_running = 0
+
+    async def scenario():
+        async def job(name):
+            nonlocal peak_running
+            started.append(name)
+            peak_running = max(peak_running, scheduler.running_jobs)
+            await asyncio.sleep(0.01)
+
+        async def on_queued(position):
+            positions.append(position)
+
+        await asyncio.gather(
+            *(
+                scheduler.run(chat_id, user_id, duration, lambda n=name: job(n), on_queued)
+                for name, chat_id, user_id, duration in jobs
+            )
+        )
+
+    asyncio.run(scenario())
+    return started, positions, peak_running
+
+
+def test_heavy_user_does_not_starve_others():
+    scheduler = JobScheduler(max_concurrent_jobs=1)
+    jobs = [(f"heavy_{i}", 1, 1, 60) for i in range(4)]
+    jobs += [("light_user", 1, 2, 60), ("other_chat", 2, 3, 60)]
+
+    started, positions, peak_running = run_jobs(scheduler, jobs)
+
+    assert started[:4] == ["heavy_0", "heavy_1", "other_chat", "light_user"]
+    assert started[4:] == ["heavy_2", "heavy_3"]
+    assert positions == [1, 2, 3, 2, 2]
+    assert peak_running == 1
+    assert scheduler.running_jobs == 0 and scheduler.queue_depth == 0
+
+
+def test_audio_minutes_limit():
+    scheduler = JobScheduler(max_concurrent_jobs=10, max_concurrent_audio_s=100)
+    jobs = [("long", 1, 1, 500), ("short_1", 2, 2, 50), ("short_2", 3, 3, 50)]
+
+    started, _, peak_running = run_jobs(scheduler, jobs)
+
+    assert started == ["long", "short_1", "short_2"]
+    assert peak_running == 2
+
+
+def test_jobs_of_one_user_keep_their_order():
+    scheduler = JobScheduler(max_concurrent_jobs=10, max_concurrent_audio_s=100)
+    jobs = [("occupier", 1, 1, 60), ("first_long", 2, 2, 80), ("second_short", 2, 2, 30)]
+
+    started, _, _ = run_jobs(scheduler, jobs)
+
+    assert started == ["occupier", "first_long", "second_short"]
+
+
+def test_long_job_is_not_overtaken_by_short_ones():
+    scheduler = JobScheduler(max_concurrent_jobs=10, max_concurrent_audio_s=100)
+    jobs = [("occupier", 1, 1, 40), ("long", 2, 2, 500)]
+    jobs += [(f"short_{i}", 10 + i, 10 + i, 40) for i in range(30)]
+
+    started, _, _ = run_jobs(scheduler, jobs)
+
+    assert started[:2] == ["occupier", "long"]
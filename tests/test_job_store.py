@@ -0,0 +1,62 @@
+import os
+
+from app.JobStore import JobStore
+from app.models.MediaFileModel import MediaFileModel
+
+
+def test_job_progress_survives_restart(tmp_path):
+    database_file = str(tmp_path / "jobs.sqlite3")
+    job_store = JobStore(database_file)
+    job = job_store.get_or_create_job("1/2", {"update_id": 7}, str(tmp_path / "1/2"))
+    assert job["stage"] == "created"
+
+    job_store.update_job("1/2", stage="downloaded", duration_s=200)
+    job_store.save_chunk_transcription("1/2", 0, "First chunk")
+    job_store.close()
+
+    job_store = JobStore(database_file)
+    [job] = job_store.get_unfinished_jobs()
+    assert job["update"] == {"update_id": 7}
+    assert job["duration_s"] == 200
+    assert JobStore.has_reached_stage(job, "downloaded")
+    assert job_store.get_chunk_transcriptions("1/2") == {0: "First chunk"}
+    assert job_store.get_or_create_job("1/2", {}, "")["stage"] == "downloaded"
+
+    job_store.finish_job("1/2")
+    assert job_store.get_unfinished_jobs() == []
+    assert job_store.get_chunk_transcriptions("1/2") == {}
+
+
+def test_sweep_removes_only_orphaned_folders(tmp_path):
+    data_dir = tmp_path / "data"
+    for folder in ["1/10", "1/11", "2/20"]:
+        (data_dir / folder).mkdir(parents=True)
+    (data_dir / "1" / "user_info.json").write_text("{}")
+
+    job_store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_store.get_or_create_job("1/11", {}, str(data_dir / "1/11"))
+
+    assert job_store.sweep_orphaned_folders(str(data_dir)) == 2
+    assert sorted(os.listdir(data_dir / "1")) == ["11", "user_info.json"]
+    assert os.listdir(data_dir / "2") == []
+
+
+def test_same_message_id_in_two_chats_gives_two_jobs(tmp_path):
+    data_dir = str(tmp_path / "data")
+    # one user's message 5 in the private chat and message 5 in a group
+    private_file = MediaFileModel(1, 1, 5, data_dir)
+    group_file = MediaFileModel(1, -100200, 5, data_dir)
+    assert private_file.folder != group_file.folder
+
+    job_store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_store.get_or_create_job("1/1_5", {"update_id": 1}, private_file.folder)
+    job_store.update_job("1/1_5", stage="downloaded")
+    group_job = job_store.get_or_create_job("1/-100200_5", {"update_id": 2}, group_file.folder)
+    assert group_job["stage"] == "created"
+
+    private_file.create_folder()
+    group_file.create_folder()
+    job_store.finish_job("1/1_5")
+    private_file.destroy()
+    assert os.path.isdir(group_file.folder)
+    assert job_store.sweep_orphaned_folders(data_dir) == 0
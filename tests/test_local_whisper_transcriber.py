@@ -0,0 +1,60 @@
+import asyncio
+import sys
+import threading
+import time
+import types
+
+from app.LocalWhisperTranscriber import LocalWhisperTranscriber
+from app.worker_pool import shutdown_worker_pools
+
+
+class FakeWhisperModel:
+    loads = []
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def __init__(self, model_name: str, **options):
+        time.sleep(0.1)
+        FakeWhisperModel.loads.append((model_name, options))
+
+    def transcribe(self, audio_file_path: str, beam_size: int):
+        with FakeWhisperModel.lock:
+            FakeWhisperModel.active += 1
+            FakeWhisperModel.max_active = max(
+                FakeWhisperModel.max_active, FakeWhisperModel.active
+            )
+
+        def decode():
+            try:
+                for text in [f" {audio_file_path} ", "is ", " done"]:
+                    time.sleep(0.02)
+                    yield types.SimpleNamespace(text=text)
+            finally:
+                with FakeWhisperModel.lock:
+                    FakeWhisperModel.active -= 1
+
+        return decode(), None
+
+
+def test_model_is_loaded_once_and_workers_limit_concurrent_chunks(monkeypatch):
+    faster_whisper = types.ModuleType("faster_whisper")
+    faster_whisper.WhisperModel = FakeWhisperModel
+    monkeypatch.setitem(sys.modules, "faster_whisper", faster_whisper)
+
+    async def transcribe_all() -> list:
+        transcriber = LocalWhisperTranscriber(model="tiny", workers=2, cpu_threads=1)
+        return await asyncio.gather(
+            *(transcriber.transcribe(f"chunk_{i}.mp3") for i in range(6))
+        )
+
+    try:
+        transcriptions = asyncio.run(transcribe_all())
+    finally:
+        shutdown_worker_pools()
+
+    assert transcriptions == [f"chunk_{i}.mp3 is done" for i in range(6)]
+    # every chunk arrived before the model was loaded, still it is loaded once
+    assert [model_name for model_name, _ in FakeWhisperModel.loads] == ["tiny"]
+    assert FakeWhisperModel.loads[0][1]["num_workers"] == 2
+    assert FakeWhisperModel.max_active == 2
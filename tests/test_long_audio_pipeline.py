@@ -0,0 +1,118 @@
+import asyncio
+import math
+import os
+import threading
+import time
+
+import ffmpeg
+
+from app.ChunkTranscriptionPipeline import ChunkTranscriptionPipeline
+from app.LongAudioPipeline import LongAudioPipeline
+from app.PcmStore import PcmStore
+from app.chunk_processor import calculate_chunks
+from app.models.MediaFileModel import MediaFileModel
+from app.transcode_planner import ENCODE_TARGETS
+from app.worker_pool import run_in_process
+
+
+def test_chunks_are_transcribed_while_speech_is_still_detected(tmp_path, monkeypatch):
+    duration = 600
+    timestamps = [{"start": s, "end": s + 40} for s in range(0, duration - 40, 50)]
+    vad_finished = threading.Event()
+
+    def fake_speech_progress(input_file: str):
+        for segment in timestamps:
+            time.sleep(0.1)
+            yield [segment], segment["end"]
+        vad_finished.set()
+        yield [], math.inf
+
+    monkeypatch.setattr("app.LongAudioPipeline.iter_speech_progress", fake_speech_progress)
+
+    media_file = MediaFileModel("1", "1", "2", str(tmp_path))
+    media_file.create_folder()
+    media_file.original_file_location = f"{media_file.folder}/original.wav"
+    media_file.original_file_duration_s = duration
+    ffmpeg.input("anullsrc=r=16000:cl=mono", f="lavfi", t=duration).output(
+        media_file.original_file_location
+    ).run(quiet=True)
+    # chunks are encoded from the decoded samples, not from the original
+    PcmStore(media_file.pcm_file).write(media_file.original_file_location)
+
+    transcribed_during_vad = []
+
+    async def fake_transcribe(chunk_path: str) -> str:
+        transcribed_during_vad.append(not vad_finished.is_set())
+        return chunk_path
+
+    async def run_pipeline() -> list:
+        # pays the worker process start-up before the clock starts
+        await run_in_process(time.sleep, 0)
+        return await pipeline.run(completed={0: "already done"})
+
+    pipeline = LongAudioPipeline(
+        media_file, ChunkTranscriptionPipeline(fake_transcribe), ENCODE_TARGETS[0]
+    )
+    transcriptions = asyncio.run(run_pipeline())
+
+    expected_chunks = calculate_chunks(timestamps, duration, "greedy")
+    assert pipeline.chunks == expected_chunks
+    assert transcriptions[0] == "already done"
+    assert transcriptions[1:] == [
+        pipeline.get_chunk_location(i) for i in range(1, len(expected_chunks))
+    ]
+    assert transcribed_during_vad[0]
+    assert pipeline.time_to_first_chunk_s is not None
+
+    last_start, last_end = expected_chunks[-1]
+    pcm, _ = (
+        ffmpeg.input(transcriptions[-1])
+        .output("pipe:", format="s16le", ac=1, ar=16000)
+        .run(capture_stdout=True, quiet=True)
+    )
+    assert abs(len(pcm) / 2 / 16000 - (last_end - last_start)) < 0.1
+
+
+def test_chunk_files_on_disk_are_bounded_by_transcription(tmp_path, monkeypatch):
+    duration = 1800
+    timestamps = [{"start": s, "end": s + 40} for s in range(0, duration - 40, 50)]
+
+    def fake_speech_progress(input_file: str):
+        # VAD is much faster than transcription
+        for segment in timestamps:
+            yield [segment], segment["end"]
+        yield [], math.inf
+
+    monkeypatch.setattr("app.LongAudioPipeline.iter_speech_progress", fake_speech_progress)
+
+    media_file = MediaFileModel("1", "1", "2", str(tmp_path))
+    media_file.create_folder()
+    media_file.chunks_folder = str(tmp_path / "chunks")
+    os.makedirs(media_file.chunks_folder)
+    media_file.original_file_location = f"{media_file.folder}/original.wav"
+    media_file.original_file_duration_s = duration
+    ffmpeg.input("anullsrc=r=16000:cl=mono", f="lavfi").output(
+        media_file.original_file_location, t=duration
+    ).run(quiet=True)
+
+    max_in_flight = 1
+    chunk_files_seen = []
+
+    async def slow_transcribe(chunk_path: str) -> str:
+        await asyncio.sleep(0.3)
+        return chunk_path
+
+    async def on_chunk_done(chunk_index: int, transcription: str) -> None:
+        chunk_files_seen.append(len(os.listdir(media_file.chunks_folder)))
+        os.remove(transcription)
+
+    pipeline = LongAudioPipeline(
+        media_file,
+        ChunkTranscriptionPipeline(slow_transcribe, max_in_flight=max_in_flight),
+        ENCODE_TARGETS[0],
+    )
+    transcriptions = asyncio.run(pipeline.run(on_chunk_done))
+
+    assert len(transcriptions) == len(pipeline.chunks) > 2 * (max_in_flight + 1)
+    assert max(chunk_files_seen) <= max_in_flight + 1
+    assert os.listdir(media_file.chunks_folder) == []
@@ -13,3 +13,4 @@ def test_mp3_conversion():
     mp3_file_path = f"test_files/informburo.mp3"
 
     convert_to_mp3(ogg_file_path, mp3_file_path)
+
@@ -0,0 +1,33 @@
+import socket
+
+import httpx
+
+from app.metrics import get_audio_length_label, measure_stage, start_metrics_server
+
+
+def get_free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_stage_timings_are_served_on_metrics_endpoint():
+    port = get_free_port()
+    start_metrics_server("127.0.0.1", port)
+
+    with measure_stage("download", "voice", get_audio_length_label(30)):
+        pass
+    with measure_stage("transcribe", "video note", get_audio_length_label(3600)):
+        pass
+
+    metrics = httpx.get(f"http://127.0.0.1:{port}/metrics").text
+    assert (
+        'transcriber_stage_duration_seconds_count{audio_length="short",'
+        'media_type="voice",stage="download"} 1.0'
+    ) in metrics
+    assert (
+        'transcriber_stage_duration_seconds_count{audio_length="long",'
+        'media_type="video note",stage="transcribe"} 1.0'
+    ) in metrics
+    assert "transcriber_data_dir_bytes" in metrics
+    assert "transcriber_jobs_in_flight" in metrics
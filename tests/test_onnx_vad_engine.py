@@ -0,0 +1,61 @@
+import threading
+
+import numpy as np
+import pytest
+
+from app.OnnxVadEngine import OnnxVadEngine
+from app.config import SILERO_VAD_MODEL_FILE
+from app.streaming_vad import PcmStreamReader
+
+
+def read_windows() -> np.ndarray:
+    reader = PcmStreamReader("tests/test_files/informburo.mp3")
+    return np.stack(list(reader.iter_windows(512)))[:3000]
+
+
+def test_blocks_continue_the_stream():
+    windows = read_windows()
+    engine = OnnxVadEngine(SILERO_VAD_MODEL_FILE, batch_size=1)
+
+    whole = engine.open_stream().get_speech_probs(windows)
+    stream = engine.open_stream()
+    in_blocks = np.concatenate(
+        [stream.get_speech_probs(windows[i : i + 313]) for i in range(0, len(windows), 313)]
+    )
+
+    np.testing.assert_allclose(in_blocks, whole, atol=1e-5)
+    assert 0.0 < whole.min() and whole.max() > 0.9
+
+
+def test_concurrent_streams_share_runs_and_match_running_alone():
+    windows = read_windows()
+    recordings = [windows[:1000], windows[500:3000], windows[2000:2700], windows[1200:2200]]
+    engine = OnnxVadEngine(SILERO_VAD_MODEL_FILE, batch_size=4)
+    expected = [engine.open_stream().get_speech_probs(recording) for recording in recordings]
+    runs_alone = engine.run_count
+
+    results = [[] for _ in recordings]
+    barrier = threading.Barrier(len(recordings))
+
+    def detect(index: int) -> None:
+        stream = engine.open_stream()
+        barrier.wait()
+        for i in range(0, len(recordings[index]), 100):
+            results[index].append(stream.get_speech_probs(recordings[index][i : i + 100]))
+
+    threads = [threading.Thread(target=detect, args=(i,)) for i in range(len(recordings))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for result, expected_probs in zip(results, expected):
+        np.testing.assert_allclose(np.concatenate(result), expected_probs, atol=1e-5)
+    assert engine.run_count - runs_alone < runs_alone
+
+
+def test_windows_of_the_wrong_size_are_rejected():
+    engine = OnnxVadEngine(SILERO_VAD_MODEL_FILE)
+
+    with pytest.raises(ValueError):
+        engine.open_stream().get_speech_probs(np.zeros((4, 256), dtype=np.float32))
@@ -0,0 +1,49 @@
+import hashlib
+
+import ffmpeg
+import numpy as np
+
+from app.PcmStore import PcmStore
+from app.streaming_vad import PcmStreamReader
+
+
+def test_pcm_store_replaces_repeated_decodes(tmp_path):
+    original = str(tmp_path / "tone.ogg")
+    ffmpeg.input("sine=frequency=440:sample_rate=48000", f="lavfi", t=5.01).output(
+        original, acodec="libopus"
+    ).run(quiet=True)
+
+    store = PcmStore(str(tmp_path / "audio.s16le"))
+    assert not store.exists()
+    content_hash = store.write(original)
+    assert store.exists()
+    with open(store.location, "rb") as file:
+        assert content_hash == hashlib.sha256(file.read()).hexdigest()
+    assert abs(store.get_duration_s() - 5.01) < 0.05
+
+    windows = list(store.iter_windows(512))
+    reader = PcmStreamReader(original)
+    assert np.array_equal(np.stack(windows), np.stack(list(reader.iter_windows(512))))
+    assert store.samples_read == reader.samples_read
+
+    chunk = str(tmp_path / "chunk.mp3")
+    store.encode_slice(chunk, 1, 3.5, {"format": "mp3", "acodec": "libmp3lame", "ac": 1})
+    pcm, _ = (
+        ffmpeg.input(chunk)
+        .output("pipe:", format="s16le", ac=1, ar=16000)
+        .run(capture_stdout=True, quiet=True)
+    )
+    assert abs(len(pcm) / 2 / 16000 - 2.5) < 0.1
+
+
+def test_content_hash_ignores_container(tmp_path):
+    wav_file_path = str(tmp_path / "tone.wav")
+    flac_file_path = str(tmp_path / "tone.flac")
+    ffmpeg.input("sine=frequency=440:duration=3", f="lavfi").output(
+        wav_file_path, ar=16000, ac=1
+    ).run(quiet=True)
+    ffmpeg.input(wav_file_path).output(flac_file_path).run(quiet=True)
+
+    assert PcmStore(str(tmp_path / "wav.s16le")).write(wav_file_path) == PcmStore(
+        str(tmp_path / "flac.s16le")
+    ).write(flac_file_path)
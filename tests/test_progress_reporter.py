@@ -0,0 +1,75 @@
+import asyncio
+
+from app.ProgressReporter import ProgressReporter, split_text
+
+
+class FakeMessage:
+    def __init__(self, calls: list):
+        self.calls = calls
+
+    async def reply_text(self, text: str, **kwargs) -> "FakeMessage":
+        self.calls.append(("reply_text", text))
+        return FakeMessage(self.calls)
+
+    async def reply_audio(self, audio, caption: str | None = None, **kwargs) -> "FakeMessage":
+        self.calls.append(("reply_audio", caption))
+        return FakeMessage(self.calls)
+
+    async def edit_text(self, text: str) -> "FakeMessage":
+        self.calls.append(("edit_text", text))
+        return self
+
+    async def delete(self) -> bool:
+        self.calls.append(("delete",))
+        return True
+
+
+def test_status_edits_are_coalesced_and_latest_wins():
+    calls = []
+
+    async def run():
+        reporter = ProgressReporter(FakeMessage(calls), status_edit_interval_s=0.1)
+        for i in range(20):
+            await reporter.set_status(f"step {i}")
+        await asyncio.sleep(0.15)
+        await reporter.set_status("done", immediately=True)
+        await reporter.close()
+        return reporter
+
+    reporter = asyncio.run(run())
+    assert calls == [("reply_text", "step 0"), ("edit_text", "step 19"), ("edit_text", "done")]
+    assert reporter.api_calls == 3
+    assert reporter.api_calls_saved == 18
+
+
+def test_chunk_texts_are_batched_and_audio_echo_is_optional(tmp_path):
+    audio_file = tmp_path / "chunk_0.mp3"
+    audio_file.write_bytes(b"mp3")
+    calls = []
+
+    async def run(echo_chunk_audio: bool):
+        reporter = ProgressReporter(
+            FakeMessage(calls), text_batch_interval_s=60, echo_chunk_audio=echo_chunk_audio
+        )
+        for i in range(4):
+            await reporter.add_chunk_text(f"chunk {i} " + "x" * 1500, str(audio_file))
+        await reporter.close()
+        return reporter
+
+    reporter = asyncio.run(run(echo_chunk_audio=False))
+    # 4 texts of ~1.5k chars fit in 2 messages, no audio is sent
+    assert [name for name, *_ in calls] == ["reply_text", "reply_text"]
+    assert calls[0][1].startswith("chunk 0") and "chunk 1" in calls[0][1]
+    assert reporter.api_calls_saved == 4 + 2
+
+    calls.clear()
+    reporter = asyncio.run(run(echo_chunk_audio=True))
+    # the transcription doesn't fit a caption, so audio and text go separately
+    assert [name for name, *_ in calls] == ["reply_audio", "reply_text"] * 4
+
+
+def test_split_text_respects_limit():
+    parts = split_text("word " * 2000, max_length=4096)
+    assert len(parts) == 3
+    assert all(len(part) <= 4096 for part in parts)
+    assert " ".join(parts).split() == ["word"] * 2000
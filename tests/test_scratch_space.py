@@ -0,0 +1,142 @@
+import asyncio
+import os
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.JobStore import JobStore
+from app.ScratchSpace import ScratchSpace
+from app.models.MediaFileModel import MediaFileModel
+from app.worker_pool import shutdown_worker_pools
+
+
+def create_scratch_space(tmp_path, **kwargs) -> ScratchSpace:
+    (tmp_path / "shm").mkdir(exist_ok=True)
+    return ScratchSpace(
+        data_dir=str(tmp_path / "data"),
+        tmpfs_dir=str(tmp_path / "shm" / "transcriber"),
+        min_free_memory_bytes=0,
+        **kwargs,
+    )
+
+
+def test_jobs_wait_for_the_budget_and_clean_up_on_every_exit(tmp_path):
+    space = create_scratch_space(tmp_path, max_bytes=100)
+    first = MediaFileModel(1, 1, 1, space.data_dir)
+    second = MediaFileModel(1, 1, 2, space.data_dir)
+    events = []
+
+    async def run_first() -> None:
+        with pytest.raises(RuntimeError):
+            async with space.open_job(first, 80):
+                first.prepare_original_file_location()
+                events.append("first started")
+                await asyncio.sleep(0.1)
+                raise RuntimeError("early exit")
+
+    async def run_second() -> None:
+        async def on_wait() -> None:
+            events.append("second waits")
+
+        await asyncio.sleep(0.01)
+        async with space.open_job(second, 50, on_wait=on_wait):
+            events.append("second started")
+
+    async def run() -> None:
+        await asyncio.gather(run_first(), run_second())
+
+    asyncio.run(run())
+
+    assert events == ["first started", "second waits", "second started"]
+    assert not os.path.exists(first.folder)
+    assert space.reserved_bytes == 0
+
+
+def test_cancelled_jobs_keep_their_files(tmp_path):
+    space = create_scratch_space(tmp_path, max_bytes=100)
+    media_file = MediaFileModel(1, 1, 1, space.data_dir)
+
+    async def run() -> None:
+        async with space.open_job(media_file, 10) as scratch:
+            media_file.prepare_original_file_location()
+            with open(scratch.stage("audio.s16le", 10), "wb") as file:
+                file.write(b"\0" * 10)
+            raise asyncio.CancelledError
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(run())
+
+    assert os.path.exists(media_file.folder)
+    assert os.listdir(os.path.join(space.tmpfs_dir, "1", "1_1")) == ["audio.s16le"]
+    assert space.tmpfs_reserved_bytes == 0
+
+    # the leftovers of a job that won't be resumed are swept
+    job_store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    assert space.sweep(job_store, min_age_s=0) == 2
+    assert not os.path.exists(media_file.folder)
+
+
+def test_artefacts_go_to_tmpfs_while_it_has_room(tmp_path):
+    space = create_scratch_space(tmp_path, tmpfs_max_bytes=100)
+    media_file = MediaFileModel(1, 1, 1, space.data_dir)
+
+    async def run() -> None:
+        async with space.open_job(media_file, 0) as scratch:
+            pcm_location = scratch.stage("audio.s16le", 80)
+            chunks_location = scratch.stage("chunks", 40)
+
+            assert pcm_location.startswith(space.tmpfs_dir)
+            assert chunks_location == os.path.join(media_file.folder, "chunks")
+            assert space.tmpfs_reserved_bytes == 80
+
+    asyncio.run(run())
+    assert space.tmpfs_reserved_bytes == 0
+    assert os.listdir(space.tmpfs_dir) == []
+
+
+def test_sweeper_measures_the_data_dir_for_metrics(tmp_path):
+    space = create_scratch_space(tmp_path)
+    job_store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    media_file = MediaFileModel(1, 1, 1, space.data_dir)
+    media_file.save_user_media(bytearray(b"\0" * 1000))
+
+    async def run() -> None:
+        sweeper = asyncio.create_task(space.run_sweeper(job_store, interval_s=60))
+        await asyncio.sleep(0.1)
+        sweeper.cancel()
+
+    try:
+        asyncio.run(run())
+    finally:
+        shutdown_worker_pools()
+
+    assert REGISTRY.get_sample_value("transcriber_data_dir_bytes") == 1000
+
+
+def test_workers_sharing_a_tmpfs_dir_only_sweep_their_own_folders(tmp_path):
+    (tmp_path / "shm").mkdir()
+    spaces = [
+        ScratchSpace(
+            data_dir=str(tmp_path / name / "data"),
+            tmpfs_dir=str(tmp_path / "shm" / "transcriber"),
+            min_free_memory_bytes=0,
+        )
+        for name in ["first", "second"]
+    ]
+    job_stores = [JobStore(str(tmp_path / name / "jobs.sqlite3")) for name in ["first", "second"]]
+    media_file = MediaFileModel(1, 1, 1, spaces[0].data_dir)
+
+    async def run() -> None:
+        async with spaces[0].open_job(media_file, 10) as scratch:
+            job_stores[0].get_or_create_job("1/1_1", {}, media_file.folder)
+            pcm_location = scratch.stage("audio.s16le", 10)
+            with open(pcm_location, "wb") as file:
+                file.write(b"\0" * 10)
+
+            # the second worker starting up next to the running job
+            assert spaces[1].sweep(job_stores[1], min_age_s=0) == 0
+            assert spaces[0].sweep(job_stores[0], min_age_s=0) == 0
+            assert os.path.exists(pcm_location)
+
+    asyncio.run(run())
+    assert spaces[0].tmpfs_dir != spaces[1].tmpfs_dir
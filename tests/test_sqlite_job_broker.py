@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+from app.SqliteJobBroker import SqliteJobBroker
+
+
+def test_jobs_are_leased_fairly_and_reclaimed_after_expiry(tmp_path):
+    async def run() -> None:
+        broker = SqliteJobBroker(str(tmp_path / "broker.sqlite3"), lease_s=0.2)
+        for job_id, chat_id in [("1/1", 1), ("1/2", 1), ("2/1", 2)]:
+            await broker.enqueue(job_id, chat_id, chat_id, 60, {"job": job_id})
+        # enqueued twice by a redelivered update
+        await broker.enqueue("1/1", 1, 1, 60, {"job": "1/1"})
+
+        first = await broker.claim("worker-a")
+        assert first["id"] == "1/1"
+        assert first["payload"] == {"job": "1/1"}
+        # chat 2 has nothing running, so it goes before the second job of chat 1
+        second = await broker.claim("worker-b")
+        assert second["id"] == "2/1"
+
+        # a second connection, as in another process
+        other_broker = SqliteJobBroker(str(tmp_path / "broker.sqlite3"), lease_s=0.2)
+        third = await other_broker.claim("worker-c")
+        assert third["id"] == "1/2"
+        assert await other_broker.claim("worker-c") is None
+
+        assert await broker.renew("1/1", first["lease_id"])
+        await broker.complete("1/1", first["lease_id"])
+        assert not await broker.has_job("1/1")
+
+        time.sleep(0.25)
+        assert await other_broker.renew("1/2", third["lease_id"])
+        # worker-b died, its job goes to the next worker
+        reclaimed = await broker.claim("worker-d")
+        assert reclaimed["id"] == "2/1"
+        assert reclaimed["attempts"] == 2
+        assert not await broker.renew("2/1", second["lease_id"])
+
+        await other_broker.release("1/2", third["lease_id"])
+        assert await broker.release_worker_jobs("worker-d") == ["2/1"]
+        claimed = [await broker.claim("worker-e") for _ in range(2)]
+        # handing a job back is not a failed attempt, a dead worker is
+        assert {job["id"]: job["attempts"] for job in claimed} == {"1/2": 1, "2/1": 3}
+
+        await broker.aclose()
+        await other_broker.aclose()
+
+    asyncio.run(run())
+
+
+def test_workers_sharing_an_id_cannot_touch_each_others_leases(tmp_path):
+    async def run() -> None:
+        broker = SqliteJobBroker(str(tmp_path / "broker.sqlite3"), lease_s=60)
+        other_broker = SqliteJobBroker(str(tmp_path / "broker.sqlite3"), lease_s=60)
+        for job_id in ["1/1", "2/1"]:
+            await broker.enqueue(job_id, int(job_id[0]), 1, 60, {"job": job_id})
+
+        first = await broker.claim("worker")
+        second = await other_broker.claim("worker")
+        assert first["lease_id"] != second["lease_id"]
+
+        # the second worker finishing or giving back its job leaves the first one's alone
+        await other_broker.complete("1/1", second["lease_id"])
+        await other_broker.release("1/1", second["lease_id"])
+        assert await broker.renew("1/1", first["lease_id"])
+        assert await other_broker.claim("worker") is None
+
+        # the second worker restarting with the same ID takes the job away from the
+        # first one, which finds out on its next renewal and stops
+        assert sorted(await other_broker.release_worker_jobs("worker")) == ["1/1", "2/1"]
+        retaken = await other_broker.claim("worker")
+        assert not await broker.renew(retaken["id"], first["lease_id"])
+        await broker.complete(retaken["id"], first["lease_id"])
+        assert await other_broker.renew(retaken["id"], retaken["lease_id"])
+
+        await broker.aclose()
+        await other_broker.aclose()
+
+    asyncio.run(run())
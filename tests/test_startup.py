@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+from app.config import STARTUP_IMPORT_BUDGET_S
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# loaded on first use or by pre-warming, never to start the bot
+HEAVY_MODULES = ["torch", "onnxruntime", "openai", "faster_whisper"]
+
+IMPORT_SCRIPT = f"""
+import sys, time
+started_at = time.perf_counter()
+import app.main
+print(time.perf_counter() - started_at)
+print(",".join(module for module in {HEAVY_MODULES!r} if module in sys.modules))
+"""
+
+
+def test_cold_start_import_stays_within_budget():
+    completed = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=REPO_DIR,
+    )
+    import_time_s, heavy_modules = completed.stdout.splitlines()
+
+    assert heavy_modules == ""
+    assert float(import_time_s) < STARTUP_IMPORT_BUDGET_S
@@ -0,0 +1,74 @@
+import random
+
+import ffmpeg
+import numpy as np
+
+from app.streaming_vad import PcmStreamReader, SpeechSegmentTracker
+
+
+def test_segments_are_emitted_as_soon_as_silence_confirms_them():
+    tracker = SpeechSegmentTracker(
+        threshold=0.5,
+        sampling_rate=16000,
+        min_speech_duration_ms=500,
+        min_silence_duration_ms=500,
+    )
+    speech_probs = [0.1] * 10 + [0.9] * 40 + [0.1] * 20 + [0.9] * 40 + [0.1] * 5
+
+    emitted = {}
+    for i, speech_prob in enumerate(speech_probs):
+        for segment in tracker.process(speech_prob):
+            emitted[i] = segment
+
+    # 500 ms of silence after the first segment ends (window 50) confirms it
+    assert emitted == {66: {"start": 4640, "end": 26080}}
+    assert tracker.finish(len(speech_probs) * 512) == [{"start": 35360, "end": 58880}]
+
+
+def test_short_speech_is_dropped_and_trailing_speech_is_closed():
+    tracker = SpeechSegmentTracker(min_speech_duration_ms=500, min_silence_duration_ms=500)
+
+    for speech_prob in [0.9] * 5 + [0.1] * 30 + [0.9] * 30:
+        assert tracker.process(speech_prob) == []
+
+    assert tracker.finish(65 * 512 - 100) == [{"start": 17440, "end": 33180}]
+
+
+def test_pcm_reader_decodes_in_windows(tmp_path):
+    wav_file_path = str(tmp_path / "tone.wav")
+    ffmpeg.input("sine=frequency=440:duration=1.01", f="lavfi").output(
+        wav_file_path, ar=16000, ac=1
+    ).run(quiet=True)
+
+    reader = PcmStreamReader(wav_file_path, block_size_samples=1000)
+    windows = list(reader.iter_windows(512))
+
+    assert reader.samples_read == 16160
+    assert len(windows) == 32
+    assert all(len(window) == 512 for window in windows)
+    assert 0.1 < abs(windows[0]).max() <= 1.0
+
+
+def test_blocks_give_the_same_segments_as_single_windows():
+    generator = random.Random(7)
+    speech_probs = []
+    for _ in range(200):
+        speech_probs += [generator.choice([0.05, 0.4, 0.6, 0.95])] * generator.randint(1, 40)
+
+    one_by_one = SpeechSegmentTracker(min_speech_duration_ms=250, min_silence_duration_ms=100)
+    in_blocks = SpeechSegmentTracker(min_speech_duration_ms=250, min_silence_duration_ms=100)
+    expected, segments = [], []
+    position = 0
+    while position < len(speech_probs):
+        block = speech_probs[position : position + generator.randint(1, 100)]
+        position += len(block)
+        for speech_prob in block:
+            expected += one_by_one.process(speech_prob)
+        segments += in_blocks.process_block(np.array(block, dtype=np.float32))
+
+        assert segments == expected
+        assert in_blocks.get_settled_until_samples() == one_by_one.get_settled_until_samples()
+
+    audio_length_samples = len(speech_probs) * 512
+    assert in_blocks.finish(audio_length_samples) == one_by_one.finish(audio_length_samples)
+    assert len(expected) > 10
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+from telegram import ChatMember, User
+from telegram.error import NetworkError
+
+from app.TelegramPermissionChecker import TelegramPermissionChecker
+
+
+class FakeBot:
+    def __init__(self, members: dict[int, set[int]], delay_s: float = 0.1):
+        self.members = members
+        self.delay_s = delay_s
+        self.calls = []
+        self.failing_groups = set()
+
+    async def get_chat_member(self, group_id: int, user_id: int) -> ChatMember:
+        self.calls.append((group_id, user_id))
+        await asyncio.sleep(self.delay_s)
+        if group_id in self.failing_groups:
+            raise NetworkError("flaky")
+        status = "member" if user_id in self.members[group_id] else "left"
+        return ChatMember(User(user_id, "User", False), status)
+
+
+def test_groups_are_checked_concurrently_and_lookups_coalesced(monkeypatch):
+    monkeypatch.setenv("TELEGRAM_ALLOWED_IDS", "7,-1,-2,-3")
+    bot = FakeBot({-1: set(), -2: set(), -3: {42}})
+    checker = TelegramPermissionChecker(bot)
+
+    async def run():
+        started_at = time.perf_counter()
+        decisions = await asyncio.gather(*(checker.is_user_allowed(42) for _ in range(5)))
+        elapsed = time.perf_counter() - started_at
+        return decisions, elapsed
+
+    decisions, elapsed = asyncio.run(run())
+    assert decisions == [True] * 5
+    assert elapsed < 2 * bot.delay_s
+    assert len(bot.calls) == 3
+
+    assert asyncio.run(checker.is_user_allowed(42)) is True
+    assert asyncio.run(checker.is_user_allowed(7)) is True
+    assert len(bot.calls) == 3
+    assert checker.get_stats()["misses"] == 1
+    assert checker.get_stats()["hits"] == 6
+
+
+def test_non_members_are_cached_but_api_errors_are_not(monkeypatch):
+    monkeypatch.setenv("TELEGRAM_ALLOWED_IDS", "-1,-2")
+    bot = FakeBot({-1: set(), -2: set()}, delay_s=0)
+    checker = TelegramPermissionChecker(bot)
+
+    assert asyncio.run(checker.is_user_allowed(42)) is False
+    assert asyncio.run(checker.is_user_allowed(42)) is False
+    assert len(bot.calls) == 2
+
+    bot.failing_groups.add(-2)
+    assert asyncio.run(checker.is_user_allowed(43)) is False
+    assert asyncio.run(checker.is_user_allowed(43)) is False
+    assert len(bot.calls) == 6
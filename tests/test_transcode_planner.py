@@ -0,0 +1,64 @@
+import ffmpeg
+
+from app.WhisperTranscriber import WhisperTranscriber
+from app.media_converter import transcode_audio
+from app.transcode_planner import ENCODE_TARGETS, plan_transcode
+
+API_EXTENSIONS = WhisperTranscriber.SUPPORTED_EXTENSIONS
+API_MAX_BYTES = 25 * 1024 * 1024
+
+
+def make_probe(codec_name: str, bit_rate: int | None = None, video: bool = False) -> dict:
+    streams = [{"codec_type": "audio", "codec_name": codec_name}]
+    if bit_rate:
+        streams[0]["bit_rate"] = str(bit_rate)
+    if video:
+        streams.insert(0, {"codec_type": "video", "codec_name": "h264"})
+    return {"streams": streams, "format": {"bit_rate": "2000000"}}
+
+
+def test_copyable_codecs_are_stream_copied():
+    video_note_probe = make_probe("aac", 64_000, video=True)
+    video_note = plan_transcode(video_note_probe, 60, API_EXTENSIONS, API_MAX_BYTES)
+    assert video_note.is_copy and video_note.extension == "m4a"
+
+    voice = plan_transcode(make_probe("opus", 32_000), 180, API_EXTENSIONS, API_MAX_BYTES)
+    assert voice.is_copy and voice.extension == "ogg"
+    assert voice.output_options == {"format": "ogg", "acodec": "copy"}
+
+
+def test_falls_back_to_cheapest_encode_under_size_limit():
+    def plan(probe: dict | None, duration_s: float):
+        return plan_transcode(probe, duration_s, API_EXTENSIONS, API_MAX_BYTES)
+
+    # WMA can't go to the API as is
+    assert plan(make_probe("wmav2", 128_000), 180) is ENCODE_TARGETS[0]
+    # 320 kbps MP3 for an hour is over 25 MB, and so is 64 kbps
+    assert plan(make_probe("mp3", 320_000), 3600) is ENCODE_TARGETS[1]
+    # an unknown bitrate can't be promised to fit, no probe at all means encoding
+    unknown_bit_rate = {"streams": [{"codec_type": "audio", "codec_name": "mp3"}], "format": {}}
+    assert not plan(unknown_bit_rate, 60).is_copy
+    assert plan(None, 60) is ENCODE_TARGETS[0]
+
+
+def test_backend_without_limits_copies_any_codec():
+    plan = plan_transcode(make_probe("wmav2"), 600, None, None)
+    assert plan.is_copy and plan.extension == "mka"
+
+
+def test_stream_copy_cuts_without_reencoding(tmp_path):
+    original = str(tmp_path / "voice.ogg")
+    ffmpeg.input("sine=frequency=440:sample_rate=48000", f="lavfi", t=10).output(
+        original, acodec="libopus"
+    ).run(quiet=True)
+
+    plan = plan_transcode(make_probe("opus", 32_000), 3, API_EXTENSIONS, API_MAX_BYTES)
+    chunk = str(tmp_path / f"chunk.{plan.extension}")
+    transcode_audio(original, chunk, plan.output_options, start_s=2, end_s=5)
+
+    pcm, _ = (
+        ffmpeg.input(chunk)
+        .output("pipe:", format="s16le", ac=1, ar=16000)
+        .run(capture_stdout=True, quiet=True)
+    )
+    assert abs(len(pcm) / 2 / 16000 - 3) < 0.1
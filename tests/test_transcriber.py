@@ -0,0 +1,25 @@
+import asyncio
+
+import pytest
+
+from app.Transcriber import Transcriber, create_transcriber
+from app.WhisperApiClient import WhisperApiClient
+
+
+def test_openai_backend_is_a_transcriber(tmp_path):
+    transcriber = create_transcriber("openai")
+    try:
+        assert isinstance(transcriber, WhisperApiClient)
+        assert isinstance(transcriber, Transcriber)
+
+        too_large = tmp_path / "chunk.mp3"
+        too_large.write_bytes(b"\0" * 26 * 1024 * 1024)
+        assert transcriber.validate_file(str(tmp_path / "chunk.opus")) is False
+        assert transcriber.validate_file(str(too_large)) is False
+    finally:
+        asyncio.run(transcriber.aclose())
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_transcriber("carrier-pigeon")
@@ -0,0 +1,52 @@
+import time
+
+from app.TranscriptionCache import TranscriptionCache
+
+
+def test_lookup_by_file_unique_id_and_content_hash(tmp_path):
+    cache = TranscriptionCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("AgADxx", "hash-1", ["Hello", "world"])
+
+    assert cache.get_by_file_unique_id("AgADxx") == ["Hello", "world"]
+    assert cache.get_by_file_unique_id("AgADyy") is None
+    assert cache.get_by_content_hash("hash-1") == ["Hello", "world"]
+    assert cache.get_stats() == {"hits": 2, "misses": 1, "hit_ratio": 2 / 3}
+
+    cache.close()
+    reopened_cache = TranscriptionCache(str(tmp_path / "cache.sqlite3"))
+    assert reopened_cache.get_by_content_hash("hash-1") == ["Hello", "world"]
+
+
+def test_expired_and_least_recently_used_entries_are_evicted(tmp_path):
+    cache = TranscriptionCache(str(tmp_path / "cache.sqlite3"), ttl_s=1, max_bytes=30)
+
+    cache.put("first", None, ["a" * 10])
+    cache.put("second", None, ["b" * 10])
+    cache.get_by_file_unique_id("first")
+    cache.put("third", None, ["c" * 10])
+
+    assert cache.get_by_file_unique_id("second") is None
+    assert cache.get_by_file_unique_id("first") is not None
+
+    time.sleep(1.1)
+    cache.evict()
+    assert cache.get_by_file_unique_id("third") is None
+
+
+def test_total_size_is_tracked_across_replacements_and_reopening(tmp_path):
+    cache = TranscriptionCache(str(tmp_path / "cache.sqlite3"), max_bytes=100)
+
+    cache.put("first", None, ["a" * 10])
+    cache.put("second", None, ["b" * 10])
+    cache.put("first", None, ["a" * 20])
+    assert cache.total_bytes == 24 + 14
+
+    cache.close()
+    reopened_cache = TranscriptionCache(str(tmp_path / "cache.sqlite3"), max_bytes=40)
+    assert reopened_cache.total_bytes == 38
+
+    reopened_cache.put("third", None, ["c" * 10])
+    assert reopened_cache.total_bytes == 24 + 14
+    assert reopened_cache.get_by_file_unique_id("first") == ["a" * 20]
+    assert reopened_cache.get_by_file_unique_id("third") == ["c" * 10]
+    assert reopened_cache.get_by_file_unique_id("second") is None
@@ -0,0 +1,19 @@
+from app.transcription_renderer import TranscriptionWriter, transcription_template, write_transcription
+
+
+def test_incremental_document_matches_full_render(tmp_path):
+    paragraphs = ["First chunk.", "Second chunk.", "Third chunk."]
+    full_location = tmp_path / "full.html"
+    incremental_location = tmp_path / "incremental.html"
+
+    write_transcription(str(full_location), paragraphs)
+    with TranscriptionWriter(str(incremental_location)) as writer:
+        for paragraph in paragraphs:
+            writer.add_paragraph(paragraph)
+        assert "Second chunk." in incremental_location.read_text()
+        writer.finish()
+
+    assert writer.paragraphs_count == 3
+    assert incremental_location.read_text() == full_location.read_text()
+    assert full_location.read_text() == transcription_template.render(paragraphs=paragraphs)
+    assert full_location.read_text().count("<li>") == 3
@@ -0,0 +1,93 @@
+import asyncio
+
+from app.JobScheduler import JobScheduler
+from app.JobStore import JobStore
+from app.ScratchSpace import ScratchSpace
+from app.SqliteJobBroker import SqliteJobBroker
+from app.TranscriptionWorker import TranscriptionWorker
+
+
+class FakeTask:
+    def __init__(self, update, handled: list):
+        self.update = update
+        self.handled = handled
+
+    async def handle_media(self) -> None:
+        if self.update.update_id == 2:
+            raise RuntimeError("broken file")
+        if self.update.update_id == 3:
+            await asyncio.sleep(60)
+        self.handled.append(self.update.update_id)
+
+    async def report_queue_position(self, position: int) -> None:
+        pass
+
+    async def set_first_reply(self, reply_text: str, immediately: bool = False) -> None:
+        self.handled.append(reply_text)
+
+
+def test_worker_runs_jobs_and_gives_back_unfinished_ones(tmp_path):
+    handled = []
+
+    async def run() -> None:
+        broker = SqliteJobBroker(str(tmp_path / "broker.sqlite3"))
+        for update_id in [1, 2, 3]:
+            await broker.enqueue(
+                f"7/{update_id}", 7, 7, 60, {"update": {"update_id": update_id}}
+            )
+
+        worker = TranscriptionWorker(
+            bot=None,
+            broker=broker,
+            scheduler=JobScheduler(max_concurrent_jobs=2, max_concurrent_audio_s=3600),
+            job_store=JobStore(str(tmp_path / "jobs.sqlite3")),
+            scratch_space=ScratchSpace(data_dir=str(tmp_path / "data"), tmpfs_dir=None),
+            create_task=lambda update: FakeTask(update, handled),
+            worker_id="worker-a",
+            poll_interval_s=0.01,
+        )
+        worker_run = asyncio.create_task(worker.run())
+        await asyncio.sleep(0.3)
+        worker_run.cancel()
+        await asyncio.gather(worker_run, return_exceptions=True)
+
+        # the failed job is done with, the interrupted one is free for another worker
+        assert not await broker.has_job("7/1")
+        assert not await broker.has_job("7/2")
+        assert (await broker.claim("worker-b"))["id"] == "7/3"
+
+    asyncio.run(run())
+    assert handled == [1]
+
+
+def test_job_that_keeps_taking_workers_down_is_dropped(tmp_path):
+    handled = []
+
+    async def run() -> None:
+        broker = SqliteJobBroker(str(tmp_path / "broker.sqlite3"), lease_s=0.01)
+        await broker.enqueue("7/1", 7, 7, 60, {"update": {"update_id": 1}})
+        # three workers died while running it
+        for _ in range(3):
+            await broker.claim("crashed-worker")
+            await asyncio.sleep(0.02)
+
+        worker = TranscriptionWorker(
+            bot=None,
+            broker=broker,
+            scheduler=JobScheduler(max_concurrent_jobs=1, max_concurrent_audio_s=3600),
+            job_store=JobStore(str(tmp_path / "jobs.sqlite3")),
+            scratch_space=ScratchSpace(data_dir=str(tmp_path / "data"), tmpfs_dir=None),
+            create_task=lambda update: FakeTask(update, handled),
+            worker_id="worker-a",
+            poll_interval_s=0.01,
+            max_attempts=3,
+        )
+        worker_run = asyncio.create_task(worker.run())
+        await asyncio.sleep(0.2)
+        worker_run.cancel()
+        await asyncio.gather(worker_run, return_exceptions=True)
+
+        assert not await broker.has_job("7/1")
+
+    asyncio.run(run())
+    assert len(handled) == 1 and handled[0].startswith("⚠️")
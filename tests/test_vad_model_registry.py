@@ -0,0 +1,40 @@
+import app.VadModelRegistry as vad_model_registry
+from app.VadModelRegistry import VadModelRegistry
+
+LOADS = []
+
+
+class FakeEngine:
+    version = "v4"
+
+    def __init__(self, model_file: str):
+        LOADS.append(model_file)
+
+    def open_stream(self):
+        return object()
+
+
+def test_model_is_loaded_once_from_local_file(tmp_path, monkeypatch):
+    model_file = tmp_path / "silero_vad.onnx"
+    model_file.write_bytes(b"")
+    monkeypatch.setattr(vad_model_registry, "SILERO_VAD_MODEL_FILE", str(model_file))
+    monkeypatch.setattr(vad_model_registry, "OnnxVadEngine", FakeEngine)
+    monkeypatch.setattr(VadModelRegistry, "_engine", None)
+    monkeypatch.setattr(VadModelRegistry, "inference_count", 0)
+
+    VadModelRegistry.warm_up()
+    VadModelRegistry.warm_up()
+
+    with VadModelRegistry.session() as first_stream:
+        pass
+    with VadModelRegistry.session() as second_stream:
+        pass
+
+    assert LOADS == [str(model_file)]
+    # every session continues its own recording
+    assert first_stream is not second_stream
+
+    stats = VadModelRegistry.get_stats()
+    assert stats["loaded"] is True
+    assert stats["load_time_s"] is not None
+    assert stats["inference_count"] == 2
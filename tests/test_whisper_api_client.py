@@ -0,0 +1,96 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.WhisperApiClient import WhisperApiClient, WhisperApiError
+
+
+def start_stub_server(responses: list) -> tuple[ThreadingHTTPServer, list]:
+    requests = []
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            requests.append((self.path, dict(self.headers), body))
+            status, headers, payload = responses.pop(0)
+
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, requests
+
+
+def transcribe(server: ThreadingHTTPServer, audio_file_path: str) -> tuple[str, int]:
+    async def run():
+        client = WhisperApiClient(
+            api_key="test-key",
+            base_url=f"http://127.0.0.1:{server.server_port}/v1",
+            backoff_base_s=0.01,
+        )
+        try:
+            return await client.transcribe(audio_file_path), client.retries_count
+        finally:
+            await client.aclose()
+
+    return asyncio.run(run())
+
+
+def test_retries_rate_limits_and_server_errors(tmp_path):
+    audio_file_path = tmp_path / "chunk_0.mp3"
+    audio_file_path.write_bytes(b"fake mp3")
+    server, requests = start_stub_server(
+        [
+            (429, {"Retry-After": "0.05"}, b"slow down"),
+            (502, {}, b"bad gateway"),
+            (200, {}, json.dumps({"text": "Hello"}).encode()),
+        ]
+    )
+
+    try:
+        text, retries_count = transcribe(server, str(audio_file_path))
+    finally:
+        server.shutdown()
+
+    assert text == "Hello"
+    assert retries_count == 2
+    assert len(requests) == 3
+    path, headers, body = requests[-1]
+    assert path == "/v1/audio/transcriptions"
+    assert headers["Authorization"] == "Bearer test-key"
+    assert b"whisper-1" in body and b"fake mp3" in body
+
+
+def test_client_errors_are_not_retried(tmp_path):
+    audio_file_path = tmp_path / "chunk_0.mp3"
+    audio_file_path.write_bytes(b"fake mp3")
+    server, requests = start_stub_server([(400, {}, b"invalid file format")])
+
+    try:
+        with pytest.raises(WhisperApiError) as error:
+            transcribe(server, str(audio_file_path))
+    finally:
+        server.shutdown()
+
+    assert error.value.status_code == 400
+    assert len(requests) == 1
+
+
+def test_backoff_honours_retry_after():
+    client = WhisperApiClient(api_key="test-key", backoff_base_s=1, backoff_max_s=4)
+
+    assert client.get_backoff_delay(attempt=10, retry_after="12") == 12
+    assert 0 <= client.get_backoff_delay(attempt=10) <= 4
+
+    asyncio.run(client.aclose())
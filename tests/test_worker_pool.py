@@ -0,0 +1,31 @@
+import asyncio
+import time
+
+from app.worker_pool import run_in_process, run_in_thread, shutdown_worker_pools
+
+
+def test_event_loop_stays_responsive_during_long_job():
+    async def count_ticks_while_working() -> int:
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker_task = asyncio.create_task(ticker())
+        await asyncio.gather(
+            run_in_process(time.sleep, 1),
+            run_in_thread(time.sleep, 1),
+        )
+        ticker_task.cancel()
+        return ticks
+
+    try:
+        ticks = asyncio.run(count_ticks_while_working())
+    finally:
+        shutdown_worker_pools()
+
+    # A blocked loop would tick once or not at all.
+    assert ticks > 30